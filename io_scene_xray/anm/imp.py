@@ -6,11 +6,11 @@ import math
 import bpy
 
 # addon modules
-from . import fmt
 from .. import contexts
 from .. import text
 from .. import utils
 from .. import log
+from .. import motion_decode
 from .. import xray_envelope
 from .. import version_utils
 from .. import xray_io
@@ -26,31 +26,17 @@ class ImportAnmContext(contexts.ImportContext):
 
 
 def _import(file_path, creader, context):
+    try:
+        anm_motion = motion_decode.read_anm(creader, file_path)
+    except motion_decode.DecodeError as error:
+        raise utils.convert_decode_error(error)
+    apply_anm(anm_motion, context)
+
+
+def apply_anm(anm_motion, context):
     warn_list = []
-    chunk_data = creader.next(fmt.Chunks.MAIN, no_error=True)
-    if chunk_data is None:
-        raise utils.AppError(
-            text.error.anm_has_no_chunk,
-            log.props(
-                file=os.path.basename(file_path),
-                path=file_path
-            )
-        )
-    preader = xray_io.PackedReader(chunk_data)
-    name = preader.gets()
-    _fr = preader.getf('<2I')
-    fps, ver = preader.getf('<fH')
-    if not ver in fmt.MOTION_SUPPORTED_VERSIONS:
-        raise utils.AppError(
-            text.error.anm_unsupport_ver,
-            log.props(
-                file=os.path.basename(file_path),
-                path=file_path,
-                version=ver
-            )
-        )
-    if not name:
-        name = os.path.basename(file_path)
+    name = anm_motion.name
+    fps = anm_motion.fps
     bpy_obj = bpy.data.objects.new(name, None)
     bpy_obj.rotation_mode = 'YXZ'
     if context.camera_animation:
@@ -80,14 +66,12 @@ def _import(file_path, creader, context):
     )
     converted_warrning = False
     unique_shapes = set()
-    for curve_index in range(6):
+    for curve_index, envelope in enumerate(anm_motion.envelopes):
         fcurve = fcs[(0, 2, 1, 5, 3, 4)[curve_index]]
         koef = (1, 1, 1, -1, -1, -1)[curve_index]
-        use_interpolate = xray_envelope.import_envelope(
-            preader,
-            ver,
+        use_interpolate = xray_envelope.apply_envelope(
+            envelope,
             fcurve,
-            fps,
             koef,
             name,
             warn_list,
@@ -124,3 +108,20 @@ def import_file(context):
     data = utils.read_file(file_path)
     chunked_reader = xray_io.ChunkedReader(data)
     _import(file_path, chunked_reader, context)
+
+
+@log.with_context('import-anm-path')
+def import_decoded_file(context, decoded_file):
+    # decoded_file is a future of motion_decode.decode_anm_file
+    file_path = context.filepath
+    log.update(file=file_path)
+    if not os.path.exists(file_path):
+        raise utils.AppError(
+            text.error.file_not_found,
+            log.props(file_path=file_path)
+        )
+    try:
+        anm_motion = decoded_file.result()
+    except motion_decode.DecodeError as error:
+        raise utils.convert_decode_error(error)
+    apply_anm(anm_motion, context)
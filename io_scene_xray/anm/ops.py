@@ -10,6 +10,7 @@ from . import imp
 from . import exp
 from .. import icons
 from .. import log
+from .. import motion_decode
 from .. import utils
 from .. import text
 from .. import version_utils
@@ -68,10 +69,22 @@ class XRAY_OT_import_anm(
             return {'CANCELLED'}
         import_context = imp.ImportAnmContext()
         import_context.camera_animation = self.camera_animation
-        for file in self.files:
-            import_context.filepath = os.path.join(self.directory, file.name)
+        files_paths = [
+            os.path.join(self.directory, file.name)
+            for file in self.files
+        ]
+        # files are decoded in worker processes,
+        # objects are created in the main thread in order of files
+        preferences = version_utils.get_preferences()
+        decoded_files = utils.decode_files(
+            motion_decode.decode_anm_file,
+            [(file_path, ) for file_path in files_paths],
+            preferences.import_workers_count
+        )
+        for file_path, decoded_file in zip(files_paths, decoded_files):
+            import_context.filepath = file_path
             try:
-                imp.import_file(import_context)
+                imp.import_decoded_file(import_context, decoded_file)
             except utils.AppError as err:
                 import_context.errors.append(err)
         for err in import_context.errors:
@@ -30,6 +30,15 @@ class ImportMeshContext(ImportContext):
     def __init__(self):
         super().__init__()
         self.textures_folder = None
+        self.materials_indices = {}
+
+    def material_index(self, get_signature):
+        # indices are built once per import session
+        index = self.materials_indices.get(get_signature)
+        if index is None:
+            index = utils.MaterialIndex(get_signature)
+            self.materials_indices[get_signature] = index
+        return index
 
     def image(self, relpath):
         relpath = relpath.lower().replace('\\', os.path.sep)
@@ -41,11 +50,7 @@ class ImportMeshContext(ImportContext):
         filepath = os.path.abspath(
             os.path.join(self.textures_folder, relpath + '.dds')
         )
-        result = None
-        for bpy_image in bpy.data.images:
-            if bpy.path.abspath(bpy_image.filepath) == filepath:
-                result = bpy_image
-                break
+        result = utils.IMAGES.find(filepath)
         if result is None:
             try:
                 result = bpy.data.images.load(filepath)
@@ -54,6 +59,7 @@ class ImportMeshContext(ImportContext):
                 result = bpy.data.images.new(os.path.basename(relpath), 0, 0)
                 result.source = 'FILE'
                 result.filepath = filepath
+            utils.IMAGES.add(result)
         return result
 
 
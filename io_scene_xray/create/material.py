@@ -31,6 +31,39 @@ def _is_compatible_texture(texture, filepart):
         return True
 
 
+def _get_signature(material):
+    xray = material.xray
+    return xray.flags, xray.eshader, xray.cshader, xray.gamemtl
+
+
+def _is_compatible_material(material, texture, vmap, tx_filepart):
+    if (not texture) and (not vmap):
+        all_empty_textures = version_utils.is_all_empty_textures(material)
+        if all_empty_textures:
+            return True
+    if version_utils.IS_28:
+        if not material.use_nodes:
+            return False
+        tex_nodes = []
+        for node in material.node_tree.nodes:
+            if not node.type in version_utils.IMAGE_NODES:
+                continue
+            tex_nodes.append(node)
+        if len(tex_nodes) != 1:
+            return False
+        return _is_compatible_texture(tex_nodes[0], tx_filepart)
+    else:
+        for slot in material.texture_slots:
+            if not slot:
+                continue
+            if slot.uv_layer != vmap:
+                continue
+            if not _is_compatible_texture(slot.texture, tx_filepart):
+                continue
+            return True
+        return False
+
+
 def get_material(
         context,
         name,
@@ -41,58 +74,15 @@ def get_material(
         flags,
         vmap
     ):
-    bpy_material = None
     tx_filepart = texture.replace('\\', os.path.sep).lower()
-    for material in bpy.data.materials:
-        if not material.name.startswith(name):
-            continue
-        if material.xray.flags != flags:
-            continue
-        if material.xray.eshader != eshader:
-            continue
-        if material.xray.cshader != cshader:
-            continue
-        if material.xray.gamemtl != gamemtl:
-            continue
-        if (not texture) and (not vmap):
-            all_empty_textures = version_utils.is_all_empty_textures(material)
-            if all_empty_textures:
-                bpy_material = material
-                break
-        if version_utils.IS_28:
-            tex_nodes = []
-            ts_found = False
-            if material.use_nodes:
-                for node in material.node_tree.nodes:
-                    if not node.type in version_utils.IMAGE_NODES:
-                        continue
-                    tex_nodes.append(node)
-                if len(tex_nodes) != 1:
-                    ts_found = False
-                else:
-                    tex_node = tex_nodes[0]
-                    if not _is_compatible_texture(tex_node, tx_filepart):
-                        continue
-                    ts_found = True
-                if not ts_found:
-                    continue
-                bpy_material = material
-                break
-        else:
-            ts_found = False
-            for slot in material.texture_slots:
-                if not slot:
-                    continue
-                if slot.uv_layer != vmap:
-                    continue
-                if not _is_compatible_texture(slot.texture, tx_filepart):
-                    continue
-                ts_found = True
-                break
-            if not ts_found:
-                continue
-            bpy_material = material
-            break
+    material_index = context.material_index(_get_signature)
+    bpy_material = material_index.find(
+        name,
+        (flags, eshader, cshader, gamemtl),
+        lambda material: _is_compatible_material(
+            material, texture, vmap, tx_filepart
+        )
+    )
     if bpy_material is None:
         bpy_material = bpy.data.materials.new(name)
         bpy_material.xray.version = context.version
@@ -137,4 +127,5 @@ def get_material(
                 bpy_texture_slot.uv_layer = vmap
                 bpy_texture_slot.use_map_color_diffuse = True
                 bpy_texture_slot.use_map_alpha = True
+        material_index.add(bpy_material)
     return bpy_material
@@ -1,3 +1,6 @@
+# blender modules
+import numpy
+
 # addon modules
 from . import fmt
 from . import utility
@@ -181,60 +184,86 @@ def validate_images_size(lvl_dets):
         )
 
 
-def slot_location_to_slot_index(lvl_dets, slot_location):
-    x_slot = int(round(
-        (slot_location[0] - 1.0) / lvl_dets.slot_size,
-        0
-    )) + lvl_dets.slots_offset_x
-
-    y_slot = int(round(
-        (slot_location[1] - 1.0) / lvl_dets.slot_size,
-        0
-    )) + lvl_dets.slots_offset_y
+def get_image_pixels(image):
+    # returns (height, width, rgba) array
+    pixels = numpy.empty(len(image.pixels), dtype=numpy.float32)
+    if hasattr(image.pixels, 'foreach_get'):
+        image.pixels.foreach_get(pixels)
+    else:
+        pixels[:] = image.pixels[:]
+    size_x, size_y = image.size
+    return pixels.astype(numpy.float64).reshape(size_y, size_x, 4)
 
-    return y_slot * lvl_dets.slots_size_x + x_slot
 
+def get_polygons_centers(bpy_mesh):
+    centers = numpy.empty(len(bpy_mesh.polygons) * 3, dtype=numpy.float32)
+    bpy_mesh.polygons.foreach_get('center', centers)
+    return centers.astype(numpy.float64).reshape(-1, 3)
 
-def pixel_color_to_density(lvl_dets, pixels, coord_x, coord_y):
-    density = []
 
-    for corner_index in range(4):
+def round_to_int(values):
+    # numpy and python round half to even
+    return numpy.round(values).astype(numpy.int64)
 
-        pixel_index = (
-            (coord_x * 2 + fmt.PIXELS_OFFSET_1[corner_index][0] + \
-            (coord_y * 2 + fmt.PIXELS_OFFSET_1[corner_index][1]) * \
-            lvl_dets.slots_size_x * 2) * 4 + 3
-        )
 
-        density.append(int(round(
-            pixels[pixel_index] / fmt.DENSITY_DEPTH,
-            0
-        )) << (4 * corner_index))
+def slots_locations_to_slots_indices(lvl_dets, slots_locations):
+    x_slots = round_to_int(
+        (slots_locations[:, 0] - 1.0) / lvl_dets.slot_size
+    ) + lvl_dets.slots_offset_x
 
-    return density[0] | density[1] | density[2] | density[3]
+    y_slots = round_to_int(
+        (slots_locations[:, 1] - 1.0) / lvl_dets.slot_size
+    ) + lvl_dets.slots_offset_y
 
+    return y_slots * lvl_dets.slots_size_x + x_slots
 
-def pixel_color_to_light(lvl_dets, pixels, coord_x, coord_y, pixels_offset):
-    light = []
 
+def pixels_to_density(pixels):
+    # pixels of double size image, each slot is 2x2 pixels
+    density = 0
     for corner_index in range(4):
-        indices = []
-        for color_component_index in range(3):    # Red, Green, Blue
-            pixel_index = (
-                (coord_x * 2 + pixels_offset[corner_index][0] + \
-                (coord_y * 2 + pixels_offset[corner_index][1]) * \
-                lvl_dets.slots_size_x * 2) * 4 + color_component_index
-            )
-            indices.append(pixel_index)
+        offset_x, offset_y = fmt.PIXELS_OFFSET_1[corner_index]
+        alpha = pixels[offset_y : : 2, offset_x : : 2, 3]
+        density = density | (
+            round_to_int(alpha / fmt.DENSITY_DEPTH) << (4 * corner_index)
+        )
+    return density
+
 
+def pixels_to_light(pixels, pixels_offset):
+    light = 0
+    for corner_index in range(4):
+        offset_x, offset_y = pixels_offset[corner_index]
+        colors = pixels[offset_y : : 2, offset_x : : 2]
         average_color = (
-            pixels[indices[0]] + pixels[indices[1]] + pixels[indices[2]]
+            colors[..., 0] + colors[..., 1] + colors[..., 2]
         ) / 3
-
-        light_value = int(round(
-            average_color / fmt.DENSITY_DEPTH, 0
-        )) << (4 * corner_index)
-
-        light.append(light_value)
-
-    return light[0] | light[1] | light[2] | light[3]
+        light = light | (
+            round_to_int(average_color / fmt.DENSITY_DEPTH) << (4 * corner_index)
+        )
+    return light
+
+
+def pixels_to_meshes_ids(pixels, color_indices, empty_id):
+    # colors are rounded to the pallete grid,
+    # unknown colors are empty detail meshes
+    color_depth = 21
+    color_step = 1.0 / color_depth
+    color_table = numpy.full(
+        (color_depth + 1, ) * 3,
+        empty_id,
+        dtype=numpy.int64
+    )
+    for color, mesh_id in color_indices.items():
+        color_table[color] = mesh_id
+    colors = round_to_int(pixels[0 : : 2, 0 : : 2, 0 : 3] / color_step)
+    is_pallete_color = numpy.all(
+        (colors >= 0) & (colors <= color_depth),
+        axis=-1
+    )
+    meshes_ids = numpy.full(colors.shape[ : -1], empty_id, dtype=numpy.int64)
+    pallete_colors = colors[is_pallete_color]
+    meshes_ids[is_pallete_color] = color_table[
+        pallete_colors[:, 0], pallete_colors[:, 1], pallete_colors[:, 2]
+    ]
+    return meshes_ids
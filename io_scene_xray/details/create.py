@@ -13,6 +13,14 @@ def pack_image(image):
         image.pack(as_png=True)
 
 
+def set_image_pixels(image, pixels):
+    pixels = pixels.ravel()
+    if hasattr(image.pixels, 'foreach_set'):
+        image.pixels.foreach_set(pixels)
+    else:
+        image.pixels = pixels.tolist()
+
+
 def create_object(object_name):
     bpy_mesh = bpy.data.meshes.new(object_name)
     bpy_object = bpy.data.objects.new(object_name, bpy_mesh)
@@ -161,7 +169,7 @@ def create_images(
         )
         meshes_image.use_fake_user = True
         images_list.append(meshes_image.name)
-        meshes_image.pixels = meshes[mesh_id]
+        set_image_pixels(meshes_image, meshes[mesh_id])
         pack_image(meshes_image)
         m_i.append(meshes_image.name)
 
@@ -180,7 +188,7 @@ def create_images(
         for image_name, pixels, prop_name in zip(image_names, pixels, props):
             bpy_image = _create_det_image('{}.png'.format(image_name))
             images_list.append(bpy_image.name)
-            bpy_image.pixels = pixels
+            set_image_pixels(bpy_image, pixels)
             pack_image(bpy_image)
             setattr(ligthing, prop_name, bpy_image.name)
 
@@ -190,7 +198,7 @@ def create_images(
         lights_v2_image = _create_det_image('lighting.png', double_size=True)
         images_list.append(lights_v2_image.name)
         lights_v2_image.use_fake_user = True
-        lights_v2_image.pixels = lights_old
+        set_image_pixels(lights_v2_image, lights_old)
         pack_image(lights_v2_image)
         ligthing.lights_image = lights_v2_image.name
 
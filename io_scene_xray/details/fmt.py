@@ -1,3 +1,7 @@
+# blender modules
+import numpy
+
+
 class Chunks:
     HEADER = 0x0
     MESHES = 0x1
@@ -49,3 +53,16 @@ PIXELS_OFFSET_2 = {
 DENSITY_DEPTH = 1.0 / 0xf
 DETAIL_MODEL_COUNT_LIMIT = 0x3f
 HEADER_SIZE = 24
+
+
+# slots tables
+SLOT_V3_DTYPE = numpy.dtype([
+    ('data', '<u4', (2, )),
+    ('density', '<u2', (4, ))
+])
+SLOT_V2_DTYPE = numpy.dtype([
+    ('y_base', '<f4'),
+    ('y_top', '<f4'),
+    ('meshes', [('id', 'u1'), ('density', '<u2')], (4, )),
+    ('light', '<u2')
+])
@@ -1,5 +1,6 @@
 # blender modules
 import bpy
+import numpy
 
 # addon modules
 from . import create
@@ -63,6 +64,51 @@ def read_details_meshes(
     return bpy_obj_root
 
 
+def read_slots(packed_reader, header, dtype):
+    slots = packed_reader.get_array(dtype, header.slots_count)
+    return slots.reshape(header.size.y, header.size.x)
+
+
+def get_corner_values(values, corner_index):
+    # 4 bit value of slot corner
+    return ((values >> (corner_index * 4)) & 0xf) / 0xf
+
+
+def set_corners_pixels(pixels, values, pixels_offset, channels):
+    # pixels has double size, each slot is 2x2 pixels
+    for corner_index in range(4):
+        offset_x, offset_y = pixels_offset[corner_index]
+        corner_pixels = pixels[offset_y : : 2, offset_x : : 2]
+        corner_pixels[..., channels] = get_corner_values(values, corner_index)
+
+
+def create_meshes_pixels(header, meshes_ids, densities, color_indices):
+    colors = numpy.array(color_indices, dtype=numpy.float64)[:, 0 : 3]
+    meshes_images_pixels = []
+    for mesh_index in range(4):
+        pixels = numpy.ones(
+            (header.size.y * 2, header.size.x * 2, 4),
+            dtype=numpy.float32
+        )
+        mesh_colors = colors[meshes_ids[..., mesh_index]]
+        for offset_x, offset_y in fmt.PIXELS_OFFSET_1.values():
+            pixels[offset_y : : 2, offset_x : : 2, 0 : 3] = mesh_colors
+        set_corners_pixels(
+            pixels,
+            densities[..., mesh_index],
+            fmt.PIXELS_OFFSET_1,
+            3
+        )
+        meshes_images_pixels.append(pixels)
+    return meshes_images_pixels
+
+
+def create_light_pixels(values):
+    pixels = numpy.ones(values.shape + (4, ), dtype=numpy.float32)
+    pixels[..., 0 : 3] = (values / 0xf)[..., None]
+    return pixels
+
+
 @log.with_context('import-slots')
 def read_details_slots(
         base_name,
@@ -74,81 +120,45 @@ def read_details_slots(
     ):
     create.create_pallete(color_indices)
 
-    y_coords = []
-    y_coords_base = []
+    if header.format_version == 3:
+        slots = read_slots(packed_reader, header, fmt.SLOT_V3_DTYPE)
+        data_0 = slots['data'][..., 0]
+        data_1 = slots['data'][..., 1]
+
+        # slot Y coordinate
+        y_base = data_0 & 0xfff
+        y_height = (data_0 >> 12) & 0xff
+        y_coords_base = y_base * 0.2 - 200.0
+        y_coords = y_coords_base + y_height * 0.1 + 0.05
+
+        # meshes indices
+        meshes_ids = numpy.stack((
+            (data_0 >> 20) & 0x3f,
+            (data_0 >> 26) & 0x3f,
+            data_1 & 0x3f,
+            (data_1 >> 6) & 0x3f
+        ), axis=-1)
+
+        # meshes density
+        meshes_images_pixels = create_meshes_pixels(
+            header,
+            meshes_ids,
+            slots['density'],
+            color_indices
+        )
 
-    meshes_images_pixels = [
-        [1.0 for _ in range(header.slots_count * 4 * 4)] for _ in range(4)
-    ]
+        # lighting
+        shadows_image_pixels = create_light_pixels((data_1 >> 12) & 0xf)
+        hemi_image_pixels = create_light_pixels((data_1 >> 16) & 0xf)
+        lights_image_pixels = numpy.ones(
+            (header.size.y, header.size.x, 4),
+            dtype=numpy.float32
+        )
+        for channel in range(3):
+            lights_image_pixels[..., channel] = \
+                ((data_1 >> (20 + channel * 4)) & 0xf) / 0xf
 
-    if header.format_version == 3:
-        lights_image_pixels = []
-        shadows_image_pixels = []
-        hemi_image_pixels = []
-        S_IIHHHH = xray_io.PackedReader.prep('2I4H')
-
-        for slot_y in range(header.size.y):
-            for slot_x in range(header.size.x):
-
-                slot_data = packed_reader.getp(S_IIHHHH)
-
-                # slot Y coordinate
-                y_base = slot_data[0] & 0xfff
-                y_height = (slot_data[0] >> 12) & 0xff
-                y_coord_base = y_base * 0.2 - 200.0
-                y_coord = y_coord_base + y_height * 0.1 + 0.05
-                y_coords.append(y_coord)
-                y_coords_base.append(y_coord_base)
-
-                # meshes indices
-                meshes = [
-                    (slot_data[0] >> 20) & 0x3f,
-                    (slot_data[0] >> 26) & 0x3f,
-                    slot_data[1] & 0x3f,
-                    (slot_data[1] >> 6) & 0x3f
-                ]
-
-                # lighting
-                shadow = ((slot_data[1] >> 12) & 0xf) / 0xf
-                shadows_image_pixels.extend((shadow, shadow, shadow, 1.0))
-
-                hemi = ((slot_data[1] >> 16) & 0xf) / 0xf
-                hemi_image_pixels.extend((hemi, hemi, hemi, 1.0))
-
-                light_r = ((slot_data[1] >> 20) & 0xf) / 0xf
-                light_g = ((slot_data[1] >> 24) & 0xf) / 0xf
-                light_b = ((slot_data[1] >> 28) & 0xf) / 0xf
-                lights_image_pixels.extend((light_r, light_g, light_b, 1.0))
-
-                # meshes density
-                meshes_density_data = slot_data[2 : 6]
-                for mesh_index, mesh_density in enumerate(meshes_density_data):
-                    for corner_index in range(4):
-
-                        corner_density = (
-                            (mesh_density >> corner_index * 4) & 0xf
-                        ) / 0xf
-
-                        pixel_index = \
-                            slot_x * 2 + \
-                            fmt.PIXELS_OFFSET_1[corner_index][0] + \
-                            header.size.x * 2 * \
-                            (
-                                slot_y * 2 + \
-                                fmt.PIXELS_OFFSET_1[corner_index][1]
-                            )
-
-                        color = color_indices[meshes[mesh_index]]
-
-                        pixels = meshes_images_pixels[mesh_index]
-                        # Red
-                        pixels[pixel_index * 4] = color[0]
-                        # Green
-                        pixels[pixel_index * 4 + 1] = color[1]
-                        # Blue
-                        pixels[pixel_index * 4 + 2] = color[2]
-                        # Alpha
-                        pixels[pixel_index * 4 + 3] = corner_density
+        del slots, data_0, data_1
 
         create.create_images(
             header,
@@ -165,11 +175,7 @@ def read_details_slots(
         del hemi_image_pixels
 
     else:    # version 2
-        S_ffBHBHBHBHH = xray_io.PackedReader.prep('2fBHBHBHB2H')
-
-        lighting_image_pixels = [
-            1.0 for _ in range(header.slots_count * 4 * 4)
-        ]
+        slots = read_slots(packed_reader, header, fmt.SLOT_V2_DTYPE)
 
         if context.format_version == 'builds_1233-1558':
             pixels_offset = fmt.PIXELS_OFFSET_2
@@ -177,81 +183,41 @@ def read_details_slots(
         else:    # builds 1096-1230
             pixels_offset = fmt.PIXELS_OFFSET_1
 
-        density_pixels_offset = fmt.PIXELS_OFFSET_1
-
-        bad_y_base_count = 0
-        bad_y_top_count = 0
-
-        for slot_y in range(header.size.y):
-            for slot_x in range(header.size.x):
-                slot_data = packed_reader.getp(S_ffBHBHBHBHH)
-
-                y_base = slot_data[0]
-                y_top = slot_data[1]
-                if y_base > 200.0:    # bad y_base coordinate (inf)
-                    y_base = 200.0
-                    bad_y_base_count += 1
-                if y_top < -200.0:    # bad y_top coordinate (-inf)
-                    y_top = -200.0
-                    bad_y_top_count += 1
-                y_coords.append(y_top)
-                y_coords_base.append(y_base)
-
-                data_index = 2
-
-                for mesh_index in range(4):
-                    dm_obj_id = slot_data[data_index]
-                    if dm_obj_id == 0xff:
-                        dm_obj_id = 0x3f
-
-                    density_data = slot_data[data_index + 1]
-
-                    color = color_indices[dm_obj_id]
-                    pixels = meshes_images_pixels[mesh_index]
-
-                    for corner_index in range(4):
-
-                        dens_pixel_index = \
-                            slot_x * 2 + \
-                            density_pixels_offset[corner_index][0] + \
-                            header.size.x * 2 * \
-                            (slot_y * 2 + \
-                            density_pixels_offset[corner_index][1])
-
-                        corner_density = (
-                            (density_data >> corner_index * 4) & 0xf
-                        ) / 0xf
-
-                        # Red
-                        pixels[dens_pixel_index * 4] = color[0]
-                        # Green
-                        pixels[dens_pixel_index * 4 + 1] = color[1]
-                        # Blue
-                        pixels[dens_pixel_index * 4 + 2] = color[2]
-                        # Alpha
-                        pixels[dens_pixel_index * 4 + 3] = corner_density
-
-                        light = (
-                            slot_data[10] >> (corner_index * 4) & 0xf
-                        ) / 0xf
-
-                        pixel_index = \
-                            slot_x * 2 + \
-                            pixels_offset[corner_index][0] + \
-                            header.size.x * 2 * \
-                            (slot_y * 2 + \
-                            pixels_offset[corner_index][1])
-
-                        # Red
-                        lighting_image_pixels[pixel_index * 4] = light
-                        # Green
-                        lighting_image_pixels[pixel_index * 4 + 1] = light
-                        # Blue
-                        lighting_image_pixels[pixel_index * 4 + 2] = light
-                        # Alpha
-                        lighting_image_pixels[pixel_index * 4 + 3] = 1.0
-
-                    data_index += 2
+        y_coords_base = slots['y_base'].astype(numpy.float64)
+        y_coords = slots['y_top'].astype(numpy.float64)
+
+        # bad y_base coordinate (inf)
+        bad_y_base = y_coords_base > 200.0
+        bad_y_base_count = int(numpy.count_nonzero(bad_y_base))
+        y_coords_base[bad_y_base] = 200.0
+
+        # bad y_top coordinate (-inf)
+        bad_y_top = y_coords < -200.0
+        bad_y_top_count = int(numpy.count_nonzero(bad_y_top))
+        y_coords[bad_y_top] = -200.0
+
+        meshes_ids = slots['meshes']['id'].astype(numpy.intp)
+        meshes_ids[meshes_ids == 0xff] = 0x3f
+
+        meshes_images_pixels = create_meshes_pixels(
+            header,
+            meshes_ids,
+            slots['meshes']['density'],
+            color_indices
+        )
+
+        lighting_image_pixels = numpy.ones(
+            (header.size.y * 2, header.size.x * 2, 4),
+            dtype=numpy.float32
+        )
+        set_corners_pixels(
+            lighting_image_pixels,
+            slots['light'][..., None],
+            pixels_offset,
+            slice(0, 3)
+        )
+
+        del slots
 
         create.create_images(
             header,
@@ -278,8 +244,8 @@ def read_details_slots(
     slots_base_object, slots_top_object = create.create_details_slots_object(
         base_name,
         header,
-        y_coords,
-        y_coords_base
+        y_coords.ravel().tolist(),
+        y_coords_base.ravel().tolist()
     )
 
     del y_coords
@@ -1,3 +1,6 @@
+# blender modules
+import numpy
+
 # addon modules
 from . import convert
 from . import fmt
@@ -104,281 +107,143 @@ def write_header(chunked_writer, lvl_dets):
     chunked_writer.put(fmt.Chunks.HEADER, packed_writer)
 
 
-@log.with_context('export-slots')
-def write_slots_v3(chunked_writer, lvl_dets):
+def read_slots_centers(lvl_dets):
     base_obj = lvl_dets.slots_base_object
     top_obj = lvl_dets.slots_top_object
     log.update(slots_objects=(base_obj.name, top_obj.name))
-    packed_writer = xray_io.PackedWriter()
-    base_slots_poly = base_obj.data.polygons
-    top_slots_poly = top_obj.data.polygons
-    slots = {}
     lvl_dets.slot_size = 2.0
 
-    for slot_index in range(lvl_dets.slots_count):
-        slots[slot_index] = [None, None]
-
-    for slot_index in range(lvl_dets.slots_count):
-        polygon_base = base_slots_poly[slot_index]
-        polygon_top = top_slots_poly[slot_index]
-
-        slot_index_base = convert.slot_location_to_slot_index(
-            lvl_dets, polygon_base.center
-        )
-
-        slot_index_top = convert.slot_location_to_slot_index(
-            lvl_dets, polygon_top.center
-        )
+    base_centers = convert.get_polygons_centers(base_obj.data)
+    top_centers = convert.get_polygons_centers(top_obj.data)
 
-        slots[slot_index_base][0] = int(
-            round((polygon_base.center[2] + 200.0) / 0.2, 0)
-        ) & 0xfff
-
-        slots[slot_index_top][1] = (int(round(
-            (polygon_top.center[2] - polygon_base.center[2] - 0.05) / 0.1,
-            0
-        )) & 0xff) << 12
-
-    lights_pixels = list(lvl_dets.lights.pixels)
-    hemi_pixels = list(lvl_dets.hemi.pixels)
-    shadows_pixels = list(lvl_dets.shadows.pixels)
-
-    meshes_pixels = [
-        list(lvl_dets.mesh_0.pixels),
-        list(lvl_dets.mesh_1.pixels),
-        list(lvl_dets.mesh_2.pixels),
-        list(lvl_dets.mesh_3.pixels)
-    ]
-
-    color_indices = utility.gen_meshes_color_indices_table(
-        len(lvl_dets.meshes_object.children)
+    base_indices = convert.slots_locations_to_slots_indices(
+        lvl_dets, base_centers
+    )
+    top_indices = convert.slots_locations_to_slots_indices(
+        lvl_dets, top_centers
     )
 
-    color_step = 1.0 / 21
-
-    slot_index = 0
-    for coord_y in range(lvl_dets.slots_size_y):
-        for coord_x in range(lvl_dets.slots_size_x):
-            pixel_index = slot_index * 4
-
-            hemi = int(round(0xf * ((
-                hemi_pixels[pixel_index] + \
-                hemi_pixels[pixel_index + 1] + \
-                hemi_pixels[pixel_index + 2]
-            ) / 3), 0))
-
-            shadow = int(round(0xf * ((
-                shadows_pixels[pixel_index] + \
-                shadows_pixels[pixel_index + 1] + \
-                shadows_pixels[pixel_index + 2]
-            ) / 3), 0))
-
-            light_r = int(round(0xf * (lights_pixels[pixel_index]), 0))
-            light_g = int(round(0xf * (lights_pixels[pixel_index + 1]), 0))
-            light_b = int(round(0xf * (lights_pixels[pixel_index + 2]), 0))
-
-            mesh_pixel_index = pixel_index * 2 + lvl_dets.slots_size_x \
-                * coord_y * 2 * 4
-
-            mesh_0_id = color_indices.get((
-
-                int(round(
-                    meshes_pixels[0][mesh_pixel_index] / color_step, 0)),
-
-                int(round(
-                    meshes_pixels[0][mesh_pixel_index + 1] / color_step, 0)),
-
-                int(round(
-                    meshes_pixels[0][mesh_pixel_index + 2] / color_step, 0)),
-
-            ), 63)
-
-            mesh_1_id = color_indices.get((
-
-                int(round(
-                    meshes_pixels[1][mesh_pixel_index] / color_step, 0)),
-
-                int(round(
-                    meshes_pixels[1][mesh_pixel_index + 1] / color_step, 0)),
+    return base_centers, top_centers, base_indices, top_indices
 
-                int(round(
-                    meshes_pixels[1][mesh_pixel_index + 2] / color_step, 0)),
 
-            ), 63)
+def read_meshes_pixels(lvl_dets):
+    return [
+        convert.get_image_pixels(lvl_dets.mesh_0),
+        convert.get_image_pixels(lvl_dets.mesh_1),
+        convert.get_image_pixels(lvl_dets.mesh_2),
+        convert.get_image_pixels(lvl_dets.mesh_3)
+    ]
 
-            mesh_2_id = color_indices.get((
 
-                int(round(
-                    meshes_pixels[2][mesh_pixel_index] / color_step, 0)),
+@log.with_context('export-slots')
+def write_slots_v3(chunked_writer, lvl_dets):
+    packed_writer = xray_io.PackedWriter()
+    slots_shape = (lvl_dets.slots_size_y, lvl_dets.slots_size_x)
 
-                int(round(
-                    meshes_pixels[2][mesh_pixel_index + 1] / color_step, 0)),
+    base_centers, top_centers, base_indices, top_indices = \
+        read_slots_centers(lvl_dets)
 
-                int(round(
-                    meshes_pixels[2][mesh_pixel_index + 2] / color_step, 0)),
+    y_base = numpy.zeros(lvl_dets.slots_count, dtype=numpy.int64)
+    y_base[base_indices] = convert.round_to_int(
+        (base_centers[:, 2] + 200.0) / 0.2
+    ) & 0xfff
 
-            ), 63)
+    y_height = numpy.zeros(lvl_dets.slots_count, dtype=numpy.int64)
+    y_height[top_indices] = (convert.round_to_int(
+        (top_centers[:, 2] - base_centers[:, 2] - 0.05) / 0.1
+    ) & 0xff) << 12
 
-            mesh_3_id = color_indices.get((
+    y_base = y_base.reshape(slots_shape)
+    y_height = y_height.reshape(slots_shape)
 
-                int(round(
-                    meshes_pixels[3][mesh_pixel_index] / color_step, 0)),
+    lights_pixels = convert.get_image_pixels(lvl_dets.lights)
+    hemi_pixels = convert.get_image_pixels(lvl_dets.hemi)
+    shadows_pixels = convert.get_image_pixels(lvl_dets.shadows)
 
-                int(round(
-                    meshes_pixels[3][mesh_pixel_index + 1] / color_step, 0)),
+    hemi = convert.round_to_int(0xf * ((
+        hemi_pixels[..., 0] + \
+        hemi_pixels[..., 1] + \
+        hemi_pixels[..., 2]
+    ) / 3))
 
-                int(round(
-                    meshes_pixels[3][mesh_pixel_index + 2] / color_step, 0)),
+    shadow = convert.round_to_int(0xf * ((
+        shadows_pixels[..., 0] + \
+        shadows_pixels[..., 1] + \
+        shadows_pixels[..., 2]
+    ) / 3))
 
-            ), 63)
+    light_r = convert.round_to_int(0xf * lights_pixels[..., 0])
+    light_g = convert.round_to_int(0xf * lights_pixels[..., 1])
+    light_b = convert.round_to_int(0xf * lights_pixels[..., 2])
 
-            density = (
-                convert.pixel_color_to_density(
-                    lvl_dets, meshes_pixels[0], coord_x, coord_y
-                ),
-                convert.pixel_color_to_density(
-                    lvl_dets, meshes_pixels[1], coord_x, coord_y
-                ),
-                convert.pixel_color_to_density(
-                    lvl_dets, meshes_pixels[2], coord_x, coord_y
-                ),
-                convert.pixel_color_to_density(
-                    lvl_dets, meshes_pixels[3], coord_x, coord_y
-                )
-            )
+    del lights_pixels, hemi_pixels, shadows_pixels
 
-            slot = slots[slot_index]
+    color_indices = utility.gen_meshes_color_indices_table(
+        len(lvl_dets.meshes_object.children)
+    )
 
-            packed_writer.putf(
-                '<2I',
-                slot[0] | slot[1] | \
-                mesh_0_id << 20 | mesh_1_id << 26, \
-                mesh_2_id | mesh_3_id << 6 | \
-                shadow << 12 | hemi << 16 | \
-                light_r << 20 | light_g << 24 | light_b << 28
-            )
+    slots = numpy.empty(slots_shape, dtype=fmt.SLOT_V3_DTYPE)
+    meshes_ids = []
+    for mesh_index, pixels in enumerate(read_meshes_pixels(lvl_dets)):
+        meshes_ids.append(convert.pixels_to_meshes_ids(
+            pixels, color_indices, 63
+        ))
+        slots['density'][..., mesh_index] = convert.pixels_to_density(pixels)
 
-            packed_writer.putf(
-                '<4H',
-                density[0],
-                density[1],
-                density[2],
-                density[3]
-            )
+    slots['data'][..., 0] = \
+        y_base | y_height | \
+        meshes_ids[0] << 20 | meshes_ids[1] << 26
+    slots['data'][..., 1] = \
+        meshes_ids[2] | meshes_ids[3] << 6 | \
+        shadow << 12 | hemi << 16 | \
+        light_r << 20 | light_g << 24 | light_b << 28
 
-            slot_index += 1
+    packed_writer.data += slots.tobytes()
 
     chunked_writer.put(fmt.Chunks.SLOTS, packed_writer)
 
 
 @log.with_context('export-slots')
 def write_slots_v2(chunked_writer, lvl_dets):
-    base_obj = lvl_dets.slots_base_object
-    top_obj = lvl_dets.slots_top_object
-    log.update(slots_objects=(base_obj.name, top_obj.name))
     packed_writer = xray_io.PackedWriter()
-    base_slots_poly = base_obj.data.polygons
-    top_slots_poly = top_obj.data.polygons
-    slots = {}
-    lvl_dets.slot_size = 2.0
-
-    for slot_index in range(lvl_dets.slots_count):
-        slots[slot_index] = [None, None]
-
-    for slot_index in range(lvl_dets.slots_count):
-        polygon_base = base_slots_poly[slot_index]
-        polygon_top = top_slots_poly[slot_index]
+    slots_shape = (lvl_dets.slots_size_y, lvl_dets.slots_size_x)
 
-        slot_index_base = convert.slot_location_to_slot_index(
-            lvl_dets, polygon_base.center
-        )
-
-        slot_index_top = convert.slot_location_to_slot_index(
-            lvl_dets, polygon_top.center
-        )
+    base_centers, top_centers, base_indices, top_indices = \
+        read_slots_centers(lvl_dets)
 
-        slots[slot_index_base][0] = polygon_base.center[2]
-        slots[slot_index_top][1] = polygon_top.center[2]
+    slots = numpy.empty(slots_shape, dtype=fmt.SLOT_V2_DTYPE)
 
-    lights_pixels = list(lvl_dets.lights.pixels)
+    y_base = numpy.zeros(lvl_dets.slots_count, dtype=numpy.float64)
+    y_base[base_indices] = base_centers[:, 2]
+    slots['y_base'] = y_base.reshape(slots_shape)
 
-    meshes_pixels = [
-        list(lvl_dets.mesh_0.pixels),
-        list(lvl_dets.mesh_1.pixels),
-        list(lvl_dets.mesh_2.pixels),
-        list(lvl_dets.mesh_3.pixels)
-    ]
+    y_top = numpy.zeros(lvl_dets.slots_count, dtype=numpy.float64)
+    y_top[top_indices] = top_centers[:, 2]
+    slots['y_top'] = y_top.reshape(slots_shape)
 
     color_indices = utility.gen_meshes_color_indices_table(
         len(lvl_dets.meshes_object.children),
         format_version=2
     )
 
-    slot_index = 0
-    color_step = 1.0 / 21
+    slots_meshes = slots['meshes']
+    for mesh_index, pixels in enumerate(read_meshes_pixels(lvl_dets)):
+        slots_meshes['id'][..., mesh_index] = convert.pixels_to_meshes_ids(
+            pixels, color_indices, 255
+        )
+        slots_meshes['density'][..., mesh_index] = \
+            convert.pixels_to_density(pixels)
 
     if lvl_dets.old_format == 1:
         pixels_offset = fmt.PIXELS_OFFSET_1
     else:
         pixels_offset = fmt.PIXELS_OFFSET_2
 
-    for coord_y in range(lvl_dets.slots_size_y):
-        for coord_x in range(lvl_dets.slots_size_x):
-            packed_writer.putf(
-                '<2f',
-                slots[slot_index][0],
-                slots[slot_index][1]
-            )
-
-            slot_index += 1
-
-            for mesh_index in range(4):
-
-                mesh_pixel_index = (
-                    coord_x * 2 + lvl_dets.slots_size_x * 2 * coord_y * 2
-                ) * 4
-
-                mesh_id = color_indices.get((
-
-                    int(round(
-                        meshes_pixels[mesh_index][mesh_pixel_index] \
-                        / color_step,
-                        0
-                    )),
-
-                    int(round(
-                        meshes_pixels[mesh_index][mesh_pixel_index + 1] \
-                        / color_step,
-                    0
-                    )),
-
-                    int(round(
-                        meshes_pixels[mesh_index][mesh_pixel_index + 2] \
-                        / color_step,
-                        0
-                    )),
-
-                ), 255)
-
-                packed_writer.putf('<B', mesh_id)
-
-                density = convert.pixel_color_to_density(
-                    lvl_dets,
-                    meshes_pixels[mesh_index],
-                    coord_x,
-                    coord_y
-                )
-
-                packed_writer.putf('<H', density)
-
-            lighting = convert.pixel_color_to_light(
-                lvl_dets,
-                lights_pixels,
-                coord_x,
-                coord_y,
-                pixels_offset
-            )
+    slots['light'] = convert.pixels_to_light(
+        convert.get_image_pixels(lvl_dets.lights),
+        pixels_offset
+    )
 
-            packed_writer.putf('<H', lighting)
+    packed_writer.data += slots.tobytes()
 
     chunked_writer.put(fmt.Chunks.SLOTS, packed_writer)
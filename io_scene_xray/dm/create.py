@@ -34,14 +34,8 @@ def create_empty_image(context, detail_model, absolute_image_path):
     return bpy_image
 
 
-def check_estimated_material(material, det_model):
-    if not material.name.startswith(det_model.texture):
-        return False
-
-    if material.xray.eshader != det_model.shader:
-        return False
-
-    return True
+def get_material_signature(material):
+    return (material.xray.eshader, )
 
 
 def check_estimated_material_texture(material, det_model):
@@ -127,15 +121,11 @@ def create_bpy_image(det_model, abs_image_path):
 
 
 def find_bpy_image(det_model, abs_image_path):
-    bpy_image = None
-
-    for image in bpy.data.images:
-        if abs_image_path == image.filepath:
-            bpy_image = image
-            break
+    bpy_image = utils.IMAGES.find(abs_image_path)
 
     if not bpy_image:
         bpy_image = create_bpy_image(det_model, abs_image_path)
+        utils.IMAGES.add(bpy_image)
 
     return bpy_image
 
@@ -204,22 +194,19 @@ def search_material(context, det_model, file_path=None):
         det_model.texture + '.dds'
     ))
 
-    bpy_material = None
     det_model.file_path = file_path
     det_model.context = context
 
-    for material in bpy.data.materials:
-        if not check_estimated_material(material, det_model):
-            continue
-
-        if not check_estimated_material_texture(material, det_model):
-            continue
-
-        bpy_material = material
-        break
+    material_index = context.material_index(get_material_signature)
+    bpy_material = material_index.find(
+        det_model.texture,
+        (det_model.shader, ),
+        lambda material: check_estimated_material_texture(material, det_model)
+    )
 
     if not bpy_material:
         bpy_material = create_material(det_model, abs_image_path, context)
+        material_index.add(bpy_material)
 
     return bpy_material
 
@@ -10,23 +10,45 @@ _INITIALIZER = utils.ObjectsInitializer([
     'objects',
     'materials',
 ])
+# owner of the message bus subscriptions
+_MSGBUS_OWNER = object()
+
+
+def subscribe_images():
+    # depsgraph reports only the images used in the scene,
+    # so file path changes of the other images are subscribed too
+    if not version_utils.IS_28:
+        return
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.Image, 'filepath'),
+        owner=_MSGBUS_OWNER,
+        args=(),
+        notify=utils.IMAGES.invalidate
+    )
 
 
 @bpy.app.handlers.persistent
 def load_post(_):
     _INITIALIZER.sync('LOADED', bpy.data)
+    utils.IMAGES.invalidate()
+    # subscriptions are cleared when a file is loaded
+    subscribe_images()
 
 
 @bpy.app.handlers.persistent
-def scene_update_post(_):
+def scene_update_post(_, depsgraph=None):
     _INITIALIZER.sync('CREATED', bpy.data)
+    utils.IMAGES.sync(bpy.data.images, depsgraph)
 
 
 def register():
     bpy.app.handlers.load_post.append(load_post)
     version_utils.get_scene_update_post().append(scene_update_post)
+    subscribe_images()
 
 
 def unregister():
+    if version_utils.IS_28:
+        bpy.msgbus.clear_by_owner(_MSGBUS_OWNER)
     version_utils.get_scene_update_post().remove(scene_update_post)
     bpy.app.handlers.load_post.remove(load_post)
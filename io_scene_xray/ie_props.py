@@ -72,6 +72,18 @@ def PropObjectMotionsImport():
     )
 
 
+def prop_mesh_builder():
+    return bpy.props.EnumProperty(
+        name='Mesh Builder',
+        description='Method of visual meshes creation',
+        items=(
+            ('BMESH', 'BMesh', 'Create meshes face by face via bmesh'),
+            ('ARRAYS', 'Arrays', 'Create meshes from arrays in bulk')
+        ),
+        default='BMESH'
+    )
+
+
 def PropObjectMeshSplitByMaterials():
     return bpy.props.BoolProperty(
         name='Split Mesh by Materials',
@@ -175,3 +187,12 @@ def prop_omf_high_quality():
     return bpy.props.BoolProperty(
         name='High Quality', default=False
     )
+
+
+def prop_omf_incremental():
+    return bpy.props.BoolProperty(
+        name='Incremental',
+        description='Bake only changed actions, unchanged motions ' \
+            'are copied from the previously exported file',
+        default=False
+    )
@@ -3,7 +3,7 @@ import os
 
 # blender modules
 import bpy
-import bmesh
+import numpy
 
 # addon modules
 from . import fmt
@@ -15,13 +15,125 @@ from .. import version_utils
 from .. import xray_io
 
 
+# triangle records
+TRIANGLE_DTYPE_V4 = numpy.dtype([
+    ('verts', '<u4', 3),
+    ('material', '<u2'),
+    ('sector', '<u2')
+])
+TRIANGLE_DTYPE_V2 = numpy.dtype([
+    ('verts', '<u4', 3),
+    ('unknown', '<u4', 3),
+    ('unknown_2', '<u2'),
+    ('sector', '<u2'),
+    ('material', '<u4')
+])
+
+
+def read_triangles(packed_reader, version, tris_count):
+    if version == fmt.CFORM_VERSION_4:
+        tris = packed_reader.get_array(TRIANGLE_DTYPE_V4, tris_count)
+        material = tris['material']
+        # 14 bit material id
+        mat_ids = material & 0x3fff
+        # 15 bit suppress shadows
+        shadows = (material & 0x4000) != 0
+        # 16 bit suppress wallmarks
+        wallmarks = (material & 0x8000) != 0
+    else:
+        tris = packed_reader.get_array(TRIANGLE_DTYPE_V2, tris_count)
+        mat_ids = tris['material']
+        shadows = numpy.zeros(tris_count, dtype=bool)
+        wallmarks = numpy.zeros(tris_count, dtype=bool)
+    return tris['verts'], mat_ids, shadows, wallmarks, tris['sector']
+
+
+def partition_sectors(tris_sectors, sectors_ids):
+    # triangle indices of each sector in file order
+    order = numpy.argsort(tris_sectors, kind='mergesort')
+    sectors, starts = numpy.unique(tris_sectors[order], return_index=True)
+    ends = numpy.append(starts[1 : ], len(order))
+    sectors_tris = {
+        sector: numpy.empty(0, dtype=numpy.int64)
+        for sector in sectors_ids
+    }
+    for sector, start, end in zip(sectors.tolist(), starts, ends):
+        if sector not in sectors_tris:
+            raise KeyError(sector)
+        sectors_tris[sector] = order[start : end]
+    return sectors_tris
+
+
+def split_faces(faces):
+    # Returns mask of faces that can be created in one mesh.
+    # Degenerate faces and repeated faces are rejected.
+    valid = (
+        (faces[ : , 0] != faces[ : , 1]) &
+        (faces[ : , 1] != faces[ : , 2]) &
+        (faces[ : , 0] != faces[ : , 2])
+    )
+    created = numpy.zeros(len(faces), dtype=bool)
+    valid_indices = numpy.flatnonzero(valid)
+    if len(valid_indices):
+        _, first, _ = utils.unique_rows(numpy.sort(faces[valid_indices], axis=1))
+        created[valid_indices[first]] = True
+    return created
+
+
+def create_sector_geometry(verts, tris_verts, faces_mats):
+    # faces which are failed, are created with separate
+    # vertices as two sided faces
+    sector_verts, faces = numpy.unique(tris_verts, return_inverse=True)
+    faces = faces.reshape(-1, 3)[ : , (0, 2, 1)]
+    created = split_faces(faces)
+
+    failed = ~created
+    verts_2, faces_2 = numpy.unique(tris_verts[failed], return_inverse=True)
+    faces_2 = faces_2.reshape(-1, 3)[ : , (0, 2, 1)] + len(sector_verts)
+    created_2 = split_faces(faces_2)
+
+    verts_co = verts[numpy.concatenate((sector_verts, verts_2))][ : , (0, 2, 1)]
+    faces = numpy.vstack((faces[created], faces_2[created_2]))
+    faces_mats = numpy.concatenate((
+        faces_mats[created],
+        faces_mats[failed][created_2]
+    ))
+    return verts_co, faces, faces_mats
+
+
+def create_mesh(bpy_mesh, verts_co, faces, faces_mats):
+    faces_count = len(faces)
+    loops_count = faces_count * 3
+    bpy_mesh.vertices.add(len(verts_co))
+    bpy_mesh.vertices.foreach_set('co', verts_co.ravel())
+    bpy_mesh.loops.add(loops_count)
+    bpy_mesh.loops.foreach_set('vertex_index', faces.ravel())
+    bpy_mesh.polygons.add(faces_count)
+    bpy_mesh.polygons.foreach_set(
+        'loop_start', numpy.arange(0, loops_count, 3, dtype=numpy.int32)
+    )
+    bpy_mesh.polygons.foreach_set(
+        'loop_total', numpy.full(faces_count, 3, dtype=numpy.int32)
+    )
+    bpy_mesh.polygons.foreach_set('material_index', faces_mats)
+    bpy_mesh.polygons.foreach_set(
+        'use_smooth', numpy.ones(faces_count, dtype=bool)
+    )
+    bpy_mesh.update(calc_edges=True)
+
+
+def get_material_signature(bpy_material):
+    xray = bpy_material.xray
+    return xray.gamemtl, xray.suppress_shadows, xray.suppress_wm
+
+
 def import_main(context, level, data=None):
     preferences = version_utils.get_preferences()
 
     # read level.cform file
     if level.xrlc_version >= fmt.VERSION_10:
         cform_path = os.path.join(level.path, 'level.cform')
-        data = utils.read_file(cform_path)
+        data = xray_io.map_file(cform_path)
     else:
         cform_path = level.file
 
@@ -44,88 +156,36 @@ def import_main(context, level, data=None):
     verts.shape = (verts.shape[0] // 3, 3)
 
     # read game materials
-    gamemtl_file_path = preferences.gamemtl_file_auto
+    gamemtl = utils.ENGINE_DATA.get(
+        preferences.gamemtl_file_auto, utils.parse_gamemtl
+    )
     game_mtl_names = {}
-    if os.path.exists(gamemtl_file_path):
-        gmtl_data = utils.read_file(gamemtl_file_path)
-        for gmtl_name, _, gmtl_id in utils.parse_gamemtl(gmtl_data):
-            game_mtl_names[gmtl_id] = gmtl_name
+    if gamemtl:
+        game_mtl_names = gamemtl.id_to_name
 
     # read tris
-    sectors_tris = {}
-    sectors_verts = {}
-    sectors_mats = {}    # unique sectors materials
-    for sector_index in level.sectors_objects.keys():
-        sectors_tris[sector_index] = []
-        sectors_verts[sector_index] = set()
-        sectors_mats[sector_index] = set()
-    tris = [None, ] * tris_count
-    unique_materials = set()
-
-    # faces in version 4
-    if version == fmt.CFORM_VERSION_4:
-        prep = packed_reader.prep('3I2H')
-        for tris_index in range(tris_count):
-            vert_1, vert_2, vert_3, mat, sector = packed_reader.getp(prep)
-            # 14 bit material id
-            mat_id = mat & 0x3fff
-            # 15 bit suppress shadows
-            shadows = bool(mat & 0x4000)
-            # 16 bit suppress wallmarks
-            wallmarks = bool(mat & 0x8000)
-            tris[tris_index] = (
-                vert_1, vert_2, vert_3,
-                mat_id, shadows, wallmarks
-            )
-            unique_materials.add((mat_id, shadows, wallmarks))
-            sectors_tris[sector].append(tris_index)
-            sectors_verts[sector].update((vert_1, vert_2, vert_3))
-            sectors_mats[sector].add((mat_id, shadows, wallmarks))
-
-    # faces in version 2 or 3
-    elif version in (fmt.CFORM_VERSION_2, fmt.CFORM_VERSION_3):
-        prep = packed_reader.prep('6I2HI')
-        for tris_index in range(tris_count):
-            (
-                vert_1, vert_2, vert_3,
-                _, _, _, _,
-                sector, mat_id
-            ) = packed_reader.getp(prep)
-            shadows = False
-            wallmarks = False
-            tris[tris_index] = (
-                vert_1, vert_2, vert_3,
-                mat_id, shadows, wallmarks
-            )
-            unique_materials.add((mat_id, shadows, wallmarks))
-            sectors_tris[sector].append(tris_index)
-            sectors_verts[sector].update((vert_1, vert_2, vert_3))
-            sectors_mats[sector].add((mat_id, shadows, wallmarks))
-
-    # sector sets to lists
-    for sector_index in sectors_tris.keys():
-        sectors_mats[sector_index] = list(sectors_mats[sector_index])
-        sectors_verts[sector_index] = list(sectors_verts[sector_index])
+    tris_verts, mat_ids, shadows, wallmarks, tris_sectors = read_triangles(
+        packed_reader, version, tris_count
+    )
+    sectors_tris = partition_sectors(tris_sectors, level.sectors_objects.keys())
+
+    # unique materials
+    materials = numpy.column_stack((mat_ids, shadows, wallmarks))
+    unique_materials, _, materials_indices = utils.unique_rows(materials)
+    unique_materials = [
+        (mat_id, bool(shadows), bool(wallmarks))
+        for mat_id, shadows, wallmarks in unique_materials.tolist()
+    ]
 
     # create bpy materials
-    bpy_materials = {}
+    bpy_materials = []
+    material_index = context.material_index(get_material_signature)
     for mat_id, shadows, wallmarks in unique_materials:
         gmtl = game_mtl_names.get(mat_id, str(mat_id))
         mat_name = '{0}_{1}_{2}'.format(gmtl, int(shadows), int(wallmarks))
 
         # search material
-        material = None
-        for bpy_mat in bpy.data.materials:
-            if not bpy_mat.name.startswith(mat_name):
-                continue
-            xray = bpy_mat.xray
-            if not xray.gamemtl == gamemtl_name:
-                continue
-            if not xray.suppress_shadows == shadows:
-                continue
-            if not xray.suppress_wm == wallmarks:
-                continue
-            material = bpy_mat
+        material = material_index.find(mat_name, (gmtl, shadows, wallmarks))
 
         # create material
         if not material:
@@ -136,79 +196,30 @@ def import_main(context, level, data=None):
             material.xray.gamemtl = gmtl
             material.xray.suppress_shadows = shadows
             material.xray.suppress_wm = wallmarks
+            material_index.add(material)
 
-        bpy_materials[mat_id] = material
+        bpy_materials.append(material)
 
     # create geometry
     for sector, triangles in sectors_tris.items():
-        # create verts
-        sector_verts = sectors_verts[sector]
-        bm = bmesh.new()
-        remap_verts = {}
-        for remap_vertex_index, vert_index in enumerate(sector_verts):
-            vert_co = verts[vert_index]
-            bm.verts.new((vert_co[0], vert_co[2], vert_co[1]))
-            remap_verts[vert_index] = remap_vertex_index
-        verts_count = remap_vertex_index + 1
-        bm.verts.ensure_lookup_table()
-        bm.verts.index_update()
-
-        # create tris
-        tris_2 = []    # two sided tris
-        verts_2 = set()    # two sided verts
-        for tris_index in triangles:
-            vert_1, vert_2, vert_3, mat_id, shadow, wm = tris[tris_index]
-            try:
-                face = bm.faces.new((
-                    bm.verts[remap_verts[vert_1]],
-                    bm.verts[remap_verts[vert_3]],
-                    bm.verts[remap_verts[vert_2]]
-                ))
-                material = sectors_mats[sector].index((mat_id, shadow, wm))
-                face.material_index = material
-                face.smooth = True
-            except ValueError:
-                face = None
-                tris_2.append((vert_1, vert_2, vert_3, mat_id, shadow, wm))
-                verts_2.update((vert_1, vert_2, vert_3))
-
-        # create two sided verts
-        remap_vertices = {}
-        for remap_vert_index, vertex_index in enumerate(verts_2):
-            vert_co = verts[vertex_index]
-            bm.verts.new((vert_co[0], vert_co[2], vert_co[1]))
-            remap_vertices[vertex_index] = remap_vert_index + verts_count
-        bm.verts.ensure_lookup_table()
-        bm.verts.index_update()
-
-        # create two sided tris
-        for vert_1, vert_2, vert_3, mat_id, shadow, wm in tris_2:
-            try:
-                face = bm.faces.new((
-                    bm.verts[remap_vertices[vert_1]],
-                    bm.verts[remap_vertices[vert_3]],
-                    bm.verts[remap_vertices[vert_2]]
-                ))
-                mat = sectors_mats[sector].index((mat_id, shadow, wm))
-                face.material_index = mat
-                face.smooth = True
-            except ValueError:    # face already exists
-                pass
-        bm.faces.ensure_lookup_table()
-        bm.faces.index_update()
-        bm.normal_update()
+        sector_mats, faces_mats = numpy.unique(
+            materials_indices[triangles],
+            return_inverse=True
+        )
+        verts_co, faces, faces_mats = create_sector_geometry(
+            verts, tris_verts[triangles], faces_mats.ravel()
+        )
 
         # create mesh
         obj_name = 'cform_{:0>3}'.format(sector)
         bpy_mesh = bpy.data.meshes.new(obj_name)
+        create_mesh(bpy_mesh, verts_co, faces, faces_mats)
 
         # append materials
-        for mat_id, _, _ in sectors_mats[sector]:
-            bpy_material = bpy_materials[mat_id]
-            bpy_mesh.materials.append(bpy_material)
+        for unique_index in sector_mats.tolist():
+            bpy_mesh.materials.append(bpy_materials[unique_index])
 
         # create object
-        bm.to_mesh(bpy_mesh)
         bpy_obj = bpy.data.objects.new(obj_name, bpy_mesh)
         bpy_obj.parent = level.sectors_objects[sector]
         bpy_obj.xray.is_level = True
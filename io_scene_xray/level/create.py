@@ -10,6 +10,7 @@ from . import fmt
 from . import utility
 from .. import log
 from .. import text
+from .. import utils
 from .. import version_utils
 
 
@@ -261,13 +262,12 @@ def create_image(context, texture, absolute_texture_path):
     except RuntimeError:    # e.g. 'Error: Cannot read ...'
         bpy_image = load_image_from_level_folder(context, texture, absolute_texture_path)
     bpy_image.use_fake_user = True
+    utils.IMAGES.add(bpy_image)
     return bpy_image
 
 
 def search_image(context, texture, absolute_texture_path):
-    for bpy_image in bpy.data.images:
-        if is_same_image_paths(bpy_image, absolute_texture_path):
-            return bpy_image
+    return utils.IMAGES.find(absolute_texture_path)
 
 
 def find_image_lmap(context, lmap, level_dir):
@@ -385,19 +385,30 @@ def is_same_image(context, bpy_material, texture):
             return bpy_image
 
 
+def get_material_signature(bpy_material):
+    return (bpy_material.xray.eshader, )
+
+
+def is_same_material(context, bpy_material, texture, light_maps):
+    if not is_same_image(context, bpy_material, texture):
+        return False
+    if not is_same_light_maps(context, bpy_material, light_maps):
+        return False
+    return True
+
+
 def search_material(context, texture, engine_shader, *light_maps):
-    for material in bpy.data.materials:
-        if not material.name.startswith(texture):
-            continue
-        if material.xray.eshader != engine_shader:
-            continue
-        image = is_same_image(context, material, texture)
-        if not image:
-            continue
-        if not is_same_light_maps(context, material, light_maps):
-            continue
-        return material, image
-    return None, None
+    material_index = context.material_index(get_material_signature)
+    material = material_index.find(
+        texture,
+        (engine_shader, ),
+        lambda bpy_material: is_same_material(
+            context, bpy_material, texture, light_maps
+        )
+    )
+    if material is None:
+        return None, None
+    return material, is_same_image(context, material, texture)
 
 
 def set_material_settings(bpy_material):
@@ -464,4 +475,5 @@ def get_material(level, context, texture, engine_shader, *light_maps):
             engine_shader,
             *light_maps
         )
+        context.material_index(get_material_signature).add(bpy_material)
     return bpy_material, bpy_image
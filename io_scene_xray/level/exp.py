@@ -1,15 +1,19 @@
 # standart modules
 import os
 import math
+import time
 import struct
+from concurrent import futures
 
 # blender modules
 import bpy
 import bmesh
 import mathutils
+import numpy
 
 # addon modules
 from . import fmt
+from . import cform
 from .. import text
 from .. import utils
 from .. import log
@@ -91,14 +95,57 @@ def write_level_geom_ib(ibs):
         indices_count = len(ib) // 2    # index size = 2 byte
         packed_writer.putf('<I', indices_count)    # indices count
 
-        for index in range(0, indices_count, 3):
-            packed_writer.data.extend(ib[index * 2 : index * 2 + 2])
-            packed_writer.data.extend(ib[index * 2 + 4 : index * 2 + 6])
-            packed_writer.data.extend(ib[index * 2 + 2 : index * 2 + 4])
+        indices = numpy.frombuffer(ib, dtype='<u2').reshape(-1, 3)
+        packed_writer.data += indices[ : , (0, 2, 1)].tobytes()
 
     return packed_writer
 
 
+def get_vertex_buffer_array(vb, size):
+    data = numpy.frombuffer(vb, dtype=numpy.uint8)
+    return data.reshape(-1, size)
+
+
+def pack_vertices(vb):
+    if vb.vertex_format == 'FASTPATH':
+        return bytes(vb.position)
+
+    vertices = numpy.zeros((vb.vertex_count, 32), dtype=numpy.uint8)
+    uv_fix = get_vertex_buffer_array(vb.uv_fix, 2)
+    vertices[ : , 0 : 12] = get_vertex_buffer_array(vb.position, 12)
+    # normal, hemi
+    vertices[ : , 12 : 15] = get_vertex_buffer_array(vb.normal, 3)
+    vertices[ : , 15] = numpy.frombuffer(vb.color_hemi, dtype=numpy.uint8)
+    # tangent
+    vertices[ : , 16 : 19] = get_vertex_buffer_array(vb.tangent, 3)
+    vertices[ : , 19] = uv_fix[ : , 0]
+    # binormal
+    vertices[ : , 20 : 23] = get_vertex_buffer_array(vb.binormal, 3)
+    vertices[ : , 23] = uv_fix[ : , 1]
+
+    if vb.vertex_format == 'NORMAL':
+        # texture coordinate
+        vertices[ : , 24 : 28] = get_vertex_buffer_array(vb.uv, 4)
+        # light map texture coordinate
+        vertices[ : , 28 : 32] = get_vertex_buffer_array(vb.uv_lmap, 4)
+
+    elif vb.vertex_format == 'TREE':
+        # texture coordinate
+        vertices[ : , 24 : 28] = get_vertex_buffer_array(vb.uv, 4)
+        # tree shader data (wind coefficient and unused 2 bytes)
+        if vb.shader_data:
+            vertices[ : , 28 : 30] = get_vertex_buffer_array(vb.shader_data, 2)
+
+    elif vb.vertex_format == 'COLOR':
+        # vertex color
+        vertices[ : , 24 : 27] = get_vertex_buffer_array(vb.color_light, 3)
+        vertices[ : , 27] = numpy.frombuffer(vb.color_sun, dtype=numpy.uint8)
+        # texture coordinate
+        vertices[ : , 28 : 32] = get_vertex_buffer_array(vb.uv, 4)
+
+    return vertices.tobytes()
+
+
 def write_level_geom_vb(vbs):
     packed_writer = xray_io.PackedWriter()
 
@@ -140,118 +187,7 @@ def write_level_geom_vb(vbs):
         packed_writer.putf('<B', 0)    # usage_index
 
         packed_writer.putf('<I', vb.vertex_count)    # vertices count
-
-        if vb.vertex_format == 'NORMAL':
-            for vertex_index in range(vb.vertex_count):
-                vertex_pos = vb.position[vertex_index * 12 : vertex_index * 12 + 12]
-                packed_writer.data.extend(vertex_pos)
-                packed_writer.putf(
-                    '<4B',
-                    vb.normal[vertex_index * 3],
-                    vb.normal[vertex_index * 3 + 1],
-                    vb.normal[vertex_index * 3 + 2],
-                    vb.color_hemi[vertex_index]
-                )    # normal, hemi
-                uv_fix = vb.uv_fix[vertex_index * 2 : vertex_index * 2 + 2]
-                # tangent
-                packed_writer.putf(
-                    '<4B',
-                    vb.tangent[vertex_index * 3],
-                    vb.tangent[vertex_index * 3 + 1],
-                    vb.tangent[vertex_index * 3 + 2],
-                    uv_fix[0]
-                )
-                # binormal
-                packed_writer.putf(
-                    '<4B',
-                    vb.binormal[vertex_index * 3],
-                    vb.binormal[vertex_index * 3 + 1],
-                    vb.binormal[vertex_index * 3 + 2],
-                    uv_fix[1]
-                )
-                # texture coordinate
-                packed_writer.data.extend(vb.uv[vertex_index * 4 : vertex_index * 4 + 4])
-                # light map texture coordinate
-                packed_writer.data.extend(vb.uv_lmap[vertex_index * 4 : vertex_index * 4 + 4])
-
-        elif vb.vertex_format == 'TREE':
-            for vertex_index in range(vb.vertex_count):
-                vertex_pos = vb.position[vertex_index * 12 : vertex_index * 12 + 12]
-                packed_writer.data.extend(vertex_pos)
-                packed_writer.putf(
-                    '<4B',
-                    vb.normal[vertex_index * 3],
-                    vb.normal[vertex_index * 3 + 1],
-                    vb.normal[vertex_index * 3 + 2],
-                    vb.color_hemi[vertex_index]
-                )    # normal, hemi
-                uv_fix = vb.uv_fix[vertex_index * 2 : vertex_index * 2 + 2]
-                # tangent
-                packed_writer.putf(
-                    '<4B',
-                    vb.tangent[vertex_index * 3],
-                    vb.tangent[vertex_index * 3 + 1],
-                    vb.tangent[vertex_index * 3 + 2],
-                    uv_fix[0]
-                )
-                # binormal
-                packed_writer.putf(
-                    '<4B',
-                    vb.binormal[vertex_index * 3],
-                    vb.binormal[vertex_index * 3 + 1],
-                    vb.binormal[vertex_index * 3 + 2],
-                    uv_fix[1]
-                )
-                # texture coordinate
-                packed_writer.data.extend(vb.uv[vertex_index * 4 : vertex_index * 4 + 4])
-                # tree shader data (wind coefficient and unused 2 bytes)
-                frac = vb.shader_data[vertex_index * 2 : vertex_index * 2 + 2]
-                frac.extend((0, 0))
-                packed_writer.data.extend(frac)
-
-        elif vb.vertex_format == 'COLOR':
-            for vertex_index in range(vb.vertex_count):
-                vertex_pos = vb.position[vertex_index * 12 : vertex_index * 12 + 12]
-                packed_writer.data.extend(vertex_pos)
-                packed_writer.putf(
-                    '<4B',
-                    vb.normal[vertex_index * 3],
-                    vb.normal[vertex_index * 3 + 1],
-                    vb.normal[vertex_index * 3 + 2],
-                    vb.color_hemi[vertex_index]
-                )    # normal, hemi
-                uv_fix = vb.uv_fix[vertex_index * 2 : vertex_index * 2 + 2]
-                # tangent
-                packed_writer.putf(
-                    '<4B',
-                    vb.tangent[vertex_index * 3],
-                    vb.tangent[vertex_index * 3 + 1],
-                    vb.tangent[vertex_index * 3 + 2],
-                    uv_fix[0]
-                )
-                # binormal
-                packed_writer.putf(
-                    '<4B',
-                    vb.binormal[vertex_index * 3],
-                    vb.binormal[vertex_index * 3 + 1],
-                    vb.binormal[vertex_index * 3 + 2],
-                    uv_fix[1]
-                )
-                # vertex color
-                packed_writer.putf(
-                    '<4B',
-                    vb.color_light[vertex_index * 3],
-                    vb.color_light[vertex_index * 3 + 1],
-                    vb.color_light[vertex_index * 3 + 2],
-                    vb.color_sun[vertex_index]
-                )
-                # texture coordinate
-                packed_writer.data.extend(vb.uv[vertex_index * 4 : vertex_index * 4 + 4])
-
-        elif vb.vertex_format == 'FASTPATH':
-            for vertex_index in range(vb.vertex_count):
-                vertex_pos = vb.position[vertex_index * 12 : vertex_index * 12 + 12]
-                packed_writer.data.extend(vertex_pos)
+        packed_writer.data += pack_vertices(vb)
 
     return packed_writer
 
@@ -452,11 +388,11 @@ def get_bbox_center(bbox):
     return bbox_center
 
 
-def find_distance(vertex_1, vertex_2):
+def find_distance(vertices, vertex):
     distance = (
-        (vertex_2[0] - vertex_1[0]) ** 2 + \
-        (vertex_2[1] - vertex_1[1]) ** 2 + \
-        (vertex_2[2] - vertex_1[2]) ** 2
+        (vertex[0] - vertices[ : , 0]) ** 2 + \
+        (vertex[1] - vertices[ : , 1]) ** 2 + \
+        (vertex[2] - vertices[ : , 2]) ** 2
     ) ** (1 / 2)
     return distance
 
@@ -465,31 +401,84 @@ MAX_TILE = 16
 QUANT = 32768 / MAX_TILE
 
 
-def clamp(value, min_value, max_value):
-    if value > max_value:
-        value = max_value
-    elif value < min_value:
-        value = min_value
-    return value
-
-
-def quant_value(float_value):
-    return clamp(
-        int(float_value * QUANT),
+def quant_value(float_values):
+    return numpy.clip(
+        numpy.trunc(float_values * QUANT),
         -32768,
         32767
-    )
+    ).astype(numpy.int64)
 
 
 def get_tex_coord_correct(tex_coord_f, tex_coord_h, uv_coeff):
-    if tex_coord_f > 0:
-        tex_coord_diff = tex_coord_f - (tex_coord_h / uv_coeff)
-    else:
-        tex_coord_diff = (1 + (tex_coord_f * uv_coeff - tex_coord_h)) / uv_coeff
-        tex_coord_h -= 1
+    positive = tex_coord_f > 0
+    tex_coord_diff = numpy.where(
+        positive,
+        tex_coord_f - (tex_coord_h / uv_coeff),
+        (1 + (tex_coord_f * uv_coeff - tex_coord_h)) / uv_coeff
+    )
+    tex_coord_h = numpy.where(positive, tex_coord_h, tex_coord_h - 1)
 
     tex_correct = (255 * 0x8000 * tex_coord_diff) / 32
-    return int(round(tex_correct, 0)), tex_coord_h
+    return numpy.round(tex_correct).astype(numpy.int64), tex_coord_h
+
+
+def check_range(values, min_value, max_value, bpy_obj, uv_layer):
+    # NaN values are out of range too
+    if len(values) and not (
+            (values >= min_value) & (values <= max_value)
+        ).all():
+        raise utils.AppError(
+            text.error.level_bad_uv,
+            log.props(
+                object=bpy_obj.name,
+                uv_map=uv_layer.name
+            )
+        )
+
+
+def quantize_vectors(vectors):
+    # float [-1.0, 1.0] to byte [0, 255] in x-ray axes order
+    vectors = vectors.astype(numpy.float64)
+    quantized = numpy.round(((vectors + 1.0) / 2) * 255)
+    return quantized.astype(numpy.uint8)[ : , (1, 2, 0)]
+
+
+def quantize_colors(colors):
+    return numpy.round(colors.astype(numpy.float64) * 255).astype(numpy.uint8)
+
+
+def normalize_vectors(vectors):
+    # repeats single precision mathutils.Vector.normalized()
+    squares = (vectors * vectors).astype(numpy.float64)
+    lengths_squared = squares[ : , 2] + squares[ : , 1] + squares[ : , 0]
+    lengths = numpy.sqrt(lengths_squared).astype(numpy.float32)
+    normalized = numpy.zeros_like(vectors)
+    valid = lengths_squared > 1.0e-35
+    factors = numpy.float32(1.0) / lengths[valid]
+    normalized[valid] = vectors[valid] * factors[ : , None]
+    return normalized
+
+
+def get_loops_uvs(export_mesh, layer_name, loops_count):
+    uvs = numpy.empty(loops_count * 2, dtype=numpy.float32)
+    export_mesh.uv_layers[layer_name].data.foreach_get('uv', uvs)
+    return uvs.reshape(loops_count, 2)
+
+
+def get_loops_colors(export_mesh, layer_name, loops_count):
+    if version_utils.IS_28:
+        color_size = 4
+    else:
+        color_size = 3
+    colors = numpy.empty(loops_count * color_size, dtype=numpy.float32)
+    export_mesh.vertex_colors[layer_name].data.foreach_get('color', colors)
+    return colors.reshape(loops_count, color_size)
+
+
+def get_loops_vectors(export_mesh, prop_name, loops_count):
+    vectors = numpy.empty(loops_count * 3, dtype=numpy.float32)
+    export_mesh.loops.foreach_get(prop_name, vectors)
+    return vectors.reshape(loops_count, 3)
 
 
 def write_gcontainer(bpy_obj, vbs, ibs, level):
@@ -586,166 +575,137 @@ def write_gcontainer(bpy_obj, vbs, ibs, level):
         level.ibs_offsets.append(ib_offset)
         indices_buffer_index = 0
 
-    vertices_count = 0
-    indices_count = 0
-    vertex_index = 0
+    loops_count = len(export_mesh.loops)
+    loops_vertices = numpy.empty(loops_count, dtype=numpy.int32)
+    export_mesh.loops.foreach_get('vertex_index', loops_vertices)
+    vertices_co = numpy.empty(len(export_mesh.vertices) * 3, dtype=numpy.float32)
+    export_mesh.vertices.foreach_get('co', vertices_co)
+    loops_co = vertices_co.reshape(-1, 3)[loops_vertices]
+    normals = get_loops_vectors(export_mesh, 'normal', loops_count)
+    tangents = get_loops_vectors(export_mesh, 'tangent', loops_count)
+    uvs = get_loops_uvs(export_mesh, uv_layer.name, loops_count)
+    # UV-LightMaps
+    if uv_layer_lmap:
+        uvs_lmap = get_loops_uvs(export_mesh, uv_layer_lmap.name, loops_count)
+    else:
+        uvs_lmap = numpy.zeros((loops_count, 2), dtype=numpy.float32)
+    # Vertex Color Hemi
+    if vertex_color_hemi:
+        hemi = get_loops_colors(
+            export_mesh, vertex_color_hemi.name, loops_count
+        )[ : , 0]
+    else:
+        hemi = numpy.zeros(loops_count, dtype=numpy.float32)
+    # Vertex Color Sun
+    if vertex_color_sun:
+        sun = get_loops_colors(
+            export_mesh, vertex_color_sun.name, loops_count
+        )[ : , 0]
+    else:
+        sun = numpy.zeros(loops_count, dtype=numpy.float32)
+    # Vertex Color Light
+    if vertex_color_light:
+        light = get_loops_colors(
+            export_mesh, vertex_color_light.name, loops_count
+        )
+    else:
+        light = numpy.zeros((loops_count, 3), dtype=numpy.float32)
+
+    # unique vertices in order of first usage,
+    # adding 0.0 merges negative zeros with positive zeros
+    records = numpy.column_stack((
+        loops_co, uvs, uvs_lmap, normals, hemi, sun, light
+    )) + 0.0
+    _, first_index, inverse = utils.unique_rows(records)
+    order = numpy.argsort(first_index)
+    loops = first_index[order]
+    remap = numpy.empty(len(order), dtype=numpy.int64)
+    remap[order] = numpy.arange(len(order))
+    vertices_count = len(loops)
+    indices_count = loops_count
+    if vertices_count > fmt.VERTICES_COUNT_LIMIT:
+        raise utils.AppError(
+            text.error.level_many_verts,
+            log.props(
+                object=bpy_obj.name,
+                vertices_count=vertices_count,
+                must_be_no_more_than=fmt.VERTICES_COUNT_LIMIT
+            )
+        )
 
-    unique_verts = {}
-    verts_indices = {}
-    for face in bm.faces:
-        for loop in face.loops:
-            vert = loop.vert
-            vert_co = (vert.co[0], vert.co[1], vert.co[2])
-            split_normal = export_mesh.loops[loop.index].normal
-            normal = (split_normal[0], split_normal[1], split_normal[2])
-            uv = loop[uv_layer].uv[0], loop[uv_layer].uv[1]
-            # UV-LightMaps
-            if uv_layer_lmap:
-                uv_lmap = loop[uv_layer_lmap].uv[0], loop[uv_layer_lmap].uv[1]
-            else:
-                uv_lmap = (0.0, 0.0)
-            # Vertex Color Hemi
-            if vertex_color_hemi:
-                hemi = loop[vertex_color_hemi][0]
-            else:
-                hemi = 0
-            # Vertex Color Sun
-            if vertex_color_sun:
-                sun = loop[vertex_color_sun][0]
-            else:
-                sun = 0
-            # Vertex Color Light
-            if vertex_color_light:
-                light = loop[vertex_color_light]
-            else:
-                light = (0, 0, 0)
-            if unique_verts.get(vert_co, None):
-                if not (uv, uv_lmap, normal, hemi, sun, light) in unique_verts[vert_co]:
-                    unique_verts[vert_co].append((uv, uv_lmap, normal, hemi, sun, light))
-                    verts_indices[vert_co].append(vertex_index)
-                    vertex_index += 1
-            else:
-                unique_verts[vert_co] = [(uv, uv_lmap, normal, hemi, sun, light), ]
-                verts_indices[vert_co] = [vertex_index, ]
-                vertex_index += 1
+    # indices
+    ib.extend(remap[inverse].astype('<u2').tobytes())
+
+    # vertices
+    vb.vertex_count += vertices_count
+    vertices_co = loops_co[loops]
+    vb.position.extend(vertices_co[ : , (0, 2, 1)].astype('<f4').tobytes())
+    normals = normals[loops]
+    tangents = tangents[loops]
+    binormals = normalize_vectors(numpy.cross(normals, tangents))
+    vb.normal.extend(quantize_vectors(normals).tobytes())
+    vb.tangent.extend(quantize_vectors(tangents).tobytes())
+    vb.binormal.extend(quantize_vectors(binormals).tobytes())
+    # vertex color light
+    vb.color_hemi.extend(quantize_colors(hemi[loops]).tobytes())
+    if vertex_color_sun:
+        vb.color_sun.extend(quantize_colors(sun[loops]).tobytes())
+        light = light[loops][ : , (2, 1, 0)]
+        vb.color_light.extend(quantize_colors(light).tobytes())
 
-    vertex_index = 0
-    saved_verts = set()
+    # uv
     if uv_layer_lmap or vertex_color_sun:
         uv_coeff = fmt.UV_COEFFICIENT
     else:
         uv_coeff = fmt.UV_COEFFICIENT_2
-    # tree shader params
-    frac_low = get_bbox_center(bpy_obj.bound_box)
-    frac_low[2] = bpy_obj.bound_box[0][2]
-    frac_y_size = bpy_obj.bound_box[6][2] - bpy_obj.bound_box[0][2]
-    for face in bm.faces:
-        for loop in face.loops:
-            vert = loop.vert
-            vert_co = (vert.co[0], vert.co[1], vert.co[2])
-            vert_data = unique_verts[vert_co]
-            uv = loop[uv_layer].uv
-            split_normal = export_mesh.loops[loop.index].normal
-            if uv_layer_lmap:
-                uv_lmap = loop[uv_layer_lmap].uv
-            else:
-                uv_lmap = (0.0, 0.0)
-            # Vertex Color Hemi
-            if vertex_color_hemi:
-                hemi = loop[vertex_color_hemi][0]
-            else:
-                hemi = 0
-            # Vertex Color Sun
-            if vertex_color_sun:
-                sun = loop[vertex_color_sun][0]
-            else:
-                sun = 0
-            # Vertex Color Light
-            if vertex_color_light:
-                light = loop[vertex_color_light]
-            else:
-                light = (0, 0, 0)
-            for index, data in enumerate(vert_data):
-                if data[0] == (uv[0], uv[1]) and \
-                        data[1] == (uv_lmap[0], uv_lmap[1]) and \
-                        data[2] == (split_normal[0], split_normal[1], split_normal[2]) and \
-                        data[3] == hemi and data[4] == sun and data[5] == light:
-                    tex_uv, tex_uv_lmap, normal, hemi, sun, light = data
-                    vert_index = verts_indices[vert_co][index]
-                    break
-            packed_vertex_index = struct.pack('<H', vert_index)
-            ib.extend(packed_vertex_index)
-            indices_count += 1
-            if not vert_index in saved_verts:
-                vb.vertex_count += 1
-                saved_verts.add(vert_index)
-                vertex_index += 1
-                vertices_count += 1
-                packed_co = struct.pack('<3f', vert.co[0], vert.co[2], vert.co[1])
-                vb.position.extend(packed_co)
-                vb.normal.extend((
-                    int(round(((normal[1] + 1.0) / 2) * 255, 0)),
-                    int(round(((normal[2] + 1.0) / 2) * 255, 0)),
-                    int(round(((normal[0] + 1.0) / 2) * 255, 0))
-                ))
-                tangent = export_mesh.loops[loop.index].tangent
-                vb.tangent.extend((
-                    int(round(((tangent[1] + 1.0) / 2) * 255, 0)),
-                    int(round(((tangent[2] + 1.0) / 2) * 255, 0)),
-                    int(round(((tangent[0] + 1.0) / 2) * 255, 0))
-                ))
-                normal = mathutils.Vector(normal)
-                binormal = normal.cross(tangent).normalized()
-                vb.binormal.extend((
-                    int(round(((binormal[1] + 1.0) / 2) * 255, 0)),
-                    int(round(((binormal[2] + 1.0) / 2) * 255, 0)),
-                    int(round(((binormal[0] + 1.0) / 2) * 255, 0))
-                ))
-                # vertex color light
-                vb.color_hemi.append(int(round(hemi * 255, 0)))
-                if vertex_color_sun:
-                    vb.color_sun.append(int(round(sun * 255, 0)))
-                    vb.color_light.extend((
-                        (int(round(light[2] * 255, 0))),
-                        (int(round(light[1] * 255, 0))),
-                        (int(round(light[0] * 255, 0)))
-                    ))
-                # uv
-                tex_coord_u = int(tex_uv[0] * uv_coeff)
-                tex_coord_v = int((1 - tex_uv[1]) * uv_coeff)
-                # uv correct
-                tex_coord_u_correct, tex_coord_u = get_tex_coord_correct(tex_uv[0], tex_coord_u, uv_coeff)
-                tex_coord_v_correct, tex_coord_v = get_tex_coord_correct(1 - tex_uv[1], tex_coord_v, uv_coeff)
-                pw = xray_io.PackedWriter()
-                pw.putf('<2B', tex_coord_u_correct, tex_coord_v_correct)
-
-                # set uv limits
-                if tex_coord_u > 0x7fff:
-                    tex_coord_u = 0x7fff
-                elif tex_coord_u < -0x8000:
-                    tex_coord_u = -0x8000
-
-                if tex_coord_v > 0x7fff:
-                    tex_coord_v = 0x7fff
-                elif tex_coord_v < -0x8000:
-                    tex_coord_v = -0x8000
-
-                packed_uv = struct.pack('<2h', tex_coord_u, tex_coord_v)
-                vb.uv.extend(packed_uv)
-                packed_uv_fix = struct.pack('<2B', tex_coord_u_correct, tex_coord_v_correct)
-                vb.uv_fix.extend(packed_uv_fix)
-                if uv_layer_lmap:
-                    lmap_u = int(round(tex_uv_lmap[0] * fmt.LIGHT_MAP_UV_COEFFICIENT, 0))
-                    lmap_v = int(round((1 - tex_uv_lmap[1]) * fmt.LIGHT_MAP_UV_COEFFICIENT, 0))
-                    packed_uv_lmap = struct.pack('<2h', lmap_u, lmap_v)
-                    vb.uv_lmap.extend(packed_uv_lmap)
-                # tree shader data (wind coefficient)
-                if not (uv_layer_lmap or vertex_color_sun or vertex_color_light):
-                    f1 = (vert.co[2] - frac_low[2]) / frac_y_size
-                    f2 = find_distance(vert.co, frac_low) / frac_y_size
-                    frac = quant_value((f1 + f2) / 2)
-                    packed_shader_data = struct.pack('<H', frac)
-                    vb.shader_data.extend(packed_shader_data)    # wind coefficient
+    tex_uvs = uvs[loops].astype(numpy.float64)
+    tex_coords_u = tex_uvs[ : , 0]
+    tex_coords_v = 1 - tex_uvs[ : , 1]
+    # uv correct
+    tex_coord_u_correct, tex_coord_u = get_tex_coord_correct(
+        tex_coords_u, numpy.trunc(tex_coords_u * uv_coeff), uv_coeff
+    )
+    tex_coord_v_correct, tex_coord_v = get_tex_coord_correct(
+        tex_coords_v, numpy.trunc(tex_coords_v * uv_coeff), uv_coeff
+    )
+    # set uv limits
+    tex_coords = numpy.clip(
+        numpy.column_stack((tex_coord_u, tex_coord_v)),
+        -0x8000,
+        0x7fff
+    )
+    vb.uv.extend(tex_coords.astype('<i2').tobytes())
+    tex_coords_correct = numpy.column_stack((
+        tex_coord_u_correct,
+        tex_coord_v_correct
+    ))
+    check_range(tex_coords_correct, 0, 0xff, bpy_obj, uv_layer)
+    vb.uv_fix.extend(tex_coords_correct.astype(numpy.uint8).tobytes())
+    if uv_layer_lmap:
+        tex_uvs_lmap = uvs_lmap[loops].astype(numpy.float64)
+        lmap_coords = numpy.column_stack((
+            tex_uvs_lmap[ : , 0],
+            1 - tex_uvs_lmap[ : , 1]
+        ))
+        lmap_coords = numpy.round(lmap_coords * fmt.LIGHT_MAP_UV_COEFFICIENT)
+        check_range(lmap_coords, -0x8000, 0x7fff, bpy_obj, uv_layer_lmap)
+        vb.uv_lmap.extend(lmap_coords.astype('<i2').tobytes())
+
+    # tree shader data (wind coefficient)
+    if not (uv_layer_lmap or vertex_color_sun or vertex_color_light):
+        frac_low = get_bbox_center(bpy_obj.bound_box)
+        frac_low[2] = bpy_obj.bound_box[0][2]
+        frac_y_size = bpy_obj.bound_box[6][2] - bpy_obj.bound_box[0][2]
+        vertices_co = vertices_co.astype(numpy.float64)
+        f1 = (vertices_co[ : , 2] - frac_low[2]) / frac_y_size
+        f2 = find_distance(vertices_co, frac_low) / frac_y_size
+        frac = quant_value((f1 + f2) / 2)
+        if len(frac) and frac.min() < 0:
+            raise utils.AppError(
+                text.error.level_bad_wind,
+                log.props(object=bpy_obj.name)
+            )
+        vb.shader_data.extend(frac.astype('<u2').tobytes())
 
     vertex_buffer_index = vbs.index(vb)
     packed_writer.putf('<I', vertex_buffer_index)    # vb_index
@@ -1369,15 +1329,64 @@ def get_bbox(bbox_1, bbox_2, function):
     return (bbox_x, bbox_y, bbox_z)
 
 
-def write_level_cform(packed_writer, level):
+def get_cform_mesh(cform_object):
+    # returns triangulated mesh and flag of temporary mesh
+    mesh = cform_object.data
+    loops_total = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get('loop_total', loops_total)
+    if (loops_total == 3).all():
+        return mesh, False
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bmesh.ops.triangulate(bm, faces=bm.faces)
+    triangulated_mesh = bpy.data.meshes.new(mesh.name)
+    bm.to_mesh(triangulated_mesh)
+    bm.free()
+    return triangulated_mesh, True
+
+
+def get_cform_materials(mesh, game_materials):
+    # cform material of each material slot
+    materials = numpy.zeros(len(mesh.materials), dtype=numpy.uint16)
+    for material_index, material in enumerate(mesh.materials):
+        material_id = game_materials[material.name]
+        suppress_shadows = (int(material.xray.suppress_shadows) << 14) & 0x4000
+        suppress_wm = (int(material.xray.suppress_wm) << 15) & 0x8000
+        materials[material_index] = material_id | suppress_shadows | suppress_wm
+    return materials
+
+
+def get_cform_geometry(cform_object, sector_index, game_materials):
+    mesh, is_temp_mesh = get_cform_mesh(cform_object)
+
+    vertices = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get('co', vertices)
+    vertices = vertices.reshape(-1, 3)[ : , (0, 2, 1)]
+
+    faces_count = len(mesh.polygons)
+    loops_vertices = numpy.empty(len(mesh.loops), dtype=numpy.uint32)
+    mesh.loops.foreach_get('vertex_index', loops_vertices)
+    loops_start = numpy.empty(faces_count, dtype=numpy.int32)
+    mesh.polygons.foreach_get('loop_start', loops_start)
+    materials_indices = numpy.empty(faces_count, dtype=numpy.int32)
+    mesh.polygons.foreach_get('material_index', materials_indices)
+    # temporary triangulated mesh has no material slots
+    materials = get_cform_materials(cform_object.data, game_materials)
+
+    triangles = numpy.empty(faces_count, dtype=cform.TRIANGLE_DTYPE_V4)
+    face_loops = loops_start[ : , None] + numpy.array((0, 2, 1))
+    triangles['verts'] = loops_vertices[face_loops]
+    triangles['material'] = materials[materials_indices]
+    triangles['sector'] = sector_index
+
+    if is_temp_mesh:
+        bpy.data.meshes.remove(mesh)
+
+    return vertices, triangles
+
+
+def get_level_cform(level):
     sectors_count = len(level.cform_objects)
-    cform_header_packed_writer = xray_io.PackedWriter()
-    cform_header_packed_writer.putf('<I', 4)    # version
-    vertices_packed_writer = xray_io.PackedWriter()
-    tris_packed_writer = xray_io.PackedWriter()
-    vertex_index_offset = 0
-    faces_count = 0
-    face_vert_indices = (0, 2, 1)
 
     materials = set()
     bbox_min = None
@@ -1395,21 +1404,22 @@ def write_level_cform(packed_writer, level):
             materials.add(material)
 
     preferences = version_utils.get_preferences()
-    gamemtl_file_path = preferences.gamemtl_file_auto
-    if os.path.exists(gamemtl_file_path):
-        gamemtl_data = utils.read_file(gamemtl_file_path)
-    else:
-        gamemtl_data = b''
-
+    gamemtl = utils.ENGINE_DATA.get(
+        preferences.gamemtl_file_auto, utils.parse_gamemtl
+    )
     game_mtls = {}
-    for game_mtl_name, _, game_mtl_id in utils.parse_gamemtl(gamemtl_data):
-        game_mtls[game_mtl_name] = game_mtl_id
+    if gamemtl:
+        game_mtls = gamemtl.name_to_id
 
     game_materials = {}
     for material in materials:
         gamemtl_id = game_mtls.get(material.xray.gamemtl, 0)
         game_materials[material.name] = gamemtl_id
 
+    vertices = []
+    triangles = []
+    vertex_index_offset = 0
+    faces_count = 0
     for sector_index in range(sectors_count):
         cform_object = level.cform_objects[sector_index]
         if cform_object.type != 'MESH':
@@ -1425,41 +1435,33 @@ def write_level_cform(packed_writer, level):
                 text.error.level_cform_no_geom,
                 log.props(object=cform_object.name)
             )
-        bm = bmesh.new()
-        bm.from_mesh(cform_object.data)
-        bmesh.ops.triangulate(bm, faces=bm.faces)
-        vertices_count = 0
-        for vert in bm.verts:
-            vertices_packed_writer.putf(
-                '<3f', vert.co.x, vert.co.z, vert.co.y
-            )
-            vertices_count += 1
-        for face in bm.faces:
-            for vert_index in face_vert_indices:
-                vert = face.verts[vert_index]
-                tris_packed_writer.putf('<I', vert.index + vertex_index_offset)
-            material = cform_object.data.materials[face.material_index]
-            material_id = game_materials[material.name]
-            suppress_shadows = (int(material.xray.suppress_shadows) << 14) & 0x4000
-            suppress_wm = (int(material.xray.suppress_wm << 15)) & 0x8000
-            cform_material = material_id | suppress_shadows | suppress_wm
-            tris_packed_writer.putf('<2H', cform_material, sector_index)
-            faces_count += 1
-        vertex_index_offset += vertices_count
+        sector_vertices, sector_triangles = get_cform_geometry(
+            cform_object, sector_index, game_materials
+        )
+        sector_triangles['verts'] += vertex_index_offset
+        vertices.append(sector_vertices)
+        triangles.append(sector_triangles)
+        vertex_index_offset += len(sector_vertices)
+        faces_count += len(sector_triangles)
 
+    cform_header_packed_writer = xray_io.PackedWriter()
+    cform_header_packed_writer.putf('<I', 4)    # version
     cform_header_packed_writer.putf('<I', vertex_index_offset)    # vertices count
     cform_header_packed_writer.putf('<I', faces_count)
     cform_header_packed_writer.putf('<3f', bbox_min[0], bbox_min[2], bbox_min[1])    # bbox min
     cform_header_packed_writer.putf('<3f', bbox_max[0], bbox_max[2], bbox_max[1])    # bbox max
 
-    packed_writer.putp(cform_header_packed_writer)
-    del cform_header_packed_writer
+    # buffers of level.cform file in writing order,
+    # sectors arrays are written without concatenation
+    buffers = [cform_header_packed_writer.data, ]
+    buffers.extend(vertices)
+    buffers.extend(triangles)
+    return buffers
 
-    packed_writer.putp(vertices_packed_writer)
-    del vertices_packed_writer
 
-    packed_writer.putp(tris_packed_writer)
-    del tris_packed_writer
+def write_level_cform(packed_writer, level):
+    for buffer in get_level_cform(level):
+        packed_writer.data += buffer
 
 
 def get_writer():
@@ -1467,41 +1469,70 @@ def get_writer():
     return chunked_writer
 
 
-def export_file(level_object, dir_path):
+def save_level_geom(file_path, vbs, ibs):
+    chunked_writer = get_writer()
+    write_level_geom(chunked_writer, vbs, ibs)
+    utils.save_file(file_path, chunked_writer)
+
+
+def save_timed(save_function, file_path, *args):
+    start_time = time.time()
+    save_function(file_path, *args)
+    return time.time() - start_time
+
+
+def export_file(level_object, dir_path, parallel=False):
+    # Returns the saving time of each output file. Blender data is
+    # read on the calling thread. The geom, geomx and cform files
+    # are packed and written from plain buffers, in a thread pool
+    # when parallel is enabled.
+    timings = {}
     file_path = dir_path + os.sep + 'level'
+    start_time = time.time()
     level_chunked_writer = get_writer()
     vbs, ibs, fp_vbs, fp_ibs, level = write_level(level_chunked_writer, level_object, file_path)
 
     utils.save_file(file_path, level_chunked_writer)
     del level_chunked_writer
+    timings[file_path] = time.time() - start_time
 
-    # geometry
-    level_geom_chunked_writer = get_writer()
-    write_level_geom(level_geom_chunked_writer, vbs, ibs)
-
-    del (
-        vbs, ibs, level.materials, level.visuals, level.vbs_offsets,
-        level.ibs_offsets, level.saved_visuals, level.sectors_indices,
-        level.visuals_bbox, level.visuals_center, level.visuals_radius,
-        level.visuals_cache
-    )
+    # cform
+    start_time = time.time()
+    level_cform_buffers = get_level_cform(level)
+    cform_gather_time = time.time() - start_time
+    del level
 
     level_geom_file_path = file_path + os.extsep + 'geom'
-    utils.save_file(level_geom_file_path, level_geom_chunked_writer)
-    del level_geom_chunked_writer
-
-    # fast path geometry
-    level_geomx_chunked_writer = get_writer()
-    write_level_geom(level_geomx_chunked_writer, fp_vbs, fp_ibs)
-    del fp_vbs, fp_ibs, level.fp_vbs_offsets, level.fp_ibs_offsets
-
     level_geomx_file_path = file_path + os.extsep + 'geomx'
-    utils.save_file(level_geomx_file_path, level_geomx_chunked_writer)
-    del level_geomx_chunked_writer
-
-    # cform
-    level_cform_packed_writer = xray_io.PackedWriter()
-    write_level_cform(level_cform_packed_writer, level)
     level_cform_file_path = file_path + os.extsep + 'cform'
-    utils.save_file(level_cform_file_path, level_cform_packed_writer)
-    del level_cform_packed_writer, level
+    tasks = (
+        # geometry
+        (save_level_geom, level_geom_file_path, vbs, ibs),
+        # fast path geometry
+        (save_level_geom, level_geomx_file_path, fp_vbs, fp_ibs),
+        # cform
+        (utils.save_buffers, level_cform_file_path, level_cform_buffers)
+    )
+    del vbs, ibs, fp_vbs, fp_ibs, level_cform_buffers
+
+    if parallel:
+        with futures.ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            tasks_futures = [
+                (task[1], executor.submit(save_timed, *task))
+                for task in tasks
+            ]
+            for task_file_path, future in tasks_futures:
+                timings[task_file_path] = future.result()
+    else:
+        for task in tasks:
+            timings[task[1]] = save_timed(*task)
+    del tasks
+
+    timings[level_cform_file_path] += cform_gather_time
+    for output_path, output_time in timings.items():
+        log.debug(
+            'time',
+            file=os.path.basename(output_path),
+            time=output_time
+        )
+    return timings
@@ -232,6 +232,7 @@ usage_values = {
 UV_COEFFICIENT = 1024
 UV_COEFFICIENT_2 = 2048
 LIGHT_MAP_UV_COEFFICIENT = 2 ** 15 - 1
+VERTICES_COUNT_LIMIT = 0x10000
 
 # cform
 CFORM_VERSION_4 = 4
@@ -4,6 +4,7 @@ from .. import xray_io
 
 
 def import_indices_buffers(data):
+    # indices buffers are numpy views over the chunk data
     packed_reader = xray_io.PackedReader(data)
     indices_buffers_count = packed_reader.getf('<I')[0]
     indices_buffers = []
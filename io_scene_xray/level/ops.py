@@ -15,6 +15,7 @@ from .. import ie_props
 class ImportLevelContext(contexts.ImportMeshContext):
     def __init__(self):
         super().__init__()
+        self.mesh_builder = None
 
 
 op_text = 'Game Level'
@@ -30,7 +31,8 @@ op_import_level_props = {
     ),
     'filepath': bpy.props.StringProperty(
         subtype="FILE_PATH", options={'SKIP_SAVE', 'HIDDEN'}
-    )
+    ),
+    'mesh_builder': ie_props.prop_mesh_builder()
 }
 
 
@@ -66,6 +68,7 @@ class XRAY_OT_import_level(
         import_context.textures_folder=textures_folder
         import_context.operator=self
         import_context.filepath = self.filepath
+        import_context.mesh_builder = self.mesh_builder
         try:
             imp.import_file(import_context, self)
         except utils.AppError as err:
@@ -1,27 +1,22 @@
+# blender modules
+import numpy
+
 # addon modules
 from .. import xray_io
 
 
-class SlideWindowItem(object):
-    def __init__(self, offset, triangles_count, vertices_count):
-        self.offset = offset
-        self.triangles_count = triangles_count
-        self.vertices_count = vertices_count
+# slide window item record
+SLIDE_WINDOW_ITEM_DTYPE = numpy.dtype([
+    ('offset', '<u4'),
+    ('triangles_count', '<u2'),
+    ('vertices_count', '<u2')
+])
 
 
 def import_slide_window_item(packed_reader):
     reserved = packed_reader.getf('<4I')
     slide_window_count = packed_reader.getf('<I')[0]
-    swis = []
-
-    for slide_window_index in range(slide_window_count):
-        offset = packed_reader.getf('<I')[0]
-        triangles_count = packed_reader.getf('<H')[0]
-        vertices_count = packed_reader.getf('<H')[0]
-
-        swi = SlideWindowItem(offset, triangles_count, vertices_count)
-        swis.append(swi)
-
+    swis = packed_reader.get_array(SLIDE_WINDOW_ITEM_DTYPE, slide_window_count)
     return swis
 
 
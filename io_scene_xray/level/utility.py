@@ -2,7 +2,6 @@
 import os
 
 # addon modules
-from .. import utils
 from .. import xray_io
 
 
@@ -18,6 +17,5 @@ def get_level_name(file_path):
 
 
 def get_level_reader(file_path):
-    data = utils.read_file(file_path)
-    chunked_reader = xray_io.ChunkedReader(data)
+    chunked_reader = xray_io.ChunkedReader.from_file(file_path, mapped=True)
     return chunked_reader
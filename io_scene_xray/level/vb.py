@@ -1,3 +1,6 @@
+# blender modules
+import numpy
+
 # addon modules
 from . import fmt
 from .. import xray_io
@@ -5,26 +8,80 @@ from .. import xray_io
 
 class VertexBuffer(object):
     def __init__(self):
-        self.position = []
-        self.normal = []
-        self.tangent = []
-        self.binormal = []
-        self.color_hemi = []
-        self.color_light = []
-        self.color_sun = []
-        self.uv = []
-        self.uv_fix = []
-        self.uv_lmap = []
-        self.shader_data = []
+        # numpy arrays, one row per vertex. None if the buffer
+        # does not contain the attribute.
+        self.position = None
+        self.normal = None
+        self.tangent = None
+        self.binormal = None
+        self.color_hemi = None
+        self.color_light = None
+        self.color_sun = None
+        self.uv = None
+        self.uv_fix = None
+        self.uv_lmap = None
+        self.shader_data = None
         self.vertex_format = None
         self.float_normals = False
 
 
+# numpy types of vertex declaration elements
+numpy_types = {
+    fmt.FLOAT2: ('<f4', 2),
+    fmt.FLOAT3: ('<f4', 3),
+    fmt.FLOAT4: ('<f4', 4),
+    fmt.D3DCOLOR: ('u1', 4),
+    fmt.SHORT2: ('<i2', 2),
+    fmt.SHORT4: (numpy.dtype([('uv', '<i2', 2), ('data', '<u2', 2)]), 1)
+}
+
+
 def get_uv_corrector(value):
     uv_corrector = (value / 255) * (32 / 0x8000)
     return uv_corrector
 
 
+def create_vertex_dtype(fields):
+    # fields: (name, numpy type, count) tuples in vertex order
+    names = []
+    formats = []
+    offsets = []
+    offset = 0
+    for name, numpy_type, count in fields:
+        field_dtype = numpy.dtype((numpy_type, count))
+        names.append(name)
+        formats.append(field_dtype)
+        offsets.append(offset)
+        offset += field_dtype.itemsize
+    return numpy.dtype({
+        'names': names,
+        'formats': formats,
+        'offsets': offsets,
+        'itemsize': offset
+    })
+
+
+def get_field_name(usage, usage_index):
+    return '{0}{1}'.format(usage.lower(), usage_index)
+
+
+def convert_position(position):
+    return position[:, (0, 2, 1)]
+
+
+def create_vertex_declaration_dtype(usage_list):
+    fields = []
+    for usage_info in usage_list:
+        data_type = fmt.types[usage_info[2]]
+        usage = fmt.usage[usage_info[4]]
+        usage_index = usage_info[5]
+        numpy_type, count = numpy_types[data_type]
+        if count == 1:
+            count = ()
+        fields.append((get_field_name(usage, usage_index), numpy_type, count))
+    return create_vertex_dtype(fields)
+
+
 def import_vertices(
         xrlc_version,
         packed_reader,
@@ -33,99 +90,71 @@ def import_vertices(
         usage_list,
         global_usage_list
     ):
-    code = ''
-    code += 'for vertex_index in range({}):\n'.format(vertices_count)
-    has_uv_corrector = False
-    usages = []
+    dtype = create_vertex_declaration_dtype(usage_list)
+    vertices = packed_reader.get_array(dtype, vertices_count)
+    correct_u = None
+    correct_v = None
     for usage_info in usage_list:
-        data_type = usage_info[2]
-        usage = usage_info[4]
+        data_type = fmt.types[usage_info[2]]
+        usage = fmt.usage[usage_info[4]]
         usage_index = usage_info[5]
-        usages.append(usage_info)
-        data_format = fmt.types_struct[data_type]
-        data_type = fmt.types[data_type]
-        usage = fmt.usage[usage]
+        values = vertices[get_field_name(usage, usage_index)]
         if usage == fmt.POSITION:
-            code += '    coord_x, coord_y, coord_z = packed_reader.getf("<{}")\n'.format(data_format)
-            code += '    vertex_buffer.position.append((coord_x, coord_z, coord_y))\n'
+            vertex_buffer.position = convert_position(values)
         elif usage == fmt.NORMAL:
-            code += '    norm_x, norm_y, norm_z, hemi = packed_reader.getf("<{}")\n'.format(data_format)
-            code += '    vertex_buffer.normal.append((\n' \
-                    '       norm_x,\n' \
-                    '       norm_y,\n' \
-                    '       norm_z\n' \
-                    '    ))\n'
-            code += '    vertex_buffer.color_hemi.append(hemi / 255)\n'
+            vertex_buffer.normal = values[:, 0 : 3]
+            vertex_buffer.color_hemi = values[:, 3] / 255
         elif usage == fmt.TANGENT:
-            code += '    tangent_x, tangent_y, tangent_z, correct_u = packed_reader.getf("<{}")\n'.format(data_format)
-            has_uv_corrector = True
+            correct_u = get_uv_corrector(values[:, 3].astype(numpy.float64))
         elif usage == fmt.BINORMAL:
-            code += '    binorm_x, binorm_y, binorm_z, correct_v = packed_reader.getf("<{}")\n'.format(data_format)
-            has_uv_corrector = True
+            correct_v = get_uv_corrector(values[:, 3].astype(numpy.float64))
         elif usage == fmt.TEXCOORD:
             if usage_index == 0:    # texture uv
-                if data_type in (fmt.FLOAT2, fmt.SHORT2):
-                    code += '    coord_u, coord_v = packed_reader.getf("<{}")\n'.format(data_format)
-                elif data_type == fmt.SHORT4:
-                    if xrlc_version >= fmt.VERSION_12:
-                        code += '    coord_u, coord_v, shader_data, unused = packed_reader.getf("<{}")\n'.format(data_format)
-                    else:
-                        code += '    coord_u, coord_v, lmap_u, lmap_v = packed_reader.getf("<{}")\n'.format(data_format)
+                uv_coefficient = None
                 if data_type == fmt.FLOAT2:
-                    code += '    vertex_buffer.uv.append((coord_u, 1 - coord_v))\n'
+                    coords = values.astype(numpy.float64)
                 elif data_type == fmt.SHORT2:
-                    if has_uv_corrector:
-                        code += '    vertex_buffer.uv.append((\n' \
-                                '        coord_u / fmt.UV_COEFFICIENT + get_uv_corrector(correct_u),\n' \
-                                '        1 - coord_v / fmt.UV_COEFFICIENT - get_uv_corrector(correct_v)\n' \
-                                '    ))\n'
-                    else:
-                        code += '    vertex_buffer.uv.append((\n' \
-                                '        coord_u / fmt.UV_COEFFICIENT,\n' \
-                                '        1 - coord_v / fmt.UV_COEFFICIENT\n' \
-                                '    ))\n'
+                    coords = values.astype(numpy.float64)
+                    uv_coefficient = fmt.UV_COEFFICIENT
                 elif data_type == fmt.SHORT4:
+                    coords = values['uv'].astype(numpy.float64)
+                    data = values['data']
                     if xrlc_version >= fmt.VERSION_12:
-                        if has_uv_corrector:
-                            code += '    vertex_buffer.uv.append((\n' \
-                                    '        coord_u / fmt.UV_COEFFICIENT_2 + get_uv_corrector(correct_u),\n' \
-                                    '        1 - coord_v / fmt.UV_COEFFICIENT_2 - get_uv_corrector(correct_v)\n' \
-                                    '    ))\n'
-                        else:
-                            code += '    vertex_buffer.uv.append((\n' \
-                                    '        coord_u / fmt.UV_COEFFICIENT_2,\n' \
-                                    '        1 - coord_v / fmt.UV_COEFFICIENT_2\n' \
-                                    '    ))\n'
-                        code += '    vertex_buffer.shader_data.append(shader_data)\n'
+                        uv_coefficient = fmt.UV_COEFFICIENT_2
+                        vertex_buffer.shader_data = data[:, 0]
+                    else:
+                        coords /= fmt.UV_COEFFICIENT
+                        lmap = data / fmt.LIGHT_MAP_UV_COEFFICIENT
+                        lmap[:, 1] = 1 - lmap[:, 1]
+                        vertex_buffer.uv_lmap = lmap
+                if uv_coefficient:
+                    coords /= uv_coefficient
+                    # corrector is read from tangent and binormal
+                    if correct_u is not None and correct_v is not None:
+                        coords[:, 0] += correct_u
+                        coords[:, 1] = 1 - coords[:, 1] - correct_v
                     else:
-                        code += '    vertex_buffer.uv.append((\n' \
-                                '        coord_u / fmt.UV_COEFFICIENT,\n' \
-                                '        1 - coord_v / fmt.UV_COEFFICIENT\n' \
-                                '    ))\n' \
-                                '    vertex_buffer.uv_lmap.append((\n' \
-                                '        lmap_u / fmt.LIGHT_MAP_UV_COEFFICIENT,\n' \
-                                '        1 - lmap_v / fmt.LIGHT_MAP_UV_COEFFICIENT\n' \
-                                '    ))\n'
+                        coords[:, 1] = 1 - coords[:, 1]
+                else:
+                    coords[:, 1] = 1 - coords[:, 1]
+                vertex_buffer.uv = coords
             elif usage_index == 1:    # lmap uv
-                code += '    lmap_u, lmap_v = packed_reader.getf("<{}")\n'.format(data_format)
                 if data_type == fmt.SHORT2:
-                    code += '    lmap_u = lmap_u / fmt.LIGHT_MAP_UV_COEFFICIENT\n'
-                    code += '    lmap_v = 1 - lmap_v / fmt.LIGHT_MAP_UV_COEFFICIENT\n'
-                code += '    vertex_buffer.uv_lmap.append((lmap_u, lmap_v))\n'
+                    lmap = values / fmt.LIGHT_MAP_UV_COEFFICIENT
+                    lmap[:, 1] = 1 - lmap[:, 1]
+                else:
+                    lmap = values
+                vertex_buffer.uv_lmap = lmap
             else:
                 raise BaseException('Unsupported uv usage index: {}'.format(usage_index))
         elif usage == fmt.COLOR:
-            code += '    blue, green, red, sun = packed_reader.getf("<{}")\n'.format(data_format)
+            # blue, green, red, sun
+            light = values[:, 2::-1]
             if data_type == fmt.D3DCOLOR:
-                code += '    red = red / 255\n'
-                code += '    green = green / 255\n'
-                code += '    blue = blue / 255\n'
-            code += '    vertex_buffer.color_light.append((\n' \
-                    '       red, green, blue\n' \
-                    '    ))\n'
-            code += '    vertex_buffer.color_sun.append(sun)\n'
-    global_usage_list.add(tuple(usages))
-    exec(code)
+                light = light / 255
+            vertex_buffer.color_light = light
+            vertex_buffer.color_sun = values[:, 3]
+    global_usage_list.add(tuple(usage_list))
 
 
 def import_vertices_d3d7(
@@ -135,43 +164,46 @@ def import_vertices_d3d7(
         vertices_count,
         vertex_format
     ):
-    code = ''
-    code += 'for vertex_index in range({0}):\n'.format(vertices_count)
+    fields = []
     # xyz, normal, diffuse, tex coord
     vertex_format_key = [False, ] * 4
     if (vertex_format & fmt.D3D7FVF.POSITION_MASK) == fmt.D3D7FVF.XYZ:
         vertex_format_key[0] = True    # xyz
-        code += '    coord_x, coord_y, coord_z = packed_reader.getf("<3f")\n'
-        code += '    vertex_buffer.position.append((coord_x, coord_z, coord_y))\n'
+        fields.append(('position', '<f4', 3))
     if vertex_format & fmt.D3D7FVF.NORMAL:
         vertex_format_key[1] = True    # normal
         vertex_buffer.float_normals = True
-        code += '    norm_x, norm_y, norm_z = packed_reader.getf("<3f")\n'
-        code += '    vertex_buffer.normal.append((norm_x, norm_y, norm_z))\n'
+        fields.append(('normal', '<f4', 3))
     if vertex_format & fmt.D3D7FVF.DIFFUSE:
         vertex_format_key[2] = True    # diffuse
-        code += '    red, green, blue, unknown = packed_reader.getf("<4B")\n'
-        code += '    red = red / 255\n'
-        code += '    green = green / 255\n'
-        code += '    blue = blue / 255\n'
-        code += '    vertex_buffer.color_light.append((red, green, blue))\n'
+        fields.append(('diffuse', 'u1', 4))
     tex_coord = (vertex_format & fmt.D3D7FVF.TEXCOUNT_MASK) >> fmt.D3D7FVF.TEXCOUNT_SHIFT
     vertex_format_key[3] = tex_coord    # texture coord count
-    lmap_uv_code = ''
+    tex_coord_fields = []
     if tex_coord in (1, 2):
-        tex_uv_code = '    coord_u, coord_v = packed_reader.getf("<2f")\n'
-        tex_uv_code += '    vertex_buffer.uv.append((coord_u, 1 - coord_v))\n'
+        tex_coord_fields.append(('uv', '<f4', 2))
     if tex_coord == 2:
-        lmap_uv_code = '    lmap_u, lmap_v = packed_reader.getf("<2f")\n'
-        lmap_uv_code += '    vertex_buffer.uv_lmap.append((lmap_u, lmap_v))\n'
-    if level.xrlc_version >= fmt.VERSION_5:
-        code += tex_uv_code
-        code += lmap_uv_code
-    else:
-        code += lmap_uv_code
-        code += tex_uv_code
+        if level.xrlc_version >= fmt.VERSION_5:
+            tex_coord_fields.append(('uv_lmap', '<f4', 2))
+        else:
+            tex_coord_fields.insert(0, ('uv_lmap', '<f4', 2))
+    fields.extend(tex_coord_fields)
     level.vertex_format_list.add(tuple(vertex_format_key))
-    exec(code)
+
+    vertices = packed_reader.get_array(create_vertex_dtype(fields), vertices_count)
+    names = vertices.dtype.names
+    if 'position' in names:
+        vertex_buffer.position = convert_position(vertices['position'])
+    if 'normal' in names:
+        vertex_buffer.normal = vertices['normal']
+    if 'diffuse' in names:
+        vertex_buffer.color_light = vertices['diffuse'][:, 0 : 3] / 255
+    if 'uv' in names:
+        uv = vertices['uv'].astype(numpy.float64)
+        uv[:, 1] = 1 - uv[:, 1]
+        vertex_buffer.uv = uv
+    if 'uv_lmap' in names:
+        vertex_buffer.uv_lmap = vertices['uv_lmap']
 
 
 def import_vertex_buffer_declaration(packed_reader):
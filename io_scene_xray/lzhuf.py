@@ -19,8 +19,22 @@ R = T - 1  # position of root
 MAX_FREQ = 0x4000  # updates tree when the root frequency comes to this value
 N_MASK = N - 1
 
+# decompression engines
+ENGINE_CLASSIC = 'CLASSIC'
+ENGINE_FAST = 'FAST'
+DEFAULT_ENGINE = ENGINE_FAST
 
-def decompress_buffer(buffer: bytearray, textsize: int) -> bytearray:
+
+def decompress_buffer(buffer: bytearray, textsize: int, engine=None) -> bytearray:
+    if engine is None:
+        engine = DEFAULT_ENGINE
+    decompress = _ENGINES.get(engine, None)
+    if decompress is None:
+        raise Exception('Unsupported lzhuf engine: {}'.format(engine))
+    return decompress(buffer, textsize)
+
+
+def _decompress_buffer_classic(buffer: bytearray, textsize: int) -> bytearray:
     buffer_pos = 0
     buffer_size = len(buffer)
 
@@ -212,6 +226,253 @@ def decompress_buffer(buffer: bytearray, textsize: int) -> bytearray:
     return result
 
 
+def _start_huff():
+    freq = [0] * (T + 1)
+    prnt = [0] * (T + N_CHAR)
+    son = [0] * T
+    for i in range(N_CHAR):
+        freq[i] = 1
+        son[i] = i + T
+        prnt[i + T] = i
+    i, j = 0, N_CHAR
+    while j <= R:
+        freq[j] = freq[i] + freq[i + 1]
+        son[j] = i
+        prnt[i] = prnt[i + 1] = j
+        i += 2
+        j += 1
+    freq[T] = 0xffff
+    prnt[R] = 0
+    return freq, prnt, son
+
+
+def _reconst(freq, prnt, son):
+    j = 0
+    for i in range(T):
+        if son[i] >= T:
+            freq[j] = (freq[i] + 1) // 2
+            son[j] = son[i]
+            j += 1
+    i, j = 0, N_CHAR
+    while j < T:
+        f = freq[j] = freq[i] + freq[i + 1]
+        k = j - 1
+        while f < freq[k]:
+            k -= 1
+        k += 1
+        freq[k + 1:j + 1] = freq[k:j]
+        son[k + 1:j + 1] = son[k:j]
+        freq[k] = f
+        son[k] = i
+        i += 2
+        j += 1
+    for i in range(T):
+        k = son[i]
+        if k >= T:
+            prnt[k] = i
+        else:
+            prnt[k] = prnt[k + 1] = i
+
+
+def _decompress_buffer_fast(buffer: bytearray, textsize: int) -> bytearray:
+    # The bit stream is expanded to one byte per bit through a lookup
+    # table, so walking the tree costs a single index per bit. Positions
+    # are decoded with one 14-bit table lookup. The ring buffer is
+    # replaced by the output itself, prefixed with the initial ring state.
+    data = bytes(buffer)
+    bits = b''.join(map(_BYTE_BITS.__getitem__, data)) + _ZERO_BITS
+    data += bytes(len(_ZERO_BITS) // 8 + 3)
+    bits_limit = len(bits) - _MAX_SYMBOL_BITS
+    pos_value = _POS_VALUE
+    pos_bits = _POS_BITS
+
+    freq, prnt, son = _start_huff()
+
+    result = bytearray(_RING_HISTORY)
+    end = N + textsize
+    bit = 0
+    while len(result) < end:
+        if bit > bits_limit:
+            # reading past the end of buffer yields zero bits
+            bits += _ZERO_BITS
+            data += bytes(len(_ZERO_BITS) // 8)
+            bits_limit = len(bits) - _MAX_SYMBOL_BITS
+
+        # decode char
+        c = son[R]
+        while c < T:
+            c = son[c + bits[bit]]
+            bit += 1
+        c -= T
+
+        # update tree
+        if freq[R] == MAX_FREQ:
+            _reconst(freq, prnt, son)
+        node = prnt[c + T]
+        while True:
+            k = freq[node] + 1
+            freq[node] = k
+            l = node + 1
+            if k > freq[l]:
+                while k > freq[l + 1]:
+                    l += 1
+                freq[node] = freq[l]
+                freq[l] = k
+                i = son[node]
+                prnt[i] = l
+                if i < T:
+                    prnt[i + 1] = l
+                j = son[l]
+                son[l] = i
+                prnt[j] = node
+                if j < T:
+                    prnt[j + 1] = node
+                son[node] = j
+                node = l
+            node = prnt[node]
+            if not node:
+                break
+
+        if c < 256:
+            result.append(c)
+        else:
+            # decode position
+            byte = bit >> 3
+            window = (
+                (data[byte] << 16) | (data[byte + 1] << 8) | data[byte + 2]
+            ) >> (10 - (bit & 7)) & 0x3fff
+            bit += pos_bits[window]
+            start = len(result) - pos_value[window] - 1
+            length = c - 255 + THRESHOLD
+            if length <= len(result) - start:
+                result += result[start:start + length]
+            else:
+                for index in range(start, start + length):
+                    result.append(result[index])
+
+    del result[:N]
+    return result
+
+
+def _update(freq, prnt, son, c):
+    if freq[R] == MAX_FREQ:
+        _reconst(freq, prnt, son)
+    node = prnt[c + T]
+    while True:
+        k = freq[node] + 1
+        freq[node] = k
+        l = node + 1
+        if k > freq[l]:
+            while k > freq[l + 1]:
+                l += 1
+            freq[node] = freq[l]
+            freq[l] = k
+            i = son[node]
+            prnt[i] = l
+            if i < T:
+                prnt[i + 1] = l
+            j = son[l]
+            son[l] = i
+            prnt[j] = node
+            if j < T:
+                prnt[j + 1] = node
+            son[node] = j
+            node = l
+        node = prnt[node]
+        if not node:
+            break
+
+
+def compress_buffer(buffer: bytearray) -> bytearray:
+    # Matches are searched through hash chains of 3-byte prefixes
+    # instead of the binary search trees of the original code.
+    # The output is decodable by any of the decompression engines.
+    data = bytes(buffer)
+    size = len(data)
+    freq, prnt, son = _start_huff()
+    pos_code = _POS_CODE
+    pos_code_len = _POS_CODE_LEN
+    min_match = THRESHOLD + 1
+    max_dist = N - 1
+
+    result = bytearray()
+    acc = 0
+    acc_len = 0
+    chains = {}
+    pos = 0
+
+    while pos < size:
+        # find the longest match
+        match_len = 0
+        match_dist = 0
+        max_len = min(F, size - pos)
+        if max_len >= min_match:
+            chain = chains.get(data[pos:pos + min_match], None)
+            if chain:
+                for prev in reversed(chain[-_MAX_CHAIN:]):
+                    dist = pos - prev
+                    if dist > max_dist:
+                        break
+                    length = min_match
+                    while length < max_len and \
+                            data[prev + length] == data[pos + length]:
+                        length += 1
+                    if length > match_len:
+                        match_len = length
+                        match_dist = dist
+                        if length == max_len:
+                            break
+
+        if match_len:
+            c = match_len + 255 - THRESHOLD
+            step = match_len
+        else:
+            c = data[pos]
+            step = 1
+
+        # encode char
+        code = 0
+        code_len = 0
+        node = prnt[c + T]
+        while node != R:
+            code |= (node & 1) << code_len
+            code_len += 1
+            node = prnt[node]
+        acc = (acc << code_len) | code
+        acc_len += code_len
+        _update(freq, prnt, son, c)
+
+        # encode position
+        if match_len:
+            position = match_dist - 1
+            upper = position >> 6
+            code_len = pos_code_len[upper] + 6
+            acc = (acc << code_len) | \
+                (pos_code[upper] << 6) | (position & 0x3f)
+            acc_len += code_len
+
+        if acc_len >= 32:
+            acc_len -= 32
+            result += (acc >> acc_len).to_bytes(4, 'big')
+            acc &= (1 << acc_len) - 1
+
+        for index in range(pos, pos + step):
+            key = data[index:index + min_match]
+            chain = chains.get(key, None)
+            if chain is None:
+                chains[key] = [index]
+            else:
+                chain.append(index)
+        pos += step
+
+    # flush bits
+    if acc_len:
+        pad = -acc_len % 8
+        result += (acc << pad).to_bytes((acc_len + pad) // 8, 'big')
+
+    return result
+
+
 # table for encoding and decoding the upper 6 bits of position
 
 D_CODE = tuple(code - 48
@@ -229,3 +490,55 @@ D_LEN = tuple(code - 48
 5555555555555555666666666666666666666666666666666666666666666666\
 7777777777777777777777777777777777777777777777778888888888888888\
 ')
+
+_ENGINES = {
+    ENGINE_CLASSIC: _decompress_buffer_classic,
+    ENGINE_FAST: _decompress_buffer_fast
+}
+
+# initial ring buffer state, indexed by output position - N
+_RING_HISTORY = bytes(F) + b' ' * (N - F)
+
+# bits of every byte value, most significant first
+_BYTE_BITS = tuple(
+    bytes((value >> shift) & 1 for shift in range(7, -1, -1))
+    for value in range(256)
+)
+
+# the longest code path of the tree plus the position bits
+_MAX_SYMBOL_BITS = 64
+_ZERO_BITS = bytes(4096)
+
+# the number of match candidates checked by the compressor
+_MAX_CHAIN = 16
+
+
+def _build_position_tables():
+    # maps 14 leading bits to the decoded position and its bit length
+    values = []
+    lengths = []
+    for window in range(1 << 14):
+        i = window >> 6
+        extra = D_LEN[i] - 2
+        code = window >> (6 - extra)
+        values.append((D_CODE[i] << 6) | (code & 0x3f))
+        lengths.append(8 + extra)
+    return tuple(values), tuple(lengths)
+
+
+_POS_VALUE, _POS_BITS = _build_position_tables()
+
+
+def _build_position_codes():
+    # prefix codes of the upper 6 bits of position
+    codes = [None] * 64
+    lengths = [None] * 64
+    for i in range(256):
+        upper = D_CODE[i]
+        if codes[upper] is None:
+            lengths[upper] = D_LEN[i]
+            codes[upper] = i >> (8 - D_LEN[i])
+    return tuple(codes), tuple(lengths)
+
+
+_POS_CODE, _POS_CODE_LEN = _build_position_codes()
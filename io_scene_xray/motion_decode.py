@@ -0,0 +1,348 @@
+# standart modules
+import os
+
+# addon modules
+from . import log
+from . import xray_io
+from . import xray_interpolation
+
+
+# this module does not import bpy: files are decoded in worker processes,
+# only plain data is returned and the main thread writes it into blender
+
+CURVE_COUNT = 6    # translation xyz, rotation xyz
+SKL_MOTION_CHUNK = 0x1200
+ANM_MAIN_CHUNK = 0x1100
+ANM_SUPPORTED_VERSIONS = (3, 4, 5)
+SUPPORTED_SHAPES = (
+    xray_interpolation.Shape.TCB,
+    xray_interpolation.Shape.HERMITE,
+    xray_interpolation.Shape.BEZIER_1D,
+    xray_interpolation.Shape.LINEAR,
+    xray_interpolation.Shape.STEPPED,
+    xray_interpolation.Shape.BEZIER_2D
+)
+INTERPOLATED_SHAPES = (
+    xray_interpolation.Shape.TCB,
+    xray_interpolation.Shape.HERMITE,
+    xray_interpolation.Shape.BEZIER_1D,
+    xray_interpolation.Shape.BEZIER_2D
+)
+
+
+class DecodeError(Exception):
+    # message is an attribute name of text.error,
+    # it is converted to utils.AppError in the main thread
+    def __init__(self, message, props):
+        super().__init__(message, props)
+        self.message = message
+        self.props = props
+
+
+class BoneMotion:
+    def __init__(self, name, flags):
+        self.name = name
+        self.flags = flags
+        self.warnings = []
+        self.curves = []    # (values, times) of each curve
+        self.has_interpolate = False
+        self.converted_shapes = []
+
+
+class Motion:
+    def __init__(self, name):
+        self.name = name
+        self.start_frame = 0
+        self.end_frame = 0
+        self.fps = 0.0
+        self.version = 0
+        self.flags = 0
+        self.bonepart = 0
+        self.speed = 0.0
+        self.accrue = 0.0
+        self.falloff = 0.0
+        self.power = 0.0
+        self.bones = []
+        self.markers = []
+
+
+class Envelope:
+    def __init__(self):
+        self.behavior = None
+        self.warnings = []
+        self.values = []
+        self.times = []
+        self.shapes = []
+        self.use_interpolate = False
+        self.unsupported_shapes = set()
+        self.unique_shapes = set()
+
+
+class AnmMotion:
+    def __init__(self, name, fps, version):
+        self.name = name
+        self.fps = fps
+        self.version = version
+        self.envelopes = []
+
+
+def interpolate_keys(start, end, values, times, shapes, tcb, params):
+    interpolated_values, interpolated_times = xray_interpolation.evaluate_keys(
+        start, end, values, times, shapes, tcb, params
+    )
+    return interpolated_values.tolist(), interpolated_times.tolist()
+
+
+def skip_motion_rest(data, offs):
+    ptr = offs + 4 + 4 + 4 + 2
+    ver = xray_io.FastBytes.short_at(data, ptr - 2)
+    if ver < 6:
+        raise DecodeError('motion_ver', {'version': ver})
+
+    ptr += (1 + 2 + 4 * 4) + 2
+    for _bone_idx in range(xray_io.FastBytes.short_at(data, ptr - 2)):
+        ptr = xray_io.FastBytes.skip_str_at(data, ptr) + 1
+        for _fcurve_idx in range(6):
+            ptr += 1 + 1 + 2
+            for _kf_idx in range(xray_io.FastBytes.short_at(data, ptr - 2)):
+                ptr += (4 + 4) + 1
+                shape = data[ptr - 1]
+                if shape != 4:
+                    ptr += (2 * 3 + 2 * 4)
+    if ver >= 7:
+        ptr += 4
+        for _bone_idx in range(xray_io.FastBytes.int_at(data, ptr - 4)):
+            ptr = xray_io.FastBytes.skip_str_at_a(data, ptr) + 4
+            ptr += (4 + 4) * xray_io.FastBytes.int_at(data, ptr - 4)
+
+    return ptr
+
+
+def _read_bone(reader, motion):
+    bone = BoneMotion(reader.gets(), reader.getf('B')[0])
+    if bone.flags != 0:
+        bone.warnings.append((
+            'motion_non_zero_flags',
+            {'bone': bone.name, 'flags': bone.flags}
+        ))
+    fps = motion.fps
+    for _curve_index in range(CURVE_COUNT):
+        values = []
+        times = []
+        shapes = []
+        tcb = []
+        params = []
+        use_interpolate = False
+        behaviors = reader.getf('BB')
+        if (behaviors[0] != 1) or (behaviors[1] != 1):
+            bone.warnings.append((
+                'motion_behaviors',
+                {'bone': bone.name, 'behaviors': behaviors}
+            ))
+        for _keyframe_idx in range(reader.getf('H')[0]):
+            val = reader.getf('f')[0]
+            time = reader.getf('f')[0] * fps
+            shape = xray_interpolation.Shape(reader.getf('B')[0])
+            values.append(val)
+            times.append(time)
+            shapes.append(shape)
+            if shape != xray_interpolation.Shape.STEPPED:
+                tension = reader.getq16f(-32.0, 32.0)
+                continuity = reader.getq16f(-32.0, 32.0)
+                bias = reader.getq16f(-32.0, 32.0)
+                param = []
+                for param_index in range(4):
+                    param_value = reader.getq16f(-32.0, 32.0)
+                    param.append(param_value)
+                tcb.append((tension, continuity, bias))
+                params.append(param)
+                use_interpolate = True
+                bone.has_interpolate = True
+                bone.converted_shapes.append((shape, motion.name, bone.name))
+            else:
+                tcb.append((0.0, 0.0, 0.0))
+                params.append((0.0, 0.0, 0.0, 0.0))
+        if use_interpolate:
+            curve_end_time = int(round(times[-1], 0))
+            if curve_end_time < motion.end_frame and curve_end_time:
+                times.append(motion.end_frame)
+                values.append(values[-1])
+                shapes.append(shapes[-1])
+                tcb.append(tcb[-1])
+                params.append(params[-1])
+            values, times = interpolate_keys(
+                motion.start_frame, motion.end_frame,
+                values, times, shapes, tcb, params
+            )
+        bone.curves.append((values, times))
+    return bone
+
+
+def read_motion(reader, motions_filter=None, name=None):
+    motion_name = reader.gets()
+    if name:
+        motion_name = name
+    if motions_filter and not motions_filter(motion_name):
+        reader.skip(skip_motion_rest(reader.getv(), 0))
+        return None
+    motion = Motion(motion_name)
+    motion.start_frame, motion.end_frame = reader.getf('II')  # range
+    motion.fps, motion.version = reader.getf('fH')
+    if motion.version < 6:
+        raise DecodeError('motion_ver', {'version': motion.version})
+    motion.flags, motion.bonepart = reader.getf('<BH')
+    motion.speed, motion.accrue, motion.falloff, motion.power = reader.getf('<ffff')
+    for _bone_idx in range(reader.getf('H')[0]):
+        motion.bones.append(_read_bone(reader, motion))
+    if motion.version >= 7:
+        for _marker_idx in range(reader.getf('I')[0]):
+            motion.markers.append(reader.gets_a())
+            reader.skip((4 + 4) * reader.getf('I')[0])
+    return motion
+
+
+def read_motions(reader, motions_filter=None):
+    motions = []
+    for _ in range(reader.getf('I')[0]):
+        motion = read_motion(reader, motions_filter)
+        if motion:
+            motions.append(motion)
+    return motions
+
+
+def read_envelope(reader, ver, fps):
+    envelope = Envelope()
+    bhv_fmt = 'I'
+    if ver > 3:
+        bhv_fmt = 'B'
+    bhv0, bhv1 = map(xray_interpolation.Behavior, reader.getf('<2' + bhv_fmt))
+
+    if bhv0 != bhv1:
+        envelope.warnings.append((
+            'envelope_behaviors_replaced',
+            {'behavior': bhv1.name, 'replacement': bhv0.name}
+        ))
+        bhv1 = bhv0
+    if bhv0 not in (
+            xray_interpolation.Behavior.CONSTANT,
+            xray_interpolation.Behavior.LINEAR
+        ):
+        bhv1 = xray_interpolation.Behavior.CONSTANT
+        envelope.warnings.append((
+            'envelope_bad_behavior',
+            {'behavior': bhv0.name, 'replacement': bhv1.name}
+        ))
+        bhv0 = bhv1
+    envelope.behavior = bhv0
+
+    values = envelope.values
+    times = envelope.times
+    shapes = envelope.shapes
+    tcb = []
+    params = []
+    count_fmt = 'I'
+    if ver > 3:
+        count_fmt = 'H'
+    keyframes_count = reader.getf('<' + count_fmt)[0]
+    for _ in range(keyframes_count):
+        value = reader.getf('<f')[0]
+        time = reader.getf('<f')[0] * fps
+        if ver > 3:
+            shape = xray_interpolation.Shape(reader.getf('<B')[0])
+            if shape != xray_interpolation.Shape.STEPPED:
+                tension = reader.getq16f(-32.0, 32.0)
+                continuity = reader.getq16f(-32.0, 32.0)
+                bias = reader.getq16f(-32.0, 32.0)
+                param = []
+                for param_index in range(4):
+                    param_value = reader.getq16f(-32.0, 32.0)
+                    param.append(param_value)
+            else:
+                tension = 0.0
+                continuity = 0.0
+                bias = 0.0
+                param = (0.0, 0.0, 0.0, 0.0)
+        else:
+            shape = xray_interpolation.Shape(reader.getf('<I')[0] & 0xff)
+            tension, continuity, bias = reader.getf('<3f')
+            param = reader.getf('<4f')    # params
+        values.append(value)
+        times.append(time)
+        shapes.append(shape)
+        tcb.append((tension, continuity, bias))
+        params.append(param)
+        if not shape in SUPPORTED_SHAPES:
+            envelope.unsupported_shapes.add(shape.name)
+        envelope.unique_shapes.add(shape.name)
+        if shape in INTERPOLATED_SHAPES:
+            envelope.use_interpolate = True
+    if envelope.use_interpolate:
+        start_frame = int(round(times[0], 0))
+        end_frame = int(round(times[-1], 0))
+        envelope.values, envelope.times = interpolate_keys(
+            start_frame, end_frame, values, times, shapes, tcb, params
+        )
+    return envelope
+
+
+def read_anm(chunked_reader, file_path):
+    chunk_data = chunked_reader.next(ANM_MAIN_CHUNK, no_error=True)
+    if chunk_data is None:
+        raise DecodeError(
+            'anm_has_no_chunk',
+            {'file': os.path.basename(file_path), 'path': file_path}
+        )
+    preader = xray_io.PackedReader(chunk_data)
+    name = preader.gets()
+    _fr = preader.getf('<2I')
+    fps, ver = preader.getf('<fH')
+    if not ver in ANM_SUPPORTED_VERSIONS:
+        raise DecodeError(
+            'anm_unsupport_ver',
+            {
+                'file': os.path.basename(file_path),
+                'path': file_path,
+                'version': ver
+            }
+        )
+    if not name:
+        name = os.path.basename(file_path)
+    anm_motion = AnmMotion(name, fps, ver)
+    for _curve_index in range(CURVE_COUNT):
+        anm_motion.envelopes.append(read_envelope(preader, ver, fps))
+    return anm_motion
+
+
+def decode_skl_file(file_path, motions_filter=None):
+    basename = os.path.basename(file_path.lower())
+    name = os.path.splitext(basename)[0]
+    if motions_filter and not motions_filter(name):
+        return []
+    motions = []
+    for cid, cdata in xray_io.ChunkedReader.from_file(file_path):
+        if cid == SKL_MOTION_CHUNK:
+            reader = xray_io.PackedReader(cdata)
+            motions.append(read_motion(reader, name=name))
+        else:
+            log.debug('unknown chunk', cid=cid)
+    return motions
+
+
+def decode_skls_file(file_path, motions_filter=None):
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    return read_motions(xray_io.PackedReader(data), motions_filter)
+
+
+def decode_motions_file(file_path, names=None):
+    # names is a set of motions to import, None imports all motions
+    motions_filter = None
+    if names is not None:
+        motions_filter = names.__contains__
+    if file_path.lower().endswith('.skls'):
+        return decode_skls_file(file_path, motions_filter)
+    return decode_skl_file(file_path, motions_filter)
+
+
+def decode_anm_file(file_path):
+    return read_anm(xray_io.ChunkedReader.from_file(file_path), file_path)
@@ -1,10 +1,33 @@
+# standart modules
+import hashlib
+
+# blender modules
+import bpy
+import mathutils
+import numpy
+
 # addon modules
 from . import utils
+from . import log
+from . import version_utils
 from . import xray_interpolation
 
 
 KF = utils.mkstruct('KeyFrame', ['time', 'value', 'shape'])
 EPSILON = 0.00001
+REFINE_WINDOW = 16
+EULER_AXES = {'X': 0, 'Y': 1, 'Z': 2}
+BONES_PREFIX = 'pose.bones["'
+# escape sequences of bpy.utils.escape_identifier
+UNESCAPE_CHARS = {
+    'a': '\a',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+    'v': '\v'
+}
 
 
 def export_keyframes(writer, keyframes, time_end=None, fps=None, anm_ver=5):
@@ -45,35 +68,494 @@ def export_keyframes(writer, keyframes, time_end=None, fps=None, anm_ver=5):
 
 
 def refine_keys(keyframes, epsilon=EPSILON):
-    def significant(prev_kf, curr_kf, next_kf, skipped):
-        def is_oor(keyframe, derivative):
-            expected_value = (keyframe.time - prev_kf.time) * derivative + prev_kf.value
-            return abs(expected_value - keyframe.value) >= epsilon
-
-        if prev_kf is None:
-            return curr_kf is not None
-        if (curr_kf.shape == xray_interpolation.Shape.LINEAR) and (next_kf.shape == xray_interpolation.Shape.LINEAR):
-            derivative = (next_kf.value - prev_kf.value) / (next_kf.time - prev_kf.time)
-            if is_oor(curr_kf, derivative):
-                return True
-            for keyframe in skipped:
-                if is_oor(keyframe, derivative):
-                    return True
-            return False
-        if (abs(prev_kf.value - curr_kf.value) + abs(curr_kf.value - next_kf.value)) < epsilon:
-            return False
-        return True
-
-    prev_kf, curr_kf = None, None
-    skipped = []
-    for next_kf in keyframes:
-        if significant(prev_kf, curr_kf, next_kf, skipped):
-            skipped = []
-            prev_kf = curr_kf
-            yield curr_kf
-        elif curr_kf is not None:
-            skipped.append(curr_kf)
-        curr_kf = next_kf
-
-    if curr_kf and ((not prev_kf) or (abs(curr_kf.value - prev_kf.value) >= epsilon)):
-        yield curr_kf
+    keyframes = list(keyframes)
+    mask = refine_mask(
+        [keyframe.time for keyframe in keyframes],
+        [keyframe.value for keyframe in keyframes],
+        [
+            keyframe.shape == xray_interpolation.Shape.LINEAR
+            for keyframe in keyframes
+        ],
+        epsilon
+    )
+    return [
+        keyframe
+        for keyframe, significant in zip(keyframes, mask)
+            if significant
+    ]
+
+
+def refine_mask(times, values, linear, epsilon=EPSILON):
+    '''
+    Returns mask of the significant keys. A key is significant when the
+    curve between the previous significant key and the next key moves
+    more than epsilon. Runs of significant keys are found at once, keys
+    after an insignificant key are searched by growing windows.
+    '''
+    times = numpy.asarray(times, dtype=numpy.float64)
+    values = numpy.asarray(values, dtype=numpy.float64)
+    count = len(values)
+    mask = numpy.ones(count, dtype=bool)
+    if count < 2:
+        return mask
+    linear = numpy.asarray(linear, dtype=bool)
+    # the key and the next key are linear
+    linear_pair = linear[ : -1] & linear[1 : ]
+    steps = numpy.abs(values[ : -1] - values[1 : ])
+
+    # significance of the keys, when the previous key is significant
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        derivative = (values[2 : ] - values[ : -2]) / (times[2 : ] - times[ : -2])
+        follow = numpy.where(
+            linear_pair[1 : ],
+            numpy.abs(
+                (times[1 : -1] - times[ : -2]) * derivative +
+                values[ : -2] - values[1 : -1]
+            ) >= epsilon,
+            steps[ : -1] + steps[1 : ] >= epsilon
+        )
+    quiet_keys = numpy.flatnonzero(~follow) + 1
+    mask[1 : -1] = False
+
+    values_list = values.tolist()
+    steps_list = steps.tolist()
+    linear_pair_list = linear_pair.tolist()
+    follow_list = follow.tolist()
+
+    def find_significant_key(prev, start, stop):
+        # first significant key in [start, stop), keys after prev are skipped
+        value_prev = values_list[prev]
+        # short runs are faster to scan one by one
+        scan_stop = min(start + REFINE_WINDOW, stop)
+        while start < scan_stop and not linear_pair_list[start]:
+            if abs(value_prev - values_list[start]) + steps_list[start] >= epsilon:
+                return start
+            start += 1
+        window = REFINE_WINDOW
+        while start < stop:
+            end = min(start + window, stop)
+            significant = (
+                numpy.abs(value_prev - values[start : end]) +
+                steps[start : end] >= epsilon
+            )
+            pairs = linear_pair[start : end]
+            if pairs.any():
+                significant = numpy.where(
+                    pairs,
+                    get_linear_significance(
+                        times, values, prev, start, end, epsilon
+                    ),
+                    significant
+                )
+            found = numpy.flatnonzero(significant)
+            if len(found):
+                return start + int(found[0])
+            start = end
+            window *= 2
+        return stop
+
+    last = count - 1
+    prev = 0
+    index = 1
+    while index < last:
+        if follow_list[index - 1]:
+            position = numpy.searchsorted(quiet_keys, index)
+            if position < len(quiet_keys):
+                stop = int(quiet_keys[position])
+            else:
+                stop = last
+            mask[index : stop] = True
+            prev = stop - 1
+        else:
+            stop = index
+        if stop >= last:
+            break
+        index = find_significant_key(prev, stop + 1, last)
+        if index < last:
+            mask[index] = True
+            prev = index
+            index += 1
+    mask[last] = abs(values_list[last] - values_list[prev]) >= epsilon
+    return mask
+
+
+def get_linear_significance(times, values, prev, start, end, epsilon):
+    # linear derivative between prev key and the next key of the
+    # keys in [start, end), all keys after prev are skipped
+    time_prev = times[prev]
+    value_prev = values[prev]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        derivative = (
+            (values[start + 1 : end + 1] - value_prev) /
+            (times[start + 1 : end + 1] - time_prev)
+        )
+        # skipped keys are in range, when derivative is in (low, high)
+        skipped_values = values[prev + 1 : end] - value_prev
+        delta = times[prev + 1 : end] - time_prev
+        low = numpy.maximum.accumulate((skipped_values - epsilon) / delta)
+        high = numpy.minimum.accumulate((skipped_values + epsilon) / delta)
+    low = low[start - prev - 1 : ]
+    high = high[start - prev - 1 : ]
+    # rounding error of the bounds
+    margin = 1e-12 * (numpy.abs(values).max() + 1.0) / delta[0]
+    outside = (derivative <= low - margin) | (derivative >= high + margin)
+    inside = (derivative > low + margin) & (derivative < high - margin)
+    # exact check of the keys near the bounds
+    for offset in numpy.flatnonzero(~outside & ~inside):
+        skipped = slice(prev + 1, start + offset + 1)
+        deviation = numpy.abs(
+            (times[skipped] - time_prev) * derivative[offset] +
+            value_prev - values[skipped]
+        )
+        outside[offset] = (deviation >= epsilon).any()
+    return outside
+
+
+def get_slow_bake_bones(armature):
+    '''
+    Returns names of the bones whose pose cannot be computed from
+    action F-Curves only. These are bones with constraints, drivers,
+    non-default transform inheritance and its child bones.
+    '''
+    slow_bones = set()
+    for pose_bone in armature.pose.bones:
+        bone = pose_bone.bone
+        inherit_scale = getattr(bone, 'inherit_scale', None)
+        if inherit_scale is None:
+            full_scale = bone.use_inherit_scale
+        else:
+            full_scale = inherit_scale == 'FULL'
+        has_constraints = any(
+            not constraint.mute for constraint in pose_bone.constraints
+        )
+        if has_constraints or not full_scale or \
+                not bone.use_inherit_rotation or not bone.use_local_location:
+            slow_bones.add(pose_bone.name)
+    animation_data = armature.animation_data
+    if animation_data:
+        for driver in animation_data.drivers:
+            if driver.mute:
+                continue
+            bone_name = get_fcurve_bone_name(driver.data_path)
+            if bone_name:
+                slow_bones.add(bone_name)
+        # nla strips are blended with the active action
+        if any(not track.mute for track in animation_data.nla_tracks):
+            slow_bones.update(armature.pose.bones.keys())
+    if armature.data.pose_position == 'REST':
+        slow_bones.update(armature.pose.bones.keys())
+    if slow_bones:
+        for pose_bone in armature.pose.bones:
+            parent = pose_bone.parent
+            while parent:
+                if parent.name in slow_bones:
+                    slow_bones.add(pose_bone.name)
+                    break
+                parent = parent.parent
+    return slow_bones
+
+
+def escape_name(name):
+    escape_identifier = getattr(bpy.utils, 'escape_identifier', None)
+    if escape_identifier:
+        return escape_identifier(name)
+    # old blender versions
+    return name.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def get_bone_data_path(bone_name):
+    return BONES_PREFIX + escape_name(bone_name) + '"]'
+
+
+def get_fcurve_bone_name(data_path):
+    if not data_path.startswith(BONES_PREFIX):
+        return None
+    chars = []
+    index = len(BONES_PREFIX)
+    while index < len(data_path):
+        char = data_path[index]
+        if char == '\\':
+            index += 1
+            if index == len(data_path):
+                return None
+            char = data_path[index]
+            char = UNESCAPE_CHARS.get(char, char)
+        elif char == '"':
+            if data_path.startswith('"]', index):
+                return ''.join(chars)
+            return None
+        chars.append(char)
+        index += 1
+    return None
+
+
+def sample_channel(fcurves, data_path, default, frames):
+    values = numpy.empty((len(frames), len(default)))
+    for index, default_value in enumerate(default):
+        fcurve = fcurves.get((data_path, index), None)
+        if fcurve is None:
+            values[ : , index] = default_value
+        else:
+            values[ : , index] = [fcurve.evaluate(frame) for frame in frames]
+    return values
+
+
+def quaternions_to_matrices(quaternions):
+    lengths = numpy.sqrt((quaternions * quaternions).sum(axis=1))
+    zero = lengths == 0.0
+    quaternions = quaternions / numpy.where(zero, 1.0, lengths)[ : , None]
+    quaternions[zero] = (0.0, 1.0, 0.0, 0.0)
+    w, x, y, z = quaternions.T
+    matrices = numpy.empty((len(quaternions), 3, 3))
+    matrices[ : , 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    matrices[ : , 0, 1] = 2.0 * (x * y - w * z)
+    matrices[ : , 0, 2] = 2.0 * (x * z + w * y)
+    matrices[ : , 1, 0] = 2.0 * (x * y + w * z)
+    matrices[ : , 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    matrices[ : , 1, 2] = 2.0 * (y * z - w * x)
+    matrices[ : , 2, 0] = 2.0 * (x * z - w * y)
+    matrices[ : , 2, 1] = 2.0 * (y * z + w * x)
+    matrices[ : , 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    return matrices
+
+
+def axis_angles_to_matrices(axis_angles):
+    angles = axis_angles[ : , 0]
+    axes = axis_angles[ : , 1 : ]
+    lengths = numpy.sqrt((axes * axes).sum(axis=1))
+    zero = lengths == 0.0
+    # zero axis gives identity matrix
+    angles = numpy.where(zero, 0.0, angles)
+    axes = axes / numpy.where(zero, 1.0, lengths)[ : , None]
+    half_sin = numpy.sin(angles * 0.5)
+    quaternions = numpy.column_stack((
+        numpy.cos(angles * 0.5),
+        axes * half_sin[ : , None]
+    ))
+    return quaternions_to_matrices(quaternions)
+
+
+def eulers_to_matrices(eulers, order):
+    matrices = numpy.empty((len(eulers), 3, 3))
+    matrices[ : ] = numpy.identity(3)
+    for axis_name in order:
+        axis = EULER_AXES[axis_name]
+        angle = eulers[ : , axis]
+        cos = numpy.cos(angle)
+        sin = numpy.sin(angle)
+        axis_1 = (axis + 1) % 3
+        axis_2 = (axis + 2) % 3
+        rotation = numpy.zeros((len(eulers), 3, 3))
+        rotation[ : , axis, axis] = 1.0
+        rotation[ : , axis_1, axis_1] = cos
+        rotation[ : , axis_1, axis_2] = -sin
+        rotation[ : , axis_2, axis_1] = sin
+        rotation[ : , axis_2, axis_2] = cos
+        # the first axis of the order is applied first
+        matrices = numpy.matmul(rotation, matrices)
+    return matrices
+
+
+def get_basis_matrices(pose_bone, fcurves, frames):
+    data_path = get_bone_data_path(pose_bone.name) + '.'
+    if pose_bone.bone.use_connect:
+        # blender ignores the location of connected bones
+        location = numpy.zeros((len(frames), 3))
+    else:
+        location = sample_channel(
+            fcurves, data_path + 'location', pose_bone.location, frames
+        )
+    scale = sample_channel(
+        fcurves, data_path + 'scale', pose_bone.scale, frames
+    )
+    mode = pose_bone.rotation_mode
+    if mode == 'QUATERNION':
+        rotation = quaternions_to_matrices(sample_channel(
+            fcurves,
+            data_path + 'rotation_quaternion',
+            pose_bone.rotation_quaternion,
+            frames
+        ))
+    elif mode == 'AXIS_ANGLE':
+        rotation = axis_angles_to_matrices(sample_channel(
+            fcurves,
+            data_path + 'rotation_axis_angle',
+            pose_bone.rotation_axis_angle,
+            frames
+        ))
+    else:
+        rotation = eulers_to_matrices(sample_channel(
+            fcurves,
+            data_path + 'rotation_euler',
+            pose_bone.rotation_euler,
+            frames
+        ), mode)
+    matrices = numpy.zeros((len(frames), 4, 4))
+    matrices[ : , 0 : 3, 0 : 3] = rotation * scale[ : , None, : ]
+    matrices[ : , 0 : 3, 3] = location
+    matrices[ : , 3, 3] = 1.0
+    return matrices
+
+
+def bake_fcurves(armature, action, bones_parents, frames, root_matrix):
+    '''
+    Computes pose matrices from the action F-Curves and rest pose.
+    Valid only for bones without constraints and drivers.
+    '''
+    fcurves = {
+        (fcurve.data_path, fcurve.array_index): fcurve
+        for fcurve in action.fcurves
+            if not fcurve.mute
+    }
+    pose_matrices = {}
+
+    def get_pose_matrices(pose_bone):
+        matrices = pose_matrices.get(pose_bone.name, None)
+        if matrices is None:
+            bone = pose_bone.bone
+            rest_matrix = numpy.array(bone.matrix_local)
+            if pose_bone.parent:
+                parent_rest = numpy.array(bone.parent.matrix_local)
+                offset_matrix = numpy.dot(
+                    numpy.linalg.inv(parent_rest), rest_matrix
+                )
+                parent_matrices = get_pose_matrices(pose_bone.parent)
+                offset_matrices = numpy.matmul(parent_matrices, offset_matrix)
+            else:
+                offset_matrices = rest_matrix
+            matrices = numpy.matmul(
+                offset_matrices,
+                get_basis_matrices(pose_bone, fcurves, frames)
+            )
+            pose_matrices[pose_bone.name] = matrices
+        return matrices
+
+    root_matrix = numpy.array(root_matrix)
+    baked_matrices = []
+    for pose_bone, parent in bones_parents:
+        matrices = get_pose_matrices(pose_bone)
+        if parent:
+            parent_matrices = numpy.linalg.inv(get_pose_matrices(parent))
+        else:
+            parent_matrices = root_matrix
+        matrices = numpy.matmul(parent_matrices, matrices)
+        baked_matrices.append([
+            mathutils.Matrix(matrix) for matrix in matrices.tolist()
+        ])
+    return baked_matrices
+
+
+def bake_frame_set(armature, action, bones_parents, frames, root_matrix):
+    '''
+    Computes pose matrices by the scene evaluation for each frame.
+    '''
+    baked_matrices = [[] for _ in bones_parents]
+    has_old_action = False
+    if armature.animation_data:
+        old_act = armature.animation_data.action
+        has_old_action = True
+    else:
+        armature.animation_data_create()
+    old_frame = bpy.context.scene.frame_current
+    try:
+        armature.animation_data.action = action
+        for frame in frames:
+            bpy.context.scene.frame_set(frame)
+            for (pose_bone, parent), matrices in zip(bones_parents, baked_matrices):
+                if parent:
+                    parent_matrix = parent.matrix.inverted()
+                else:
+                    parent_matrix = root_matrix
+                matrices.append(version_utils.multiply(
+                    parent_matrix, pose_bone.matrix
+                ))
+    finally:
+        if has_old_action:
+            armature.animation_data.action = old_act
+        bpy.context.scene.frame_set(old_frame)
+    return baked_matrices
+
+
+def bake_motion(armature, action, bones_parents, root_matrix):
+    '''
+    Returns matrices of the bones relative to the parent bone (or root
+    matrix) for each frame of the action frame range. The F-Curves are
+    evaluated directly, the scene is evaluated for each frame only when
+    some bones have constraints or drivers.
+    '''
+    frames = range(int(action.frame_range[0]), int(action.frame_range[1]) + 1)
+    slow_bones = get_slow_bake_bones(armature)
+    if slow_bones:
+        log.debug(
+            'slow bake',
+            armature=armature.name,
+            action=action.name,
+            bones=sorted(slow_bones)
+        )
+        return bake_frame_set(
+            armature, action, bones_parents, frames, root_matrix
+        )
+    return bake_fcurves(armature, action, bones_parents, frames, root_matrix)
+
+
+def get_bake_fingerprint(armature, action, bones_parents, params=()):
+    '''
+    Returns digest of the data that bake_motion result depends on:
+    action F-Curves, rest pose, default pose and parameters of the
+    caller. Returns None when the pose also depends on the scene.
+    '''
+    if get_slow_bake_bones(armature):
+        return None
+    hasher = hashlib.md5()
+
+    def update_text(value):
+        hasher.update(str(value).encode('utf-8') + b'\x00')
+
+    def update_floats(values):
+        hasher.update(numpy.array(values, dtype=numpy.float64).tobytes())
+
+    update_text(repr(tuple(params)))
+    update_floats(tuple(action.frame_range))
+    for pose_bone in armature.pose.bones:
+        update_text(pose_bone.name)
+        update_text(pose_bone.parent.name if pose_bone.parent else '')
+        update_text(pose_bone.rotation_mode)
+        update_text(pose_bone.bone.use_connect)
+        update_floats(numpy.array(pose_bone.bone.matrix_local))
+        update_floats(
+            tuple(pose_bone.location) +
+            tuple(pose_bone.rotation_quaternion) +
+            tuple(pose_bone.rotation_axis_angle) +
+            tuple(pose_bone.rotation_euler) +
+            tuple(pose_bone.scale)
+        )
+    for pose_bone, parent in bones_parents:
+        update_text(pose_bone.name)
+        update_text(parent.name if parent else '')
+    fcurves = sorted(
+        action.fcurves,
+        key=lambda fcurve: (fcurve.data_path, fcurve.array_index)
+    )
+    for fcurve in fcurves:
+        # modifiers parameters are not hashed
+        if len(fcurve.modifiers):
+            return None
+        update_text(fcurve.data_path)
+        update_text(fcurve.array_index)
+        update_text(fcurve.mute)
+        update_text(fcurve.extrapolation)
+        keyframe_points = fcurve.keyframe_points
+        coords = numpy.empty(len(keyframe_points) * 2, dtype=numpy.float32)
+        for prop_name in ('co', 'handle_left', 'handle_right'):
+            keyframe_points.foreach_get(prop_name, coords)
+            hasher.update(coords.tobytes())
+        # easing parameters of the BACK and ELASTIC interpolations
+        easing = numpy.empty(len(keyframe_points), dtype=numpy.float32)
+        for prop_name in ('back', 'amplitude', 'period'):
+            keyframe_points.foreach_get(prop_name, easing)
+            hasher.update(easing.tobytes())
+        update_text(','.join(
+            keyframe.interpolation + getattr(keyframe, 'easing', '')
+            for keyframe in keyframe_points
+        ))
+    return hasher.digest()
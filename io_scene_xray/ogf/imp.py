@@ -5,6 +5,7 @@ import math
 import bpy
 import bmesh
 import mathutils
+import numpy
 
 # addon modules
 from . import fmt
@@ -19,6 +20,13 @@ from .. import level
 from .. import xray_motions
 
 
+INDICES_DTYPE = numpy.dtype('<u2')
+
+# visual mesh builders
+MESH_BUILDER_BMESH = 'BMESH'
+MESH_BUILDER_ARRAYS = 'ARRAYS'
+
+
 class Visual(object):
     def __init__(self):
         self.file_path = None
@@ -117,8 +125,237 @@ def convert_float_normal(norm_in):
     return mathutils.Vector((norm_in[2], norm_in[0], norm_in[1])).normalized()
 
 
-def create_visual(visual, bpy_mesh=None, lvl=None, geometry_key=None, bones=None):
+def convert_to_list(values):
+    # level vertex buffers store numpy arrays,
+    # but bmesh import uses tuples as dictionary keys
+    if isinstance(values, numpy.ndarray):
+        if values.ndim > 1:
+            return list(map(tuple, values.tolist()))
+        return values.tolist()
+    return values
+
+
+def convert_normals_array(normals, float_normals):
+    normals = numpy.asarray(normals, dtype=numpy.float64)
+    if not float_normals:
+        normals = 2.0 * normals / 255 - 1.0
+    normals = normals[ : , (2, 0, 1)]
+    lengths = numpy.sqrt((normals * normals).sum(axis=1))
+    lengths[lengths == 0.0] = 1.0
+    return normals / lengths[ : , None]
+
+
+def compute_vertex_normals(vertices, triangles):
+    # angle weighted vertex normals, as bmesh computes them
+    coords = [vertices[triangles[ : , index]] for index in range(3)]
+    face_normals = numpy.cross(coords[1] - coords[0], coords[2] - coords[0])
+    lengths = numpy.sqrt((face_normals * face_normals).sum(axis=1))
+    lengths[lengths == 0.0] = 1.0
+    face_normals /= lengths[ : , None]
+    normals = numpy.zeros(vertices.shape, dtype=numpy.float64)
+    for index in range(3):
+        edge_1 = coords[(index + 1) % 3] - coords[index]
+        edge_2 = coords[(index + 2) % 3] - coords[index]
+        len_1 = numpy.sqrt((edge_1 * edge_1).sum(axis=1))
+        len_2 = numpy.sqrt((edge_2 * edge_2).sum(axis=1))
+        len_1[len_1 == 0.0] = 1.0
+        len_2[len_2 == 0.0] = 1.0
+        cos = (edge_1 * edge_2).sum(axis=1) / (len_1 * len_2)
+        angles = numpy.arccos(numpy.clip(cos, -1.0, 1.0))
+        numpy.add.at(
+            normals,
+            triangles[ : , index],
+            face_normals * angles[ : , None]
+        )
+    lengths = numpy.sqrt((normals * normals).sum(axis=1))
+    # loose vertices use normalized coordinates
+    loose = lengths == 0.0
+    normals[loose] = vertices[loose]
+    lengths[loose] = numpy.sqrt((vertices[loose] * vertices[loose]).sum(axis=1))
+    lengths[lengths == 0.0] = 1.0
+    return normals / lengths[ : , None]
+
+
+def find_back_side_vertices(vertices, triangles):
+    # A vertex is on the back side if a vertex with the same coordinates
+    # and the opposite normal appears earlier. Opposite normal classes
+    # of the same position are resolved by the first occurrence.
+    normals = numpy.round(compute_vertex_normals(vertices, triangles), 3)
+    normals += 0.0    # -0.0 to 0.0
+    _, _, position_ids = utils.unique_rows(vertices + 0.0)
+    position_ids = position_ids.astype(numpy.float64)[ : , None]
+    keys = numpy.vstack((
+        numpy.hstack((position_ids, normals)),
+        numpy.hstack((position_ids, -normals + 0.0))
+    ))
+    _, _, classes = utils.unique_rows(keys)
+    count = len(vertices)
+    normal_class = classes[ : count]
+    opposite_class = classes[count : ]
+    classes_count = int(classes.max()) + 1 if count else 0
+    first = numpy.full(classes_count, count, dtype=numpy.int64)
+    numpy.minimum.at(first, normal_class, numpy.arange(count))
+    return numpy.where(
+        normal_class == opposite_class,
+        numpy.arange(count) != first[normal_class],
+        first[opposite_class] < first[normal_class]
+    )
+
+
+def set_loop_colors(bpy_mesh, name, colors):
+    color_layer = bpy_mesh.vertex_colors.new(name=name)
+    if version_utils.IS_28:
+        alpha = numpy.ones((len(colors), 1), dtype=numpy.float32)
+        colors = numpy.hstack((colors, alpha))
+    color_layer.data.foreach_set('color', colors.ravel())
+
+
+def create_visual_mesh_arrays(visual, lvl=None, geometry_key=None):
+    vertices = numpy.asarray(visual.vertices, dtype=numpy.float32)
+    triangles = numpy.asarray(visual.triangles, dtype=numpy.int64).reshape(-1, 3)
+
+    # merge vertices with equal coordinates and side
+    back_side = find_back_side_vertices(
+        vertices.astype(numpy.float64), triangles
+    )
+    keys = numpy.hstack((vertices + 0.0, back_side[ : , None]))
+    _, first_index, inverse = utils.unique_rows(keys)
+    order = numpy.argsort(first_index, kind='mergesort')
+    rank = numpy.empty(len(order), dtype=numpy.int64)
+    rank[order] = numpy.arange(len(order))
+    remap_vertices = rank[inverse]
+    unique_vertices = vertices[first_index[order]]
+
+    # skip degenerate and duplicate faces
+    faces = remap_vertices[triangles]
+    valid = (
+        (faces[ : , 0] != faces[ : , 1]) &
+        (faces[ : , 1] != faces[ : , 2]) &
+        (faces[ : , 0] != faces[ : , 2])
+    )
+    valid_indices = numpy.flatnonzero(valid)
+    _, first_face, _ = utils.unique_rows(numpy.sort(faces[valid_indices], axis=1))
+    face_indices = valid_indices[numpy.sort(first_face)]
+    faces = faces[face_indices]
+    remap_loops = triangles[face_indices].ravel()
+    faces_count = len(faces)
+    loops_count = faces_count * 3
+
+    bpy_mesh = bpy.data.meshes.new(visual.name)
+    bpy_mesh.vertices.add(len(unique_vertices))
+    bpy_mesh.vertices.foreach_set('co', unique_vertices.ravel())
+    bpy_mesh.loops.add(loops_count)
+    bpy_mesh.loops.foreach_set('vertex_index', faces.ravel())
+    bpy_mesh.polygons.add(faces_count)
+    bpy_mesh.polygons.foreach_set(
+        'loop_start', numpy.arange(0, loops_count, 3, dtype=numpy.int32)
+    )
+    bpy_mesh.polygons.foreach_set(
+        'loop_total', numpy.full(faces_count, 3, dtype=numpy.int32)
+    )
+    bpy_mesh.polygons.foreach_set(
+        'use_smooth', numpy.ones(faces_count, dtype=bool)
+    )
+    bpy_mesh.update(calc_edges=True)
+
+    is_new_format = False
+    if lvl:
+        if lvl.xrlc_version >= level.fmt.VERSION_11:
+            is_new_format = True
+    else:
+        if visual.format_version == fmt.FORMAT_VERSION_4:
+            is_new_format = True
+
+    # uvs
+    if version_utils.IS_28:
+        uv_layer = bpy_mesh.uv_layers.new(name='Texture')
+    else:
+        uv_texture = bpy_mesh.uv_textures.new(name='Texture')
+        uv_layer = bpy_mesh.uv_layers[uv_texture.name]
+    uvs = numpy.asarray(visual.uvs, dtype=numpy.float32)
+    uv_layer.data.foreach_set('uv', uvs[remap_loops].ravel())
+    has_lmap = visual.uvs_lmap is not None and len(visual.uvs_lmap)
+    has_light = visual.light is not None and len(visual.light)
+    has_hemi = visual.hemi is not None and len(visual.hemi)
+    if has_lmap:
+        if version_utils.IS_28:
+            lmap_uv_layer = bpy_mesh.uv_layers.new(name='Light Map')
+        else:
+            lmap_uv_texture = bpy_mesh.uv_textures.new(name='Light Map')
+            lmap_uv_layer = bpy_mesh.uv_layers[lmap_uv_texture.name]
+        uvs_lmap = numpy.asarray(visual.uvs_lmap, dtype=numpy.float32)
+        lmap_uv_layer.data.foreach_set('uv', uvs_lmap[remap_loops].ravel())
+
+    # vertex colors
+    def get_colors(values):
+        values = numpy.asarray(values, dtype=numpy.float32)[remap_loops]
+        if values.ndim == 1:
+            values = numpy.repeat(values[ : , None], 3, axis=1)
+        return values
+
+    if is_new_format:
+        if has_hemi:
+            set_loop_colors(bpy_mesh, 'Hemi', get_colors(visual.hemi))
+        else:
+            bpy_mesh.vertex_colors.new(name='Hemi')
+        if not has_lmap and has_light:
+            set_loop_colors(bpy_mesh, 'Sun', get_colors(visual.sun))
+            set_loop_colors(bpy_mesh, 'Light', get_colors(visual.light))
+    elif not has_lmap and has_light:
+        set_loop_colors(bpy_mesh, 'Light', get_colors(visual.light))
+
+    # materials
+    bpy_mesh.use_auto_smooth = True
+    bpy_mesh.auto_smooth_angle = math.pi
+    if lvl:
+        assign_material(bpy_mesh, visual, lvl)
+        if not version_utils.IS_28:
+            bpy_image = lvl.images[visual.shader_id]
+            for tex_poly in uv_texture.data:
+                tex_poly.image = bpy_image
+        lvl.loaded_geometry[geometry_key] = bpy_mesh
+    else:
+        material = visual.bpy_materials[visual.shader_id]
+        bpy_mesh.materials.append(material)
+
+    # custom normals
+    normals = visual.normals
+    if normals is not None and len(normals):
+        if is_new_format:
+            if visual.vb_index is not None:
+                float_normals = lvl.vertex_buffers[visual.vb_index].float_normals
+            else:
+                float_normals = True
+        else:
+            float_normals = False
+        loop_normals = convert_normals_array(normals, float_normals)[remap_loops]
+        bpy_mesh.normals_split_custom_set(loop_normals.tolist())
+
+    return bpy_mesh
+
+
+def create_visual(
+        visual,
+        bpy_mesh=None,
+        lvl=None,
+        geometry_key=None,
+        bones=None,
+        builder=None
+    ):
+    if not bpy_mesh and builder == MESH_BUILDER_ARRAYS and not visual.weights:
+        bpy_mesh = create_visual_mesh_arrays(visual, lvl, geometry_key)
+        bpy_object = create_object(visual.name, bpy_mesh)
+        return bpy_object
+
     if not bpy_mesh:
+        visual.vertices = convert_to_list(visual.vertices)
+        visual.normals = convert_to_list(visual.normals)
+        visual.uvs = convert_to_list(visual.uvs)
+        visual.uvs_lmap = convert_to_list(visual.uvs_lmap)
+        visual.hemi = convert_to_list(visual.hemi)
+        visual.light = convert_to_list(visual.light)
+        visual.sun = convert_to_list(visual.sun)
+
         mesh = bmesh.new()
 
         temp_mesh = bmesh.new()
@@ -448,6 +685,12 @@ def import_fastpath_gcontainer(data, visual, lvl):
     return bpy_mesh, geometry_key
 
 
+def slice_vertex_buffer(values, vb_slice):
+    if values is None:
+        return None
+    return values[vb_slice]
+
+
 def read_gcontainer_v4(data):
     packed_reader = xray_io.PackedReader(data)
 
@@ -473,19 +716,16 @@ def import_gcontainer(
         bpy_mesh = lvl.loaded_geometry.get(geometry_key, None)
         if bpy_mesh:
             return bpy_mesh, geometry_key
-        vertex_buffers = lvl.vertex_buffers
+        vertex_buffer = lvl.vertex_buffers[vb_index]
         indices_buffers = lvl.indices_buffers
-        visual.vertices = vertex_buffers[vb_index].position[vb_slice]
-        visual.normals = vertex_buffers[vb_index].normal[vb_slice]
-        visual.uvs = vertex_buffers[vb_index].uv[vb_slice]
-        visual.uvs_lmap = vertex_buffers[vb_index].uv_lmap[vb_slice]
-        visual.hemi = vertex_buffers[vb_index].color_hemi[vb_slice]
+        visual.vertices = slice_vertex_buffer(vertex_buffer.position, vb_slice)
+        visual.normals = slice_vertex_buffer(vertex_buffer.normal, vb_slice)
+        visual.uvs = slice_vertex_buffer(vertex_buffer.uv, vb_slice)
+        visual.uvs_lmap = slice_vertex_buffer(vertex_buffer.uv_lmap, vb_slice)
+        visual.hemi = slice_vertex_buffer(vertex_buffer.color_hemi, vb_slice)
+        visual.light = slice_vertex_buffer(vertex_buffer.color_light, vb_slice)
+        visual.sun = slice_vertex_buffer(vertex_buffer.color_sun, vb_slice)
         visual.vb_index = vb_index
-
-        if vertex_buffers[vb_index].color_light:
-            visual.light = vertex_buffers[vb_index].color_light[vb_slice]
-        if vertex_buffers[vb_index].color_sun:
-            visual.sun = vertex_buffers[vb_index].color_sun[vb_slice]
     else:
         bpy_mesh = None
         geometry_key = None
@@ -504,8 +744,9 @@ def import_vcontainer(data):
 
 
 def read_indices(packed_reader):
+    # returns numpy view over the chunk data
     indices_count = packed_reader.getf('<I')[0]
-    indices_buffer = packed_reader.getf('<{0}H'.format(indices_count))
+    indices_buffer = packed_reader.get_array(INDICES_DTYPE, indices_count)
     return indices_buffer, indices_count
 
 
@@ -699,8 +940,8 @@ def import_fastpath(data, visual, lvl):
     if swi_chunk_data:
         packed_reader = xray_io.PackedReader(swi_chunk_data)
         swi = level.swi.import_slide_window_item(packed_reader)
-        visual.indices = visual.indices[swi[0].offset : ]
-        visual.indices_count = swi[0].triangles_count * 3
+        visual.indices = visual.indices[int(swi[0]['offset']) : ]
+        visual.indices_count = int(swi[0]['triangles_count']) * 3
         del swi_chunk_data
 
     for chunk_id in chunks.keys():
@@ -863,13 +1104,9 @@ def import_geometry(chunks, visual, lvl):
 
 
 def convert_indices_to_triangles(visual):
-    visual.triangles = []
-    for index in range(0, visual.indices_count, 3):
-        visual.triangles.append((
-            visual.indices[index],
-            visual.indices[index + 2],
-            visual.indices[index + 1]
-        ))
+    indices = numpy.asarray(visual.indices)[ : visual.indices_count]
+    triangles = indices.reshape(-1, 3)[ : , (0, 2, 1)]
+    visual.triangles = list(map(tuple, triangles.tolist()))
     del visual.indices
     del visual.indices_count
 
@@ -881,7 +1118,10 @@ def import_normal_visual(chunks, visual, lvl):
 
     if not bpy_mesh:
         convert_indices_to_triangles(visual)
-        bpy_object = create_visual(visual, bpy_mesh, lvl, geometry_key)
+        bpy_object = create_visual(
+            visual, bpy_mesh, lvl, geometry_key,
+            builder=lvl.context.mesh_builder
+        )
         if visual.fastpath:
             bpy_object.xray.level.use_fastpath = True
         else:
@@ -959,7 +1199,10 @@ def import_tree_st_visual(chunks, visual, lvl):
     bpy_mesh, geometry_key = import_geometry(chunks, visual, lvl)
     if not bpy_mesh:
         convert_indices_to_triangles(visual)
-        bpy_object = create_visual(visual, bpy_mesh, lvl, geometry_key)
+        bpy_object = create_visual(
+            visual, bpy_mesh, lvl, geometry_key,
+            builder=lvl.context.mesh_builder
+        )
     else:
         bpy_object = create_object(visual.name, bpy_mesh)
     tree_xform = import_tree_def_2(lvl, visual, chunks, bpy_object)
@@ -985,14 +1228,17 @@ def import_progressive_visual(chunks, visual, lvl):
     bpy_mesh, geometry_key = import_geometry(chunks, visual, lvl)
     swi = import_swidata(chunks)
 
-    visual.indices = visual.indices[swi[0].offset : ]
-    visual.indices_count = swi[0].triangles_count * 3
+    visual.indices = visual.indices[int(swi[0]['offset']) : ]
+    visual.indices_count = int(swi[0]['triangles_count']) * 3
     convert_indices_to_triangles(visual)
 
     check_unread_chunks(chunks, context='PROGRESSIVE_VISUAL')
 
     if not bpy_mesh:
-        bpy_object = create_visual(visual, bpy_mesh, lvl, geometry_key)
+        bpy_object = create_visual(
+            visual, bpy_mesh, lvl, geometry_key,
+            builder=lvl.context.mesh_builder
+        )
         if visual.fastpath:
             bpy_object.xray.level.use_fastpath = True
         else:
@@ -1141,11 +1387,14 @@ def import_tree_pm_visual(chunks, visual, lvl):
     swi_index = import_swicontainer(chunks)
     if not bpy_mesh:
         swi = lvl.swis[swi_index]
-        visual.indices = visual.indices[swi[0].offset : ]
-        visual.indices_count = swi[0].triangles_count * 3
+        visual.indices = visual.indices[int(swi[0]['offset']) : ]
+        visual.indices_count = int(swi[0]['triangles_count']) * 3
         convert_indices_to_triangles(visual)
 
-        bpy_object = create_visual(visual, bpy_mesh, lvl, geometry_key)
+        bpy_object = create_visual(
+            visual, bpy_mesh, lvl, geometry_key,
+            builder=lvl.context.mesh_builder
+        )
     else:
         bpy_object = create_object(visual.name, bpy_mesh)
     tree_xform = import_tree_def_2(lvl, visual, chunks, bpy_object)
@@ -1739,8 +1988,8 @@ def import_texture(context, chunks, ogf_chunks, visual):
 
 def import_swi(visual, chunks):
     swi = import_swidata(chunks)
-    visual.indices = visual.indices[swi[0].offset : ]
-    visual.indices_count = swi[0].triangles_count * 3
+    visual.indices = visual.indices[int(swi[0]['offset']) : ]
+    visual.indices_count = int(swi[0]['triangles_count']) * 3
 
 
 def import_mt_skeleton_geom_def_st(context, chunks, ogf_chunks, visual):
@@ -1836,7 +2085,7 @@ def import_visual(context, data, visual):
         ))
     if not visual.is_root:
         convert_indices_to_triangles(visual)
-        bpy_object = create_visual(visual)
+        bpy_object = create_visual(visual, builder=context.mesh_builder)
         arm = visual.arm_obj
         if arm:
             bpy_object.parent = arm
@@ -1849,7 +2098,7 @@ def import_visual(context, data, visual):
             bpy_object.xray.isroot = False
     elif visual.model_type in (model_types.NORMAL, model_types.PROGRESSIVE):
         convert_indices_to_triangles(visual)
-        bpy_object = create_visual(visual)
+        bpy_object = create_visual(visual, builder=context.mesh_builder)
 
 
 @log.with_context(name='file')
@@ -23,6 +23,7 @@ class ImportOgfContext(
     def __init__(self):
         super().__init__()
         self.import_bone_parts = None
+        self.mesh_builder = None
 
 
 class ExportOgfContext(
@@ -49,7 +50,8 @@ op_import_ogf_props = {
     'files': bpy.props.CollectionProperty(
         type=bpy.types.OperatorFileListElement, options={'SKIP_SAVE'}
     ),
-    'import_motions': ie_props.PropObjectMotionsImport()
+    'import_motions': ie_props.PropObjectMotionsImport(),
+    'mesh_builder': ie_props.prop_mesh_builder()
 }
 
 
@@ -84,6 +86,7 @@ class XRAY_OT_import_ogf(
         import_context.textures_folder = textures_folder
         import_context.import_motions = self.import_motions
         import_context.import_bone_parts = True
+        import_context.mesh_builder = self.mesh_builder
         import_context.add_actions_to_motion_list = True
         for file in self.files:
             file_path = os.path.join(self.directory, file.name)
@@ -110,6 +113,7 @@ class XRAY_OT_import_ogf(
                 files_count = 0
         row.label(text='{} items'.format(files_count))
         layout.prop(self, 'import_motions')
+        layout.prop(self, 'mesh_builder')
 
     def invoke(self, context, event):
         preferences = version_utils.get_preferences()
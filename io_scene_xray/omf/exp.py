@@ -1,10 +1,12 @@
 # standart modules
+import os
 import struct
 import zlib
 
 # blender modules
 import bpy
 import mathutils
+import numpy
 
 # addon modules
 from . import fmt
@@ -13,6 +15,83 @@ from .. import text
 from .. import log
 from .. import xray_io
 from .. import utils
+from .. import motion_utils
+
+
+FINGERPRINTS_EXT = '.fingerprints'
+FINGERPRINTS_VERSION = 1
+FINGERPRINT_SIZE = 16
+
+
+def get_fingerprints_path(file_path):
+    return file_path + FINGERPRINTS_EXT
+
+
+def read_fingerprints(file_path):
+    '''
+    Reads fingerprints of the motions saved by incremental export,
+    returns empty dict if the file was changed after export.
+    '''
+    try:
+        with open(get_fingerprints_path(file_path), 'rb') as file:
+            data = file.read()
+        packed_reader = xray_io.PackedReader(data)
+        version, mtime, size = packed_reader.getf('<I2Q')
+        if version != FINGERPRINTS_VERSION:
+            return {}
+        if (mtime, size) != imp.get_file_stat(file_path):
+            return {}
+        fingerprints = {}
+        for _ in range(packed_reader.getf('<I')[0]):
+            name = packed_reader.gets()
+            fingerprints[name] = bytes(packed_reader.getb(FINGERPRINT_SIZE))
+    except (OSError, struct.error, UnicodeError):
+        return {}
+    return fingerprints
+
+
+def write_fingerprints(file_path, fingerprints):
+    packed_writer = xray_io.PackedWriter()
+    packed_writer.putf(
+        '<I2Q', FINGERPRINTS_VERSION, *imp.get_file_stat(file_path)
+    )
+    packed_writer.putf('<I', len(fingerprints))
+    for name, fingerprint in fingerprints.items():
+        packed_writer.puts(name)
+        packed_writer.data += fingerprint
+    try:
+        with open(get_fingerprints_path(file_path), 'wb') as file:
+            file.write(packed_writer.data)
+    except OSError:
+        # fingerprints are not required, next export bakes all motions
+        pass
+
+
+def get_unchanged_motions(context):
+    # motions of the existing file, that can be copied without baking
+    if not context.incremental or not os.path.exists(context.filepath):
+        return {}, {}
+    fingerprints = read_fingerprints(context.filepath)
+    if not fingerprints:
+        return {}, {}
+    omf_index = imp.get_omf_index(context.filepath)
+    if omf_index.compressed:
+        # motions have no file offsets, all motions are baked
+        return {}, {}
+    motions = {motion.name: motion for motion in omf_index.motions}
+    return fingerprints, motions
+
+
+def read_motion_chunk(file_path, motion):
+    packed_writer = xray_io.PackedWriter()
+    with open(file_path, 'rb') as file:
+        file.seek(motion.offset)
+        chunk_data = file.read(motion.size)
+    # compressed chunk is written uncompressed
+    packed_writer.data += xray_io.read_chunk_data(
+        chunk_data, 0, motion.size, motion.compressed
+    )
+    return packed_writer
 
 
 def get_flags(xray):
@@ -203,13 +282,88 @@ def write_motion(context, packed_writer, motion_name, motion_index):
     packed_writer.putf('<f', action.xray.falloff)
 
 
+def get_bone_track(matrices):
+    quaternions = numpy.array(
+        [tuple(matrix.to_quaternion()) for matrix in matrices],
+        dtype=numpy.float32
+    )
+    translations = numpy.array(
+        [tuple(matrix.to_translation()) for matrix in matrices],
+        dtype=numpy.float32
+    )
+    return quaternions, translations
+
+
+def write_crc32_data(packed_writer, data):
+    packed_writer.putf('<I', zlib.crc32(data))
+    packed_writer.data += data
+
+
+def write_bone_track(packed_writer, quaternions, translations, high_quality):
+    if high_quality:
+        size_max = 0xffff
+        trn_max = 0x7fff
+        trn_min = -0x8000
+        trn_dtype = '<i2'
+        eps = 0.0000001
+    else:
+        size_max = 255
+        trn_max = 127
+        trn_min = -128
+        trn_dtype = '<i1'
+        eps = 0.000001
+    flags = 0x0
+    if high_quality:
+        flags |= fmt.KPF_T_HQ
+
+    # translation range, computed by mathutils as float vectors
+    min_tr = mathutils.Vector(numpy.minimum(translations.min(axis=0), 10000.0))
+    max_tr = mathutils.Vector(numpy.maximum(translations.max(axis=0), -10000.0))
+    tr_init = min_tr + (max_tr - min_tr) / 2
+    tr_init[2] = -tr_init[2]
+    tr_size = (max_tr - min_tr) / size_max
+    has_translations = tr_size.length > eps
+    if has_translations:
+        flags |= fmt.FL_T_KEY_PRESENT
+
+    # rotation
+    quaternions = numpy.round(
+        quaternions[ : , (1, 2, 3, 0)].astype(numpy.float64) * 0x7fff
+    )
+    quaternions[ : , 2] = -quaternions[ : , 2]
+    quaternions = numpy.clip(quaternions, -0x7fff, 0x7fff).astype('<i2')
+    if (quaternions != quaternions[0]).any():
+        packed_writer.putf('<B', flags)
+        write_crc32_data(packed_writer, quaternions.tobytes())
+    else:
+        flags |= fmt.FL_R_KEY_ABSENT
+        packed_writer.putf('<B', flags)
+        packed_writer.putf('<4h', *quaternions[0].tolist())
+
+    # translation
+    translations = translations.astype(numpy.float64)
+    translations[ : , 2] = -translations[ : , 2]
+    if has_translations:
+        size = numpy.array(tr_size)
+        init = numpy.array(tr_init)
+        has_size = size > 1e-9
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            values = numpy.trunc((translations - init) / size)
+        values = numpy.where(has_size, numpy.clip(values, trn_min, trn_max), 0)
+        write_crc32_data(packed_writer, values.astype(trn_dtype).tobytes())
+        packed_writer.putf('<3f', *tr_size)
+        packed_writer.putf('<3f', *tr_init)
+    else:
+        packed_writer.putf('<3f', *translations[-1].tolist())
+
+
 def write_motions(context, packed_writer, motions):
     for motion_name, motion_index, _ in motions:
         write_motion(context, packed_writer, motion_name, motion_index)
 
 
 @log.with_context('armature-object')
-def export_omf(context):
+def export_omf(context, main_chunked_writer=None):
     log.update(object=context.bpy_arm_obj.name)
     current_frame = bpy.context.scene.frame_current
     mode = context.bpy_arm_obj.mode
@@ -234,7 +388,6 @@ def export_omf(context):
     else:
         available_motions = {}
         export_motion_names = list(motion_names)
-    scn = bpy.context.scene
     pose_bones = []
     bpy.ops.object.mode_set(mode='POSE')
     bone_groups = {}
@@ -284,169 +437,92 @@ def export_omf(context):
                 motions.append((motion_name, motion_count, False))
             motions_ids[motion_name] = motion_count
             motion_count += 1
-    chunked_writer = xray_io.ChunkedWriter()
-    packed_writer = xray_io.PackedWriter()
-    packed_writer.putf('<I', motion_count)
-    chunked_writer.put(fmt.MOTIONS_COUNT_CHUNK, packed_writer)
-    chunk_id = fmt.MOTIONS_COUNT_CHUNK + 1
-    context.bpy_arm_obj.animation_data_create()
-    new_motions_count = 0
-    xray = context.bpy_arm_obj.xray
-    dependency_object = None
-    if xray.dependency_object:
-        dependency_object = bpy.data.objects.get(xray.dependency_object)
-        if dependency_object:
-            dep_action = dependency_object.animation_data.action
-    for motion_name in export_motion_names:
-        action = bpy.data.actions.get(motion_name)
-        packed_writer, _ = available_motions.get(motion_name, (None, None))
-        if context.export_mode == 'ADD' and not packed_writer is None:
-            chunked_writer.put(chunk_id, packed_writer)
-            chunk_id += 1
-            continue
-        if context.export_mode == 'REPLACE':
-            if not motion_name in motion_names and packed_writer:
+    bones_parents = [(pose_bone, pose_bone.parent) for pose_bone in pose_bones]
+    old_fingerprints, old_motions = get_unchanged_motions(context)
+    context.motion_fingerprints = {}
+    if main_chunked_writer is None:
+        main_chunked_writer = xray_io.ChunkedWriter()
+    # motions are written one by one, when the file writer is used
+    # only one motion is kept in memory
+    with main_chunked_writer.chunk(fmt.Chunks.S_MOTIONS) as chunked_writer:
+        packed_writer = xray_io.PackedWriter()
+        packed_writer.putf('<I', motion_count)
+        chunked_writer.put(fmt.MOTIONS_COUNT_CHUNK, packed_writer)
+        chunk_id = fmt.MOTIONS_COUNT_CHUNK + 1
+        context.bpy_arm_obj.animation_data_create()
+        new_motions_count = 0
+        xray = context.bpy_arm_obj.xray
+        dependency_object = None
+        if xray.dependency_object:
+            dependency_object = bpy.data.objects.get(xray.dependency_object)
+            if dependency_object:
+                dep_action = dependency_object.animation_data.action
+        for motion_name in export_motion_names:
+            action = bpy.data.actions.get(motion_name)
+            packed_writer, _ = available_motions.get(motion_name, (None, None))
+            if context.export_mode == 'ADD' and not packed_writer is None:
                 chunked_writer.put(chunk_id, packed_writer)
                 chunk_id += 1
                 continue
-        if not action:
             if context.export_mode == 'REPLACE':
-                if packed_writer is None:
-                    continue
-                else:
+                if not motion_name in motion_names and packed_writer:
                     chunked_writer.put(chunk_id, packed_writer)
                     chunk_id += 1
                     continue
-            else:
-                continue
-        if context.export_mode == 'ADD':
-            new_motions_count += 1
-        elif context.export_mode == 'REPLACE':
-            if packed_writer is None:
+            if not action:
+                if context.export_mode == 'REPLACE':
+                    if packed_writer is None:
+                        continue
+                    else:
+                        chunked_writer.put(chunk_id, packed_writer)
+                        chunk_id += 1
+                        continue
+                else:
+                    continue
+            if context.export_mode == 'ADD':
                 new_motions_count += 1
-        packed_writer = xray_io.PackedWriter()
-        context.bpy_arm_obj.animation_data.action = action
-        if dependency_object:
-            dependency_object.animation_data.action = action
-        if context.bpy_arm_obj.xray.use_custom_motion_names:
-            motion_name = context.motion_export_names[motion_name]
-        packed_writer.puts(motion_name)
-        length = int(action.frame_range[1] - action.frame_range[0] + 1)
-        packed_writer.putf('<I', length)
-        bone_matrices = {}
-        xmatrices = {}
-        min_trns = {}
-        max_trns = {}
-        for frame_index in range(int(action.frame_range[0]), int(action.frame_range[1]) + 1):
-            scn.frame_set(frame_index)
-            for pose_bone in pose_bones:
-                if not bone_matrices.get(pose_bone.name):
-                    bone_matrices[pose_bone.name] = []
-                    xmatrices[pose_bone.name] = []
-                    min_trns[pose_bone.name] = mathutils.Vector((10000.0, 10000.0, 10000.0))
-                    max_trns[pose_bone.name] = mathutils.Vector((-10000.0, -10000.0, -10000.0))
-                parent = pose_bone.parent
-                parent_matrix = parent.matrix.inverted() if parent else imp.MATRIX_BONE_INVERTED
-                matrix = context.multiply(parent_matrix, pose_bone.matrix)
-                translate = matrix.to_translation()
-                for index in range(3):
-                    min_trns[pose_bone.name][index] = min(min_trns[pose_bone.name][index], translate[index])
-                    max_trns[pose_bone.name][index] = max(max_trns[pose_bone.name][index], translate[index])
-                bone_matrices[pose_bone.name].append(matrix)
-        if context.high_quality:
-            size_max = 0xffff
-            trn_max = 0x7fff
-            trn_mix = -0x8000
-            eps = 0.0000001
-        else:
-            size_max = 255
-            trn_max = 127
-            trn_mix = -128
-            eps = 0.000001
-        for pose_bone in pose_bones:
-            flags = 0x0
-            if context.high_quality:
-                flags |= fmt.KPF_T_HQ
-            quaternions = []
-            translations = []
-            min_tr = min_trns[pose_bone.name]
-            max_tr = max_trns[pose_bone.name]
-            tr_init = min_tr + (max_tr - min_tr) / 2
-            tr_init[2] = -tr_init[2]
-            tr_size = (max_tr - min_tr) / size_max
-            for matrix in bone_matrices[pose_bone.name]:
-                # rotation
-                quaternion = matrix.to_quaternion()
-                y = int(round(quaternion[1] * 0x7fff, 0))
-                z = int(round(quaternion[2] * 0x7fff, 0))
-                q = int(round(-quaternion[3] * 0x7fff, 0))
-                x = int(round(quaternion[0] * 0x7fff, 0))
-                quaternions.append((y, z, q, x))
-                # translation
-                translate = matrix.to_translation()
-                translate[2] = -translate[2]
-                if tr_size.length > eps:
-                    translate_final = [None, None, None]
-                    for index in range(3):
-                        if tr_size[index] > 1e-9:
-                            value = int((translate[index] - tr_init[index]) / tr_size[index])
-                            if value > trn_max:
-                                value = trn_max
-                            elif value < trn_mix:
-                                value = trn_mix
-                            translate_final[index] = value
-                        else:
-                            translate_final[index] = 0
-                    translations.append(tuple(translate_final))
-                translate_float = tuple(translate)
-            if tr_size.length > eps:
-                flags |= fmt.FL_T_KEY_PRESENT
-            if len(set(quaternions)) != 1:
-                packed_writer.putf('<B', flags)
-                crc32_temp = 0x0    # temp value
-                crc32_offset = len(packed_writer.data)
-                packed_writer.putf('<I', crc32_temp)
-                for y, z, q, x in quaternions:
-                    packed_writer.putf('<4h', y, z, q, x)
-                # crc32
-                crc32_data_start = crc32_offset + 4
-                crc32_data_end = len(packed_writer.data)
-                crc32_value = zlib.crc32(
-                    packed_writer.data[crc32_data_start : crc32_data_end]
+            elif context.export_mode == 'REPLACE':
+                if packed_writer is None:
+                    new_motions_count += 1
+            packed_writer = xray_io.PackedWriter()
+            context.bpy_arm_obj.animation_data.action = action
+            if dependency_object:
+                dependency_object.animation_data.action = action
+            if context.bpy_arm_obj.xray.use_custom_motion_names:
+                motion_name = context.motion_export_names[motion_name]
+            length = int(action.frame_range[1] - action.frame_range[0] + 1)
+            if context.incremental and not dependency_object:
+                fingerprint = motion_utils.get_bake_fingerprint(
+                    context.bpy_arm_obj,
+                    action,
+                    bones_parents,
+                    (motion_name, length, context.high_quality)
                 )
-                crc32_packed = struct.pack('<I', crc32_value)
-                packed_writer.replace(crc32_offset, crc32_packed)
-            else:
-                flags |= fmt.FL_R_KEY_ABSENT
-                packed_writer.putf('<B', flags)
-                packed_writer.putf('<4h', *quaternions[0])
-            if flags & fmt.FL_T_KEY_PRESENT:
-                crc32_temp = 0x0    # temp value
-                crc32_offset = len(packed_writer.data)
-                packed_writer.putf('<I', crc32_temp)
-                if flags & fmt.KPF_T_HQ:
-                    trn_fmt = 'h'
-                else:
-                    trn_fmt = 'b'
-                for translate in translations:
-                    packed_writer.putf('<3' + trn_fmt, *translate)
-                # crc32
-                crc32_data_start = crc32_offset + 4
-                crc32_data_end = len(packed_writer.data)
-                crc32_value = zlib.crc32(
-                    packed_writer.data[crc32_data_start : crc32_data_end]
+                if fingerprint is not None:
+                    context.motion_fingerprints[motion_name] = fingerprint
+                    old_motion = old_motions.get(motion_name, None)
+                    if old_motion and old_fingerprints.get(motion_name) == fingerprint:
+                        packed_writer = read_motion_chunk(
+                            context.filepath, old_motion
+                        )
+                        chunked_writer.put(chunk_id, packed_writer)
+                        chunk_id += 1
+                        continue
+            packed_writer.puts(motion_name)
+            packed_writer.putf('<I', length)
+            baked_matrices = motion_utils.bake_motion(
+                context.bpy_arm_obj,
+                action,
+                bones_parents,
+                imp.MATRIX_BONE_INVERTED
+            )
+            for matrices in baked_matrices:
+                quaternions, translations = get_bone_track(matrices)
+                write_bone_track(
+                    packed_writer, quaternions, translations, context.high_quality
                 )
-                crc32_packed = struct.pack('<I', crc32_value)
-                packed_writer.replace(crc32_offset, crc32_packed)
-                # size, init
-                packed_writer.putf('<3f', *tr_size)
-                packed_writer.putf('<3f', *tr_init)
-            else:
-                packed_writer.putf('<3f', *translate_float)
-        chunked_writer.put(chunk_id, packed_writer)
-        chunk_id += 1
-    main_chunked_writer = xray_io.ChunkedWriter()
-    main_chunked_writer.put(fmt.Chunks.S_MOTIONS, chunked_writer)
+            chunked_writer.put(chunk_id, packed_writer)
+            chunk_id += 1
     available_boneparts = []
     available_params = {}
     if context.export_mode in ('REPLACE', 'ADD'):
@@ -548,5 +624,7 @@ def export_omf(context):
 
 
 def export_omf_file(context):
-    chunked_writer = export_omf(context)
-    utils.save_file(context.filepath, chunked_writer)
+    with utils.open_output_file(context.filepath) as file:
+        export_omf(context, xray_io.FileChunkedWriter(file))
+    if context.incremental:
+        write_fingerprints(context.filepath, context.motion_fingerprints)
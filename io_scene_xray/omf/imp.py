@@ -1,12 +1,17 @@
+# standart modules
+import os
+
 # blender modules
 import bpy
 import mathutils
+import numpy
 
 # addon modules
 from . import fmt
 from .. import text
 from .. import log
 from .. import xray_io
+from .. import motion_utils
 from .. import utils
 
 
@@ -68,6 +73,117 @@ def examine_motions(data):
     return motion_names
 
 
+class OmfMotion:
+    def __init__(
+            self, name, offset, size, compressed, bones_count, frames_count
+        ):
+        self.name = name
+        self.offset = offset    # motion chunk data offset in file
+        self.size = size    # chunk data size in file
+        self.compressed = compressed
+        self.bones_count = bones_count
+        self.frames_count = frames_count
+
+    def read_data(self, data):
+        return xray_io.read_chunk_data(
+            data, self.offset, self.size, self.compressed
+        )
+
+
+class OmfIndex:
+    # Table of the file motions built from chunk headers and motion
+    # names, bones keys are not read. Offsets are file offsets, so
+    # motions can be read from the mapped file directly. Motions of
+    # the compressed motions chunk have no file offsets, these files
+    # are read entirely (see the compressed attribute).
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.stat = get_file_stat(file_path)
+        self.params = None    # (offset, size, compressed) of params chunk
+        self.motions = []
+        self.unknown_chunks = []
+        self.bones_count = 0
+        self.compressed = False
+        self._read(xray_io.map_file(file_path))
+
+    def _read(self, data):
+        chunked_reader = xray_io.ChunkedReader(data)
+        for chunk_id, chunk_data in chunked_reader:
+            offset, size, compressed = chunked_reader.last_chunk()
+            if chunk_id == fmt.Chunks.S_SMPARAMS:
+                self.params = (offset, size, compressed)
+                self.bones_count = read_bones_count(chunk_data)
+            elif chunk_id == fmt.Chunks.S_MOTIONS:
+                if compressed:
+                    self.compressed = True
+                    offset = None
+                self._read_motions(chunk_data, offset)
+            else:
+                self.unknown_chunks.append(chunk_id)
+        for motion in self.motions:
+            motion.bones_count = self.bones_count
+
+    def _read_motions(self, data, motions_offset):
+        chunked_reader = xray_io.ChunkedReader(data)
+        for chunk_id, chunk_data in chunked_reader:
+            if chunk_id == fmt.MOTIONS_COUNT_CHUNK:
+                continue
+            offset, size, compressed = chunked_reader.last_chunk()
+            if motions_offset is None:
+                offset = None
+            else:
+                offset += motions_offset
+            packed_reader = xray_io.PackedReader(chunk_data)
+            name = packed_reader.gets()
+            length = packed_reader.getf('<I')[0]
+            self.motions.append(OmfMotion(
+                name, offset, size, compressed, None, length
+            ))
+
+    @property
+    def names(self):
+        return [motion.name for motion in self.motions]
+
+
+# cached indices of .omf files (file path: OmfIndex)
+omf_indices = {}
+
+
+def get_file_stat(file_path):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_omf_index(file_path):
+    omf_index = omf_indices.get(file_path, None)
+    if omf_index is None or omf_index.stat != get_file_stat(file_path):
+        omf_index = OmfIndex(file_path)
+        omf_indices[file_path] = omf_index
+    return omf_index
+
+
+def read_bones_count(data):
+    packed_reader = xray_io.PackedReader(data)
+    params_version = packed_reader.getf('<H')[0]
+    partition_count = packed_reader.getf('<H')[0]
+    bones_count = 0
+    for partition_index in range(partition_count):
+        partition_name = packed_reader.gets()
+        bone_count = packed_reader.getf('<H')[0]
+        bones_count += bone_count
+        for bone in range(bone_count):
+            if params_version == 1:
+                packed_reader.skip(4)    # bone id
+            elif params_version == 2:
+                packed_reader.gets()    # bone name
+            elif params_version in (3, 4):
+                packed_reader.gets()    # bone name
+                packed_reader.skip(4)    # bone id
+            else:
+                raise BaseException('Unknown params version')
+    return bones_count
+
+
 class MotionParams:
     def __init__(self):
         self.name = None
@@ -80,14 +196,102 @@ class MotionParams:
         self.falloff = None
 
 
-def convert_to_euler(quaternion):
-    euler = mathutils.Quaternion((
-        quaternion[3] / 0x7fff,
-        quaternion[0] / 0x7fff,
-        quaternion[1] / 0x7fff,
-        -quaternion[2] / 0x7fff
-    )).to_euler('ZXY')
-    return euler
+QUATERNIONS_DTYPE = numpy.dtype('<i2')
+TRANSLATIONS_DTYPES = {
+    True: numpy.dtype('<i2'),    # high quality
+    False: numpy.dtype('<i1')
+}
+
+
+def convert_to_matrices(quaternions):
+    # int16 x-ray quaternions (x, y, z, w) to rotation matrices
+    quaternions = quaternions.astype(numpy.float64) / 0x7fff
+    w = quaternions[ : , 3]
+    x = quaternions[ : , 0]
+    y = quaternions[ : , 1]
+    z = -quaternions[ : , 2]
+    lengths = numpy.sqrt(w * w + x * x + y * y + z * z)
+    # zero quaternion is normalized to (0, 1, 0, 0) as in mathutils
+    zero = lengths == 0.0
+    lengths[zero] = 1.0
+    x = numpy.where(zero, 1.0, x)
+    w, x, y, z = w / lengths, x / lengths, y / lengths, z / lengths
+    matrices = numpy.empty((len(quaternions), 3, 3))
+    matrices[ : , 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    matrices[ : , 0, 1] = 2.0 * (x * y - w * z)
+    matrices[ : , 0, 2] = 2.0 * (x * z + w * y)
+    matrices[ : , 1, 0] = 2.0 * (x * y + w * z)
+    matrices[ : , 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    matrices[ : , 1, 2] = 2.0 * (y * z - w * x)
+    matrices[ : , 2, 0] = 2.0 * (x * z - w * y)
+    matrices[ : , 2, 1] = 2.0 * (y * z + w * x)
+    matrices[ : , 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    return matrices
+
+
+def convert_to_euler(matrices):
+    # same as mathutils.Matrix.to_euler('ZXY') for array of matrices
+    matrices = matrices / numpy.linalg.norm(matrices, axis=1)[ : , None, : ]
+    cos_x = numpy.hypot(matrices[ : , 2, 2], matrices[ : , 0, 2])
+    eulers_1 = numpy.column_stack((
+        numpy.arctan2(-matrices[ : , 1, 2], cos_x),
+        numpy.arctan2(matrices[ : , 0, 2], matrices[ : , 2, 2]),
+        numpy.arctan2(matrices[ : , 1, 0], matrices[ : , 1, 1])
+    ))
+    eulers_2 = numpy.column_stack((
+        numpy.arctan2(-matrices[ : , 1, 2], -cos_x),
+        numpy.arctan2(-matrices[ : , 0, 2], -matrices[ : , 2, 2]),
+        numpy.arctan2(-matrices[ : , 1, 0], -matrices[ : , 1, 1])
+    ))
+    # gimbal lock
+    locked = cos_x <= 16.0 * numpy.finfo(numpy.float32).eps
+    eulers_locked = numpy.column_stack((
+        numpy.arctan2(-matrices[ : , 1, 2], cos_x),
+        numpy.zeros(len(matrices)),
+        numpy.arctan2(-matrices[ : , 0, 1], matrices[ : , 0, 0])
+    ))
+    eulers_1[locked] = eulers_locked[locked]
+    eulers_2[locked] = eulers_locked[locked]
+    use_second = (
+        numpy.abs(eulers_1).sum(axis=1) > numpy.abs(eulers_2).sum(axis=1)
+    )
+    return numpy.where(use_second[ : , None], eulers_2, eulers_1)
+
+
+def read_rotations(packed_reader, length, r_absent):
+    if r_absent:
+        count = 1
+    else:
+        motion_crc32 = packed_reader.getf('<I')[0]
+        count = length
+    quaternions = packed_reader.get_array(QUATERNIONS_DTYPE, count * 4)
+    return convert_to_matrices(quaternions.reshape(count, 4))
+
+
+def read_translations(packed_reader, length, t_present, hq):
+    if t_present:
+        motion_crc32 = packed_reader.getf('<I')[0]
+        translations = packed_reader.get_array(
+            TRANSLATIONS_DTYPES[bool(hq)], length * 3
+        ).reshape(length, 3)
+        t_size = packed_reader.getf('<3f')
+        t_init = packed_reader.getf('<3f')
+        translations = translations * numpy.array(t_size) + numpy.array(t_init)
+    else:
+        translations = numpy.array((packed_reader.getf('<3f'), ))
+    translations[ : , 2] = -translations[ : , 2]
+    return translations
+
+
+def insert_keyframes(fcurves, values):
+    keys_count = len(values)
+    coords = numpy.empty((keys_count, 2), dtype=numpy.float32)
+    coords[ : , 0] = numpy.arange(keys_count)
+    for axis, fcurve in enumerate(fcurves):
+        coords[ : , 1] = values[ : , axis]
+        fcurve.keyframe_points.add(keys_count)
+        fcurve.keyframe_points.foreach_set('co', coords.ravel())
+        fcurve.update()
 
 
 def read_motion(data, context, motions_params, bone_names):
@@ -144,7 +348,7 @@ def read_motion(data, context, motions_params, bone_names):
             translate_fcurves = []
             for translate_index in range(3):    # x, y, z
                 translate_fcurve = act.fcurves.new(
-                    'pose.bones["{}"].location'.format(bone_name),
+                    motion_utils.get_bone_data_path(bone_name) + '.location',
                     index=translate_index,
                     action_group=bone_name
                 )
@@ -153,7 +357,7 @@ def read_motion(data, context, motions_params, bone_names):
             rotate_fcurves = []
             for rotate_index in range(3):    # x, y, z
                 rotate_fcurve = act.fcurves.new(
-                    'pose.bones["{}"].rotation_euler'.format(bone_name),
+                    motion_utils.get_bone_data_path(bone_name) + '.rotation_euler',
                     index=rotate_index,
                     action_group=bone_name
                 )
@@ -164,76 +368,19 @@ def read_motion(data, context, motions_params, bone_names):
             r_absent = flags & fmt.FL_R_KEY_ABSENT
             hq = flags & fmt.KPF_T_HQ
 
-            # rotation
-            bone_rotations = []
-            if r_absent:
-                quaternion = packed_reader.getf('<4h')
-                euler = convert_to_euler(quaternion)
-                bone_rotations.append(euler)
-            else:
-                motion_crc32 = packed_reader.getf('<I')[0]
-                for key_index in range(length):
-                    quaternion = packed_reader.getf('<4h')
-                    euler = convert_to_euler(quaternion)
-                    bone_rotations.append(euler)
-
-            # translation
-            bone_translations = []
-            translations = []
-            if t_present:
-                motion_crc32 = packed_reader.getf('<I')[0]
-                if hq:
-                    translate_format = '3h'
-                else:
-                    translate_format = '3b'
-                for key_index in range(length):
-                    translate = packed_reader.getf('<' + translate_format)
-                    translations.append(translate)
-                t_size = packed_reader.getf('<3f')
-                t_init = packed_reader.getf('<3f')
-                for translate in translations:
-                    final_translation = [None, None, None]
-                    for index, component in enumerate(translate):    # x or y or z
-                        final_translation[index] = component * t_size[index] + t_init[index]
-                    final_translation[2] = -final_translation[2]
-                    bone_translations.append(final_translation)
-            else:
-                translate = packed_reader.getf('<3f')
-                translate = translate[0], translate[1], -translate[2]
-                bone_translations.append(translate)
-
-            tr_count = len(bone_translations)
-            rot_count = len(bone_rotations)
-            keys_count = max(tr_count, rot_count)
-
-            for key_index in range(keys_count):
-                if t_present:
-                    tr_index = key_index
-                else:
-                    tr_index = 0
-                if not r_absent:
-                    rot_index = key_index
-                else:
-                    rot_index = 0
-
-                location = bone_translations[tr_index]
-                rotation = bone_rotations[rot_index]
-
-                mat = context.multiply(
-                    xmat,
-                    mathutils.Matrix.Translation(location),
-                    rotation.to_matrix().to_4x4()
-                )
-                trn = mat.to_translation()
-                rot = mat.to_euler('ZXY')
+            rotations = read_rotations(packed_reader, length, r_absent)
+            translations = read_translations(
+                packed_reader, length, t_present, hq
+            )
 
-                if t_present or key_index == 0:
-                    for axis in range(3):
-                        translate_fcurves[axis].keyframe_points.insert(tr_index, trn[axis])
+            # convert to bone space
+            xmat = numpy.array(xmat)
+            xmat_3x3 = xmat[0 : 3, 0 : 3]
+            translations = numpy.dot(translations, xmat_3x3.T) + xmat[0 : 3, 3]
+            rotations = convert_to_euler(numpy.matmul(xmat_3x3, rotations))
 
-                if not r_absent or key_index == 0:
-                    for axis in range(3):
-                        rotate_fcurves[axis].keyframe_points.insert(rot_index, rot[axis])
+            insert_keyframes(translate_fcurves, translations)
+            insert_keyframes(rotate_fcurves, rotations)
 
         if cannot_find_bones:
             raise utils.AppError(
@@ -350,11 +497,8 @@ def read_params(data, context):
     return motions_params, bone_names
 
 
-def read_main(data, context):
-    if not context.import_motions and not context.import_bone_parts:
-        raise utils.AppError(text.error.omf_nothing)
-        return
-
+def read_chunks(data, context):
+    # all chunks are read, motions chunk is compressed
     chunked_reader = xray_io.ChunkedReader(data)
     chunks = {}
 
@@ -374,6 +518,34 @@ def read_main(data, context):
         print('Unknown OMF chunk: 0x{:x}'.format(chunk_id))
 
 
+def read_main(data, context, omf_index):
+    if not context.import_motions and not context.import_bone_parts:
+        raise utils.AppError(text.error.omf_nothing)
+        return
+
+    if omf_index.compressed:
+        read_chunks(data, context)
+        return
+
+    params_chunk_data = xray_io.read_chunk_data(data, *omf_index.params)
+    motions_params, bone_names = read_params(params_chunk_data, context)
+    del params_chunk_data
+
+    if context.import_motions:
+        # only the chunks of selected motions are read
+        for motion in omf_index.motions:
+            if not context.selected_names is None:
+                if not motion.name in context.selected_names:
+                    continue
+            motion_data = motion.read_data(data)
+            read_motion(motion_data, context, motions_params, bone_names)
+            del motion_data
+
+    for chunk_id in omf_index.unknown_chunks:
+        print('Unknown OMF chunk: 0x{:x}'.format(chunk_id))
+
+
 def import_file(context):
-    file_data = utils.read_file(context.filepath)
-    read_main(file_data, context)
+    omf_index = get_omf_index(context.filepath)
+    file_data = xray_io.map_file(context.filepath)
+    read_main(file_data, context, omf_index)
@@ -34,6 +34,8 @@ class ExportOmfContext(
         self.export_mode = None
         self.export_bone_parts = None
         self.high_quality = None
+        self.incremental = False
+        self.motion_fingerprints = {}
         self.need_motions = None
         self.need_bone_groups = None
 
@@ -205,11 +207,12 @@ class XRAY_OT_import_omf(
             if file_path.lower().endswith('.omf'):
                 if os.path.exists(file_path):
                     if self.__parsed_file_name != file_path:
-                        file_data = utils.read_file(file_path)
-                        motions_names = imp.examine_motions(file_data)
+                        omf_index = imp.get_omf_index(file_path)
                         items.clear()
-                        for name in motions_names:
-                            items.add().name = name
+                        for motion in omf_index.motions:
+                            item = items.add()
+                            item.name = motion.name
+                            item.length = motion.frames_count
                         self.__parsed_file_name = file_path
         else:
             items.clear()
@@ -221,7 +224,8 @@ op_export_omf_props = {
     'export_mode': ie_props.prop_omf_export_mode(),
     'export_motions': ie_props.PropObjectMotionsExport(),
     'export_bone_parts': ie_props.prop_export_bone_parts(),
-    'high_quality': ie_props.prop_omf_high_quality()
+    'high_quality': ie_props.prop_omf_high_quality(),
+    'incremental': ie_props.prop_omf_incremental()
 }
 
 
@@ -244,6 +248,7 @@ class XRAY_OT_export_omf(ie_props.BaseOperator, bpy_extras.io_utils.ExportHelper
         layout.label(text='Export Mode:')
         layout.prop(self, 'export_mode', expand=True)
         layout.prop(self, 'high_quality')
+        layout.prop(self, 'incremental')
         col = layout.column()
         col.active = not self.export_mode in ('OVERWRITE', 'ADD')
         col.prop(self, 'export_motions')
@@ -263,6 +268,7 @@ class XRAY_OT_export_omf(ie_props.BaseOperator, bpy_extras.io_utils.ExportHelper
         export_context.export_motions = self.export_motions
         export_context.export_bone_parts = self.export_bone_parts
         export_context.high_quality = self.high_quality
+        export_context.incremental = self.incremental
         if self.export_mode in ('REPLACE', 'ADD'):
             if not os.path.exists(export_context.filepath):
                 self.report(
@@ -322,6 +328,7 @@ class XRAY_OT_export_omf(ie_props.BaseOperator, bpy_extras.io_utils.ExportHelper
         self.export_bone_parts = preferences.omf_export_bone_parts
         self.export_motions = preferences.omf_motions_export
         self.high_quality = preferences.omf_high_quality
+        self.incremental = preferences.omf_incremental
         if len(context.selected_objects) > 1:
             self.report({'ERROR'}, 'Too many selected objects')
             return {'CANCELLED'}
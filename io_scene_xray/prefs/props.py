@@ -433,6 +433,14 @@ plugin_preferences_props = {
     'compact_menus': bpy.props.BoolProperty(
         name='Compact Import/Export Menus', update=update_menu_func
     ),
+    'import_workers_count': bpy.props.IntProperty(
+        name='Import Processes',
+        description='Number of processes decoding *.skl, *.skls, *.anm ' \
+            'files when several files are imported',
+        default=1,
+        min=1,
+        max=64
+    ),
 
     # defaults
     'defaults_category': bpy.props.EnumProperty(
@@ -484,6 +492,7 @@ plugin_preferences_props = {
     'omf_export_mode': ie_props.prop_omf_export_mode(),
     'omf_motions_export': ie_props.PropObjectMotionsExport(),
     'omf_high_quality': ie_props.prop_omf_high_quality(),
+    'omf_incremental': ie_props.prop_omf_incremental(),
     # scene selection import props
     'scene_selection_sdk_version': ie_props.PropSDKVersion(),
     'scene_selection_mesh_split_by_mat': ie_props.PropObjectMeshSplitByMaterials(),
@@ -173,6 +173,7 @@ def draw_defaults(prefs):
         box.prop(prefs, 'omf_motions_export')
         box.prop(prefs, 'omf_export_bone_parts')
         box.prop(prefs, 'omf_high_quality')
+        box.prop(prefs, 'omf_incremental')
         row = box.row()
         row.label(text='Export Mode:')
         row.prop(prefs, 'omf_export_mode', expand=True)
@@ -336,6 +337,9 @@ def draw_others(prefs):
     split.label(text='Custom Owner Name:')
     split.prop(prefs, 'custom_owner_name', text='')
     prop_bool(layout, prefs, 'compact_menus')
+    split = version_utils.layout_split(layout, 0.4)
+    split.label(text='Import Processes:')
+    split.prop(prefs, 'import_workers_count', text='')
     box = layout.box()
     box.label(text='Bone Shape Colors:')
     row = box.row()
@@ -27,6 +27,6 @@ def export_skl_file(file_path, context):
 
 
 def export_skls_file(file_path, context, actions):
-    writer = xray_io.PackedWriter()
-    xray_motions.export_motions(writer, actions, context.bpy_arm_obj)
-    utils.save_file(file_path, writer)
+    with utils.open_output_file(file_path) as file:
+        writer = xray_io.FilePackedWriter(file)
+        xray_motions.export_motions(writer, actions, context.bpy_arm_obj)
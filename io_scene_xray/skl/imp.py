@@ -1,11 +1,7 @@
-# standart modules
-import os
-
 # addon modules
-from .. import log
 from .. import utils
 from .. import contexts
-from .. import xray_io
+from .. import motion_decode
 from .. import xray_motions
 
 
@@ -15,32 +11,28 @@ class ImportSklContext(contexts.ImportAnimationOnlyContext):
         self.filename = None
 
 
-def _import_skl(file_path, context, chunked_reader):
-    basename = os.path.basename(file_path.lower())
-    name = os.path.splitext(basename)[0]
-    if not context.motions_filter(name):
-        return
-    for cid, cdata in chunked_reader:
-        if cid == 0x1200:
-            reader = xray_io.PackedReader(cdata)
-            bonesmap = {
-                bone.name.lower(): bone
-                for bone in context.bpy_arm_obj.data.bones
-            }
-            xray_motions.import_motion(
-                reader, context, bonesmap, set(), skl_file_name=name
-            )
-        else:
-            log.debug('unknown chunk', cid=cid)
+def _decode(function, *args):
+    try:
+        return function(*args)
+    except motion_decode.DecodeError as error:
+        raise utils.convert_decode_error(error)
+
+
+def import_decoded_file(decoded_file, context):
+    # decoded_file is a future of motion_decode.decode_motions_file
+    motions = _decode(decoded_file.result)
+    xray_motions.apply_motions(motions, context)
 
 
 def import_skl_file(file_path, context):
-    file_data = utils.read_file(file_path)
-    chunked_reader = xray_io.ChunkedReader(file_data)
-    _import_skl(file_path, context, chunked_reader)
+    motions = _decode(
+        motion_decode.decode_skl_file, file_path, context.motions_filter
+    )
+    xray_motions.apply_motions(motions, context)
 
 
 def import_skls_file(file_path, context):
-    file_data = utils.read_file(file_path)
-    reader = xray_io.PackedReader(file_data)
-    xray_motions.import_motions(reader, context, context.motions_filter)
+    motions = _decode(
+        motion_decode.decode_skls_file, file_path, context.motions_filter
+    )
+    xray_motions.apply_motions(motions, context)
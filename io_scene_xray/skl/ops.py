@@ -13,6 +13,7 @@ from .. import log
 from .. import ie_props
 from .. import ui
 from .. import utils
+from .. import motion_decode
 from .. import xray_motions
 from .. import version_utils
 
@@ -124,29 +125,41 @@ class XRAY_OT_import_skls(ie_props.BaseOperator, bpy_extras.io_utils.ImportHelpe
             self.report({'ERROR'}, 'No files selected')
             return {'CANCELLED'}
         motions_filter = xray_motions.MOTIONS_FILTER_ALL
+        selected_names = None
         if self.motions:
             selected_names = {
                 motion.name
                 for motion in self.motions
                     if motion.flag
             }
-            motions_filter = lambda name: name in selected_names
+            motions_filter = selected_names.__contains__
         import_context = imp.ImportSklContext()
         import_context.bpy_arm_obj = context.active_object
         import_context.motions_filter = motions_filter
         import_context.filename = None
         import_context.add_actions_to_motion_list = self.add_actions_to_motion_list
+        files_names = []
         for file in self.files:
             file_ext = os.path.splitext(file.name)[-1].lower()
-            file_path = os.path.join(self.directory, file.name)
-            import_context.filename = file.name
+            if file_ext in ('.skl', '.skls'):
+                files_names.append(file.name)
+            else:
+                self.report({'ERROR'}, 'Format of {} not recognised'.format(file))
+        # files are decoded in worker processes,
+        # actions are created in the main thread in order of files
+        preferences = version_utils.get_preferences()
+        decoded_files = utils.decode_files(
+            motion_decode.decode_motions_file,
+            [
+                (os.path.join(self.directory, file_name), selected_names)
+                for file_name in files_names
+            ],
+            preferences.import_workers_count
+        )
+        for file_name, decoded_file in zip(files_names, decoded_files):
+            import_context.filename = file_name
             try:
-                if file_ext == '.skl':
-                    imp.import_skl_file(file_path, import_context)
-                elif file_ext == '.skls':
-                    imp.import_skls_file(file_path, import_context)
-                else:
-                    self.report({'ERROR'}, 'Format of {} not recognised'.format(file))
+                imp.import_decoded_file(decoded_file, import_context)
             except utils.AppError as err:
                 import_context.errors.append(err)
         for err in import_context.errors:
@@ -1,3 +1,7 @@
+# standart modules
+import os
+import struct
+
 # blender modules
 import bpy
 
@@ -11,6 +15,54 @@ from . import log
 from . import version_utils
 
 
+SKLS_INDEX_EXT = '.index'
+SKLS_INDEX_VERSION = 1
+
+
+def get_index_path(file_path):
+    return file_path + SKLS_INDEX_EXT
+
+
+def get_file_stat(file_path):
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def read_index(index_path, file_stat):
+    'Reads animations index, returns None if index is outdated or broken'
+    try:
+        with open(index_path, 'rb') as file:
+            data = file.read()
+        packed_reader = xray_io.PackedReader(data)
+        version, file_size, file_mtime = packed_reader.getf('<I2Q')
+        if version != SKLS_INDEX_VERSION or (file_size, file_mtime) != file_stat:
+            return None
+        animations = {}
+        animations_count = packed_reader.getf('<I')[0]
+        for _ in range(animations_count):
+            name = packed_reader.gets()
+            offset, frames, size = packed_reader.getf('<QiI')
+            animations[name] = (offset, frames, size)
+    except (OSError, struct.error, UnicodeError):
+        return None
+    return animations
+
+
+def write_index(index_path, file_stat, animations):
+    packed_writer = xray_io.PackedWriter()
+    packed_writer.putf('<I2Q', SKLS_INDEX_VERSION, *file_stat)
+    packed_writer.putf('<I', len(animations))
+    for name, (offset, frames, size) in animations.items():
+        packed_writer.puts(name)
+        packed_writer.putf('<QiI', offset, frames, size)
+    try:
+        with open(index_path, 'wb') as file:
+            file.write(packed_writer.data)
+    except OSError:
+        # .skls folder can be read-only, the index is not required
+        pass
+
+
 class XRAY_UL_skls_list_item(bpy.types.UIList):
 
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname):
@@ -92,36 +144,57 @@ class XRAY_OT_browse_skls_file(bpy.types.Operator):
         '''
         Used to read animations from .skls file.
         Because .skls file can has big size and reading may take long time, so the animations
-        cached by byte offset in file.
-        Holds entire .skls file in memory as binary blob.
+        cached by byte offset in file. The cache is saved to the index file next to .skls file
+        and is reused while .skls file size and modification time are not changed.
+        Animations are read from the file on demand.
         '''
-        __slots__ = 'pr', 'file_path', 'animations'
+        __slots__ = 'file_path', 'animations'
 
         def __init__(self, file_path):
             self.file_path = file_path
-            # cached animations info (name: (file_offset, frames_count))
-            self.animations = {}
-            # read entire .skls file into memory
-            file_data = utils.read_file(file_path)
-            self.pr = xray_io.PackedReader(file_data)
-            self._index_animations()
+            # cached animations info (name: (file_offset, frames_count, size))
+            self.animations = None
+            file_stat = get_file_stat(file_path)
+            index_path = get_index_path(file_path)
+            if os.path.exists(index_path):
+                self.animations = read_index(index_path, file_stat)
+            if self.animations is None:
+                self.animations = self._index_animations()
+                write_index(index_path, file_stat, self.animations)
 
         def _index_animations(self):
-            'Fills the cache (self.animations) by processing entire binary blob'
-            animations_count = self.pr.getf('I')[0]
+            'Fills the cache by processing entire binary blob'
+            animations = {}
+            # map .skls file into memory
+            file_data = xray_io.map_file(self.file_path)
+            packed_reader = xray_io.PackedReader(file_data)
+            animations_count = packed_reader.getf('I')[0]
             for _ in range(animations_count):
                 # index animation
                 # first byte of the animation name
-                offset = self.pr.offset()
+                offset = packed_reader.offset()
                 # animation name
-                name = self.pr.gets()
-                offset2 = self.pr.offset()
-                frames_range = self.pr.getf('II')
-                self.animations[name] = (offset, int(frames_range[1] - frames_range[0]))
+                name = packed_reader.gets()
+                offset2 = packed_reader.offset()
+                frames_range = packed_reader.getf('II')
                 # skip the rest bytes of skl animation to the next animation
-                self.pr.set_offset(offset2)
-                skip = xray_motions.skip_motion_rest(self.pr.getv(), 0)
-                self.pr.skip(skip)
+                packed_reader.set_offset(offset2)
+                skip = xray_motions.skip_motion_rest(packed_reader.getv(), 0)
+                packed_reader.skip(skip)
+                animations[name] = (
+                    offset,
+                    int(frames_range[1] - frames_range[0]),
+                    packed_reader.offset() - offset
+                )
+            return animations
+
+        def read_animation(self, name):
+            'Returns reader of the animation data, reads only animation bytes'
+            offset, _, size = self.animations[name]
+            with open(self.file_path, 'rb') as file:
+                file.seek(offset)
+                data = file.read(size)
+            return xray_io.PackedReader(data)
 
     # pure python hold variable of .skls file buffer instance
     skls_file = None
@@ -182,7 +255,7 @@ def skls_animations_index_changed(self, context):
         # animation not imported yet
         context.window.cursor_set('WAIT')
         # import animation
-        XRAY_OT_browse_skls_file.skls_file.pr.set_offset(XRAY_OT_browse_skls_file.skls_file.animations[animation_name][0])
+        packed_reader = XRAY_OT_browse_skls_file.skls_file.read_animation(animation_name)
         # used to bone's reference detection
         bonesmap = {bone.name.lower(): bone for bone in ob.data.bones}
         # bones names that has problems while import
@@ -191,7 +264,7 @@ def skls_animations_index_changed(self, context):
         import_context.bpy_arm_obj=ob
         import_context.motions_filter=xray_motions.MOTIONS_FILTER_ALL
         import_context.filename=XRAY_OT_browse_skls_file.skls_file.file_path
-        xray_motions.import_motion(XRAY_OT_browse_skls_file.skls_file.pr, import_context, bonesmap, reported)
+        xray_motions.import_motion(packed_reader, import_context, bonesmap, reported)
         sk.animations_prev_name = animation_name
         context.window.cursor_set('DEFAULT')
         # try to find DopeSheet editor & set action
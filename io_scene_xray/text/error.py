@@ -58,6 +58,9 @@ level_has_children = 'Normal/Progressive object must not have children'
 level_bad_portal = 'portal mesh-object has less than 3 vertices'
 level_bad_glow = 'glow mesh-object has no faces'
 level_bad_glow_radius = 'glow object has radius close to zero'
+level_many_verts = 'mesh-object has too many vertices'
+level_bad_uv = 'mesh-object has UV coordinates out of range'
+level_bad_wind = 'mesh-object has vertices below its bounding box'
 # level cform export
 level_bad_cform_type = 'cform object is not mesh'
 level_cform_no_geom = 'cform object has no polygons'
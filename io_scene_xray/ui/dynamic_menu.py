@@ -94,7 +94,7 @@ class DynamicMenu(bpy.types.Menu):
 
 class XRAY_MT_xr_template(DynamicMenu):
     @staticmethod
-    def parse(data, fparse):
+    def parse(items):
         def push_dict(dct, split, value, desc):
             if len(split) == 1:
                 dct[split[0]] = (value, desc)
@@ -119,7 +119,7 @@ class XRAY_MT_xr_template(DynamicMenu):
             return result
 
         tmp = dict()
-        for (name, desc, _) in fparse(data):
+        for (name, desc, _) in items:
             split = name.split('\\')
             push_dict(tmp, split, name, desc)
         return dict_to_array(tmp)
@@ -128,7 +128,8 @@ class XRAY_MT_xr_template(DynamicMenu):
     def create_cached(cls, pref_prop, fparse):
         return utils.create_cached_file_data(
             lambda: getattr(version_utils.get_preferences(), pref_prop, None),
-            lambda data: cls.parse(data, fparse)
+            fparse,
+            lambda engine_data: cls.parse(engine_data.items)
         )
 
     @classmethod
@@ -1,16 +1,23 @@
 # standart modules
 import os
+import sys
 import math
 import time
 import platform
 import getpass
+import types
 import contextlib
+import collections
+import multiprocessing
+import concurrent.futures
+import concurrent.futures.process
 
 # blender modules
 import bpy
 import bpy_extras
 import mathutils
 import bmesh
+import numpy
 
 # addon modules
 from . import bl_info
@@ -325,22 +332,79 @@ def gen_texture_name(image, tx_folder, level_folder=None, errors=set()):
     return a_tx_fpath
 
 
-def create_cached_file_data(ffname, fparser):
+class EngineData:
+    # parsed gamemtl.xr, shaders.xr or shaders_xrlc.xr file,
+    # it is shared between callers and must not be modified
+    def __init__(self, items):
+        self.items = items
+        self.names = []
+        self.descriptions = {}
+        self.name_to_id = {}
+        self.id_to_name = {}
+        for name, desc, item_id in items:
+            self.names.append(name)
+            self.descriptions[name] = desc
+            if item_id is not None:
+                self.name_to_id[name] = item_id
+                self.id_to_name[item_id] = name
+
+
+class EngineDataCache:
+    # parsed files are validated by modification time and size,
+    # the least recently used file is dropped when cache is full
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, file_path, fparser):
+        # returns None if file does not exist
+        if not file_path:
+            return None
+        key = (file_path, fparser)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self._entries.pop(key, None)
+            return None
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stat_key:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        data = EngineData(list(fparser(read_file(file_path))))
+        self._entries[key] = (stat_key, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return data
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+ENGINE_DATA = EngineDataCache(8)
+
+
+def create_cached_file_data(ffname, fparser, fconvert=None):
     class State:
         def __init__(self):
             self._cdata = None
-            self._cpath = None
+            self._source = None
 
         def get_values(self):
-            file_path = ffname()
-            if self._cpath == file_path:
-                return self._cdata
-            tmp = None
-            if file_path:
-                file_data = read_file(file_path)
-                tmp = fparser(file_data)
-            self._cpath = file_path
-            self._cdata = tmp
+            source = ENGINE_DATA.get(ffname(), fparser)
+            if source is not self._source:
+                tmp = None
+                if source is not None:
+                    tmp = fconvert(source) if fconvert else source
+                self._source = source
+                self._cdata = tmp
             return self._cdata
 
     state = State()
@@ -465,6 +529,139 @@ class ObjectsInitializer:
             objset.sync(things, init_thing)
 
 
+def get_image_key(file_path):
+    return os.path.normcase(os.path.abspath(bpy.path.abspath(file_path)))
+
+
+class ImageRegistry:
+    # bpy.data.images index by normalized absolute file path,
+    # it replaces linear scans of bpy.data.images in importers.
+    # Renames are detected on hits, file path changes are reported
+    # by handlers, so misses do not scan bpy.data.images
+    def __init__(self):
+        self._names = None
+        self._count = 0
+
+    def invalidate(self):
+        self._names = None
+
+    def sync(self, images, depsgraph=None):
+        # called from handlers: images are added, removed or changed
+        if self._names is None:
+            return
+        if len(images) != self._count:
+            self.invalidate()
+        elif depsgraph is None:
+            # blender 2.7x flag, 2.80 handlers have no depsgraph argument
+            if getattr(images, 'is_updated', True):
+                self.invalidate()
+        else:
+            for update in depsgraph.updates:
+                if isinstance(update.id, bpy.types.Image):
+                    self.invalidate()
+                    break
+
+    def _build(self, images):
+        self._names = {}
+        for image in images:
+            # first image wins, as in the linear scan
+            self._names.setdefault(get_image_key(image.filepath), image.name)
+        self._count = len(images)
+
+    def _get(self, images, key):
+        name = self._names.get(key)
+        if name is None:
+            return None, True
+        image = images.get(name)
+        if image is None or get_image_key(image.filepath) != key:
+            return None, False
+        return image, True
+
+    def find(self, file_path):
+        images = bpy.data.images
+        if self._names is None or len(images) != self._count:
+            self._build(images)
+        key = get_image_key(file_path)
+        image, valid = self._get(images, key)
+        if not valid:
+            # image is renamed or its file path is changed
+            self._build(images)
+            image, _ = self._get(images, key)
+        return image
+
+    def add(self, image):
+        if self._names is None:
+            return
+        if len(bpy.data.images) != self._count + 1:
+            # other images are created outside the registry
+            self.invalidate()
+            return
+        self._names.setdefault(get_image_key(image.filepath), image.name)
+        self._count += 1
+
+
+IMAGES = ImageRegistry()
+
+
+def get_name_stems(name):
+    # material.001 -> material.001, material
+    yield name
+    while True:
+        stem, dot, suffix = name.rpartition('.')
+        if not dot or not suffix.isdigit():
+            break
+        name = stem
+        yield name
+
+
+class MaterialIndex:
+    # bpy.data.materials index by name stem and signature of
+    # xray properties, importers use it to search reusable materials.
+    # Texture and light maps are compared only for the indexed candidates
+    def __init__(self, get_signature):
+        self._get_signature = get_signature
+        self._names = None
+        self._count = 0
+
+    def _register(self, material):
+        signature = self._get_signature(material)
+        for stem in get_name_stems(material.name):
+            key = (stem, ) + signature
+            self._names.setdefault(key, []).append(material.name)
+
+    def _build(self, materials):
+        self._names = {}
+        for material in materials:
+            self._register(material)
+        self._count = len(materials)
+
+    def find(self, name, signature, check=None):
+        materials = bpy.data.materials
+        if self._names is None or len(materials) != self._count:
+            self._build(materials)
+        for material_name in self._names.get((name, ) + signature, ()):
+            material = materials.get(material_name)
+            if material is None:
+                continue
+            # skip renamed or edited materials
+            if not material.name.startswith(name):
+                continue
+            if self._get_signature(material) != signature:
+                continue
+            if check is None or check(material):
+                return material
+
+    def add(self, material):
+        if self._names is None:
+            return
+        if len(bpy.data.materials) != self._count + 1:
+            # other materials are created outside the index
+            self._names = None
+            return
+        self._register(material)
+        self._count += 1
+
+
 @contextlib.contextmanager
 def using_mode(mode):
     if version_utils.IS_28:
@@ -562,12 +759,17 @@ def time_log():
 
 
 def save_file(file_path, writer):
+    save_buffers(file_path, (writer.data, ))
+
+
+def save_buffers(file_path, buffers):
     dir_path = os.path.dirname(file_path)
     if not os.path.exists(dir_path):
         os.makedirs(dir_path)
     try:
         with open(file_path, 'wb') as file:
-            file.write(writer.data)
+            for buffer in buffers:
+                file.write(buffer)
     except PermissionError:
         raise AppError(
             text.error.file_another_prog,
@@ -575,12 +777,111 @@ def save_file(file_path, writer):
         )
 
 
+@contextlib.contextmanager
+def open_output_file(file_path):
+    # data is streamed into a temporary file,
+    # it replaces the output file when writing is finished
+    dir_path = os.path.dirname(file_path)
+    if not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+    temp_path = file_path + '.tmp'
+    try:
+        file = open(temp_path, 'wb')
+    except PermissionError:
+        raise AppError(
+            text.error.file_another_prog,
+            log.props(file=os.path.basename(file_path), path=file_path)
+        )
+    try:
+        with file:
+            yield file
+        os.replace(temp_path, file_path)
+    except PermissionError:
+        raise AppError(
+            text.error.file_another_prog,
+            log.props(file=os.path.basename(file_path), path=file_path)
+        )
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
 def read_file(file_path):
     with open(file_path, 'rb') as file:
         data = file.read()
     return data
 
 
+def convert_decode_error(error):
+    # motion_decode.DecodeError comes from worker processes without blender
+    return AppError(getattr(text.error, error.message), log.props(**error.props))
+
+
+def get_process_executor(workers_count):
+    # ProcessPoolExecutor has no mp_context argument before python 3.7
+    if workers_count < 2 or sys.version_info < (3, 7):
+        return None
+    # blender binary cannot be used to run workers
+    mp_context = multiprocessing.get_context('spawn')
+    python_path = getattr(bpy.app, 'binary_path_python', None)
+    if not python_path:
+        python_path = sys.executable
+    mp_context.set_executable(python_path)
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers_count,
+        mp_context=mp_context
+    )
+
+
+def _decode_in_process(function, arguments):
+    future = concurrent.futures.Future()
+    try:
+        future.set_result(function(*arguments))
+    except Exception as error:
+        future.set_exception(error)
+    return future
+
+
+@contextlib.contextmanager
+def _spawn_without_main():
+    # spawned workers re-import the __main__ module from its file,
+    # it is the running script, which needs blender to import
+    main_module = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main_module
+
+
+def decode_files(function, arguments_list, workers_count):
+    # yields futures in order of arguments, result() raises decode errors
+    executor = None
+    if len(arguments_list) > 1:
+        executor = get_process_executor(workers_count)
+    if executor is None:
+        for arguments in arguments_list:
+            yield _decode_in_process(function, arguments)
+        return
+    with executor:
+        with _spawn_without_main():
+            futures = [
+                executor.submit(function, *arguments)
+                for arguments in arguments_list
+            ]
+        for arguments, future in zip(arguments_list, futures):
+            error = future.exception()
+            if isinstance(error, concurrent.futures.process.BrokenProcessPool):
+                # workers could not be started
+                log.debug(
+                    'workers failed, decoding in process',
+                    error=str(error),
+                    arguments=arguments
+                )
+                future = _decode_in_process(function, arguments)
+            yield future
+
+
 def read_text_file(file_path):
     with open(file_path, mode='r', encoding='cp1251') as file:
         data = file.read()
@@ -701,6 +1002,16 @@ def get_chunks(data):
     return chunks
 
 
+def unique_rows(array):
+    # numpy.unique for rows of 2d array. Returns unique rows,
+    # index of first occurrence and inverse indices.
+    array = numpy.ascontiguousarray(array)
+    row_dtype = numpy.dtype((numpy.void, array.dtype.itemsize * array.shape[1]))
+    rows = array.view(row_dtype).ravel()
+    _, index, inverse = numpy.unique(rows, return_index=True, return_inverse=True)
+    return array[index], index, inverse.ravel()
+
+
 def find_root(obj):
     if obj.xray.isroot:
         return obj
@@ -1,128 +1,33 @@
 # addon modules
 from . import log
+from . import motion_decode
 from . import motion_utils
 from . import text
 from . import xray_io
 from . import xray_interpolation
-from . import xray_motions
 
 
-@log.with_context('import-envelope')
 def import_envelope(reader, ver, fcurve, fps, koef, name, warn_list, unique_shapes):
-    bhv_fmt = 'I'
-    if ver > 3:
-        bhv_fmt = 'B'
-    bhv0, bhv1 = map(xray_interpolation.Behavior, reader.getf('<2' + bhv_fmt))
+    envelope = motion_decode.read_envelope(reader, ver, fps)
+    return apply_envelope(envelope, fcurve, koef, name, warn_list, unique_shapes)
 
-    if bhv0 != bhv1:
-        log.warn(
-            text.warn.envelope_behaviors_replaced,
-            behavior=bhv1.name,
-            replacement=bhv0.name
-        )
-        bhv1 = bhv0
-    if bhv0 == xray_interpolation.Behavior.CONSTANT:
-        fcurve.extrapolation = 'CONSTANT'
-    elif bhv0 == xray_interpolation.Behavior.LINEAR:
+
+@log.with_context('import-envelope')
+def apply_envelope(envelope, fcurve, koef, name, warn_list, unique_shapes):
+    for message, props in envelope.warnings:
+        log.warn(getattr(text.warn, message), **props)
+    if envelope.behavior == xray_interpolation.Behavior.LINEAR:
         fcurve.extrapolation = 'LINEAR'
     else:
-        bhv1 = xray_interpolation.Behavior.CONSTANT
-        log.warn(
-            text.warn.envelope_bad_behavior,
-            behavior=bhv0.name,
-            replacement=bhv1.name
-        )
-        bhv0 = bhv1
         fcurve.extrapolation = 'CONSTANT'
 
     replace_unsupported_to = 'BEZIER'
-    unsupported_occured = set()
     fckf = fcurve.keyframe_points
-    use_interpolate = False
-    values = []
-    times = []
-    shapes = []
-    tcb = []
-    params = []
-    count_fmt = 'I'
-    if ver > 3:
-        count_fmt = 'H'
-    keyframes_count = reader.getf('<' + count_fmt)[0]
-    if ver > 3:
-        for _ in range(keyframes_count):
-            value = reader.getf('<f')[0]
-            time = reader.getf('<f')[0] * fps
-            shape = xray_interpolation.Shape(reader.getf('<B')[0])
-            if shape != xray_interpolation.Shape.STEPPED:
-                tension = reader.getq16f(-32.0, 32.0)
-                continuity = reader.getq16f(-32.0, 32.0)
-                bias = reader.getq16f(-32.0, 32.0)
-                param = []
-                for param_index in range(4):
-                    param_value = reader.getq16f(-32.0, 32.0)
-                    param.append(param_value)
-            else:
-                tension = 0.0
-                continuity = 0.0
-                bias = 0.0
-                param = (0.0, 0.0, 0.0, 0.0)
-            values.append(value)
-            times.append(time)
-            shapes.append(shape)
-            tcb.append((tension, continuity, bias))
-            params.append(param)
-            if not shape in (
-                    xray_interpolation.Shape.TCB,
-                    xray_interpolation.Shape.HERMITE,
-                    xray_interpolation.Shape.BEZIER_1D,
-                    xray_interpolation.Shape.LINEAR,
-                    xray_interpolation.Shape.STEPPED,
-                    xray_interpolation.Shape.BEZIER_2D
-                ):
-                unsupported_occured.add(shape.name)
-            unique_shapes.add(shape.name)
-            if shape in (
-                    xray_interpolation.Shape.TCB,
-                    xray_interpolation.Shape.HERMITE,
-                    xray_interpolation.Shape.BEZIER_1D,
-                    xray_interpolation.Shape.BEZIER_2D
-                ):
-                use_interpolate = True
-    else:
-        for _ in range(keyframes_count):
-            value = reader.getf('<f')[0]
-            time = reader.getf('<f')[0] * fps
-            shape = xray_interpolation.Shape(reader.getf('<I')[0] & 0xff)
-            tension, continuity, bias = reader.getf('<3f')
-            param = reader.getf('<4f')    # params
-            values.append(value)
-            times.append(time)
-            shapes.append(shape)
-            tcb.append((tension, continuity, bias))
-            params.append(param)
-            if not shape in (
-                    xray_interpolation.Shape.TCB,
-                    xray_interpolation.Shape.HERMITE,
-                    xray_interpolation.Shape.BEZIER_1D,
-                    xray_interpolation.Shape.LINEAR,
-                    xray_interpolation.Shape.STEPPED,
-                    xray_interpolation.Shape.BEZIER_2D
-                ):
-                unsupported_occured.add(shape.name)
-            unique_shapes.add(shape.name)
-            if shape in (
-                    xray_interpolation.Shape.TCB,
-                    xray_interpolation.Shape.HERMITE,
-                    xray_interpolation.Shape.BEZIER_1D,
-                    xray_interpolation.Shape.BEZIER_2D
-                ):
-                use_interpolate = True
-    if use_interpolate:
-        start_frame = int(round(times[0], 0))
-        end_frame = int(round(times[-1], 0))
-        values, times = xray_motions.interpolate_keys(
-            fps, start_frame, end_frame, values, times, shapes, tcb, params
-        )
+    times = envelope.times
+    values = envelope.values
+    shapes = envelope.shapes
+    unique_shapes.update(envelope.unique_shapes)
+    if envelope.use_interpolate:
         for time, value in zip(times, values):
             key_frame = fckf.insert(time, value * koef)
             key_frame.interpolation = 'LINEAR'
@@ -141,14 +46,14 @@ def import_envelope(reader, ver, fcurve, fps, koef, name, warn_list, unique_shap
             else:
                 key_frame.interpolation = replace_unsupported_to
 
-    if unsupported_occured:
+    if envelope.unsupported_shapes:
         warn_list.append((
-            tuple(unsupported_occured),
+            tuple(envelope.unsupported_shapes),
             replace_unsupported_to,
             name
         ))
 
-    return use_interpolate
+    return envelope.use_interpolate
 
 
 @log.with_context('export-envelope')
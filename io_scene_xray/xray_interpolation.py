@@ -1,6 +1,9 @@
 # standart modules
 import enum
 
+# blender modules
+import numpy
+
 
 class Behavior(enum.Enum):
     RESET = 0
@@ -20,6 +23,9 @@ class Shape(enum.Enum):
     BEZIER_2D = 5
 
 
+BEZIER_2D_ITERATIONS = 100
+
+
 class Key:
     def __init__(self):
         self.value = None
@@ -138,3 +144,171 @@ def evaluate(time, start_key, end_key, prev_key, next_key):
         return start_key.value + time_norm * (end_key.value - start_key.value)
     elif end_key.shape == Shape.STEPPED:
         return start_key.value
+
+
+def bez2_time_array(x0, x1, x2, x3, time):
+    # bisection of all bez2_time arguments at once
+    t0 = numpy.zeros(len(time))
+    t1 = numpy.ones(len(time))
+    t = numpy.zeros(len(time))
+    active = numpy.ones(len(time), dtype=bool)
+    for _ in range(BEZIER_2D_ITERATIONS):
+        t = numpy.where(active, t0 + (t1 - t0) * 0.5, t)
+        v = bezier(x0, x1, x2, x3, t)
+        active &= numpy.abs(time - v) > 0.0001
+        if not active.any():
+            break
+        greater = active & (v > time)
+        t1 = numpy.where(greater, t, t1)
+        t0 = numpy.where(active & ~greater, t, t0)
+    return t
+
+
+def is_hermite(shapes):
+    return (shapes == Shape.HERMITE.value) | (shapes == Shape.BEZIER_1D.value)
+
+
+def outgoing_array(keys, start, end, prev, has_prev):
+    shape = keys.shapes[start]
+    tension, continuity, bias = keys.tcb[start].T
+    d = keys.values[end] - keys.values[start]
+    ratio = (keys.times[end] - keys.times[start]) / (keys.times[end] - keys.times[prev])
+    # tcb
+    a = (1.0 - tension) * (1.0 + continuity) * (1.0 + bias)
+    b = (1.0 - tension) * (1.0 - continuity) * (1.0 - bias)
+    tcb_out = numpy.where(
+        has_prev,
+        ratio * (a * (keys.values[start] - keys.values[prev]) + b * d),
+        0.5 * (a + b) * d
+    )
+    # hermite
+    hermite_out = keys.params[start, 1] * numpy.where(has_prev, ratio, 1.0)
+    return numpy.select(
+        (shape == Shape.TCB.value, is_hermite(shape)),
+        (tcb_out, hermite_out),
+        0.0
+    )
+
+
+def incoming_array(keys, start, end, next_, has_next):
+    shape = keys.shapes[end]
+    tension, continuity, bias = keys.tcb[end].T
+    d = keys.values[end] - keys.values[start]
+    ratio = (keys.times[end] - keys.times[start]) / (keys.times[next_] - keys.times[start])
+    # tcb
+    a = (1.0 - tension) * (1.0 - continuity) * (1.0 + bias)
+    b = (1.0 - tension) * (1.0 + continuity) * (1.0 - bias)
+    tcb_in = numpy.where(
+        has_next,
+        ratio * (b * (keys.values[next_] - keys.values[end]) + a * d),
+        0.5 * (a + b) * d
+    )
+    # hermite
+    hermite_in = keys.params[end, 0] * numpy.where(has_next, ratio, 1.0)
+    return numpy.select(
+        (shape == Shape.TCB.value, is_hermite(shape)),
+        (tcb_in, hermite_in),
+        0.0
+    )
+
+
+class KeysArray:
+    def __init__(self, values, times, shapes, tcb, params):
+        self.values = numpy.array(values, dtype=numpy.float64)
+        self.times = numpy.array(times, dtype=numpy.float64)
+        self.shapes = numpy.array([shape.value for shape in shapes], dtype=numpy.int32)
+        self.tcb = numpy.array(tcb, dtype=numpy.float64).reshape(-1, 3)
+        self.params = numpy.array(params, dtype=numpy.float64).reshape(-1, 4)
+
+
+def evaluate_keys(start_frame, end_frame, values, times, shapes, tcb, params):
+    '''
+    Evaluates all integer frames of the keys segments at once.
+    Returns the same values and frames as the evaluate function called
+    for every frame of every keys segment, with the last key appended.
+    '''
+    keys = KeysArray(values, times, shapes, tcb, params)
+    keys_count = len(keys.values)
+    if keys_count == 0:
+        return numpy.zeros(0), numpy.zeros(0, dtype=numpy.int64)
+    if keys_count == 1:
+        # constant values
+        frames = numpy.arange(start_frame, end_frame + 1, dtype=numpy.int64)
+        return numpy.full(len(frames), keys.values[0]), frames
+
+    # segments
+    start = numpy.arange(keys_count - 1)
+    end = start + 1
+    has_prev = start > 0
+    prev = numpy.maximum(start - 1, 0)
+    has_next = end + 1 < keys_count
+    next_ = numpy.minimum(end + 1, keys_count - 1)
+    rounded_times = numpy.round(keys.times).astype(numpy.int64)
+    frames_counts = numpy.maximum(rounded_times[end] - rounded_times[start], 0)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        out = outgoing_array(keys, start, end, prev, has_prev)
+        in_ = incoming_array(keys, start, end, next_, has_next)
+
+        # segments frames
+        segment = numpy.repeat(start, frames_counts)
+        segment_offset = numpy.cumsum(frames_counts) - frames_counts
+        frames = (
+            rounded_times[segment] +
+            numpy.arange(len(segment)) -
+            segment_offset[segment]
+        )
+        start_time = keys.times[segment]
+        end_time = keys.times[segment + 1]
+        start_value = keys.values[segment]
+        end_value = keys.values[segment + 1]
+        end_shape = keys.shapes[segment + 1]
+        time_norm = (frames - start_time) / (end_time - start_time)
+
+        # hermite
+        h1, h2, h3, h4 = hermite(time_norm)
+        result = h1 * start_value + h2 * end_value + h3 * out[segment] + h4 * in_[segment]
+
+        # linear and stepped
+        linear = start_value + time_norm * (end_value - start_value)
+        result = numpy.where(end_shape == Shape.LINEAR.value, linear, result)
+        result = numpy.where(end_shape == Shape.STEPPED.value, start_value, result)
+
+        # bezier 2d
+        bezier_mask = end_shape == Shape.BEZIER_2D.value
+        if bezier_mask.any():
+            seg = segment[bezier_mask]
+            seg_end = seg + 1
+            start_is_bezier = keys.shapes[seg] == Shape.BEZIER_2D.value
+            x = numpy.where(
+                start_is_bezier,
+                keys.times[seg] + keys.params[seg, 2],
+                keys.times[seg] + (keys.times[seg_end] - keys.times[seg]) / 3
+            )
+            t = bez2_time_array(
+                keys.times[seg],
+                x,
+                keys.times[seg_end] + keys.params[seg_end, 0],
+                keys.times[seg_end],
+                frames[bezier_mask]
+            )
+            y = numpy.where(
+                start_is_bezier,
+                keys.values[seg] + keys.params[seg, 3],
+                keys.values[seg] + out[seg] / 3
+            )
+            result[bezier_mask] = bezier(
+                keys.values[seg],
+                y,
+                keys.params[seg_end, 1] + keys.values[seg_end],
+                keys.values[seg_end],
+                t
+            )
+
+    result = numpy.where(frames == end_time, end_value, result)
+    result = numpy.where(frames == start_time, start_value, result)
+
+    # last key
+    result = numpy.append(result, keys.values[-1])
+    frames = numpy.append(frames, rounded_times[-1])
+    return result, frames
@@ -1,5 +1,8 @@
 # standart modules
+import os
+import mmap
 import struct
+import contextlib
 
 # blender modules
 import numpy
@@ -11,6 +14,17 @@ from . import lzhuf
 ENCODE_ERROR = BaseException
 
 
+def map_file(file_path):
+    # Returns read-only memoryview of the file mapping. File pages are
+    # loaded on first access, slices of the view do not copy data.
+    # The mapping is closed when the last view is released.
+    with open(file_path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return memoryview(b'')
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapping)
+
+
 class FastBytes:
     @staticmethod
     def short_at(data, offs):
@@ -86,11 +100,15 @@ class PackedReader:
         return coord_z, coord_y, coord_x
 
     def get_array(self, fmt, count):
-        dtype_format = self.__NUMPY_FORMATS.get(fmt, None)
-        if not dtype_format:
-            raise Exception('Unsupported numpy format: {}'.format(fmt))
-        dtype = numpy.dtype(dtype_format)
-        dtype = dtype.newbyteorder('<')
+        if isinstance(fmt, numpy.dtype):
+            # structured or explicit byte order dtype
+            dtype = fmt
+        else:
+            dtype_format = self.__NUMPY_FORMATS.get(fmt, None)
+            if not dtype_format:
+                raise Exception('Unsupported numpy format: {}'.format(fmt))
+            dtype = numpy.dtype(dtype_format)
+            dtype = dtype.newbyteorder('<')
         size = dtype.itemsize
         verts = numpy.frombuffer(
             self.__data,
@@ -167,12 +185,31 @@ class PackedReader:
         self.__offs = offset
 
 
+def read_chunk_data(data, offset, size, compressed):
+    if compressed:
+        textsize = FastBytes.int_at(data, offset)
+        buffer = data[offset + 4 : offset + size]
+        return memoryview(lzhuf.decompress_buffer(buffer, textsize))
+    return data[offset : offset + size]
+
+
 class ChunkedReader:
     __MASK_COMPRESSED = 0x80000000
 
     def __init__(self, data):
         self.__offs = 0
         self.__data = data
+        self.__last_chunk = None
+
+    @classmethod
+    def from_file(cls, file_path, mapped=False):
+        # in mapped mode chunks are memoryview slices of the file mapping
+        if mapped:
+            data = map_file(file_path)
+        else:
+            with open(file_path, 'rb') as file:
+                data = file.read()
+        return cls(data)
 
     def __iter__(self):
         return self
@@ -186,12 +223,10 @@ class ChunkedReader:
         size = FastBytes.int_at(data, offs + 4)
         offs += 8
         self.__offs = offs + size
-        if cid & ChunkedReader.__MASK_COMPRESSED:
-            cid &= ~ChunkedReader.__MASK_COMPRESSED
-            textsize = FastBytes.int_at(data, offs)
-            buffer = data[offs + 4:offs + size]
-            return cid, memoryview(lzhuf.decompress_buffer(buffer, textsize))
-        return cid, data[offs:offs + size]
+        compressed = bool(cid & ChunkedReader.__MASK_COMPRESSED)
+        cid &= ~ChunkedReader.__MASK_COMPRESSED
+        self.__last_chunk = (offs, size, compressed)
+        return cid, read_chunk_data(data, offs, size, compressed)
 
     def next(self, expected_cid, no_error=False):
         cid, data = next(self)
@@ -211,6 +246,11 @@ class ChunkedReader:
     def get_size(self):
         return len(self.__data)
 
+    def last_chunk(self):
+        # offset, size and compression flag of the last read chunk
+        # data, as it is stored in the reader data
+        return self.__last_chunk
+
 
 class PackedWriter():
     def __init__(self):
@@ -239,9 +279,96 @@ class PackedWriter():
 
 
 class ChunkedWriter():
+    __MASK_COMPRESSED = 0x80000000
+
     def __init__(self):
         self.data = bytearray()
 
-    def put(self, cid, writer):
-        self.data += struct.pack('II', cid, len(writer.data))
-        self.data += writer.data
+    def put(self, cid, writer, compress=False):
+        if compress:
+            textsize = len(writer.data)
+            buffer = lzhuf.compress_buffer(writer.data)
+            self.data += struct.pack(
+                'III',
+                cid | ChunkedWriter.__MASK_COMPRESSED,
+                len(buffer) + 4,
+                textsize
+            )
+            self.data += buffer
+        else:
+            self.data += struct.pack('II', cid, len(writer.data))
+            self.data += writer.data
+
+    @contextlib.contextmanager
+    def chunk(self, cid):
+        # chunk with nested chunks, written after the block
+        writer = ChunkedWriter()
+        yield writer
+        self.put(cid, writer)
+
+
+class FilePackedWriter():
+    # PackedWriter that writes directly into the opened file
+
+    def __init__(self, file):
+        self.file = file
+
+    def putp(self, pkw):
+        self.file.write(pkw.data)
+
+    def putf(self, fmt, *args):
+        self.file.write(struct.pack(fmt, *args))
+
+    def putv3f(self, vec):
+        # write vertex coord
+        self.file.write(struct.pack('<3f', vec[0], vec[2], vec[1]))
+
+    def puts(self, string):
+        try:
+            data = string.encode('cp1251')
+        except UnicodeEncodeError:
+            raise ENCODE_ERROR('Not valid string: {}'.format(string))
+        self.file.write(data + b'\x00')
+
+    def offset(self):
+        return self.file.tell()
+
+    def replace(self, offset, byte_list):
+        end_offset = self.file.tell()
+        self.file.seek(offset)
+        self.file.write(bytes(byte_list))
+        self.file.seek(end_offset)
+
+
+class FileChunkedWriter():
+    # ChunkedWriter that writes directly into the opened file
+    __MASK_COMPRESSED = 0x80000000
+
+    def __init__(self, file):
+        self.file = file
+
+    def put(self, cid, writer, compress=False):
+        if compress:
+            textsize = len(writer.data)
+            buffer = lzhuf.compress_buffer(writer.data)
+            self.file.write(struct.pack(
+                'III',
+                cid | FileChunkedWriter.__MASK_COMPRESSED,
+                len(buffer) + 4,
+                textsize
+            ))
+            self.file.write(buffer)
+        else:
+            self.file.write(struct.pack('II', cid, len(writer.data)))
+            self.file.write(writer.data)
+
+    @contextlib.contextmanager
+    def chunk(self, cid):
+        # chunk with nested chunks, size is back-patched after the block
+        header_offset = self.file.tell()
+        self.file.write(struct.pack('II', cid, 0))
+        yield FileChunkedWriter(self.file)
+        end_offset = self.file.tell()
+        self.file.seek(header_offset + 4)
+        self.file.write(struct.pack('I', end_offset - header_offset - 8))
+        self.file.seek(end_offset)
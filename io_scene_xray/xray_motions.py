@@ -1,10 +1,12 @@
 # blender modules
 import bpy
 import mathutils
+import numpy
 
 # addon modules
 from . import utils
 from . import motion_utils
+from . import motion_decode
 from . import text
 from . import xray_io
 from . import log
@@ -24,127 +26,33 @@ MOTIONS_FILTER_ALL = lambda name: True
 CURVE_COUNT = 6    # translation xyz, rotation xyz
 
 
-def interpolate_keys(fps, start, end, values, times, shapes, tcb, params):
-    interpolated_values = []
-    interpolated_times = []
-    keys_count = len(values)
-    unsupported_shapes = set()
-    errors = {}
-    for index_start, key_info in enumerate(zip(values, times, shapes, tcb, params)):
-        value_start, time_start, shape_start, tcb_start, params_start = key_info
-        if not shape_start in (
-                xray_interpolation.Shape.TCB,
-                xray_interpolation.Shape.HERMITE,
-                xray_interpolation.Shape.BEZIER_1D,
-                xray_interpolation.Shape.LINEAR,
-                xray_interpolation.Shape.STEPPED,
-                xray_interpolation.Shape.BEZIER_2D
-            ):
-            unsupported_shapes.add(shape_start.name)
-            errors[shape_start.name] = errors.setdefault(shape_start.name, 0) + 1
-            continue
-        index_end = index_start + 1
-        if keys_count == 1:
-            # constant values
-            for frame_index in range(start, end + 1):
-                interpolated_values.append(value_start)
-                interpolated_times.append(frame_index)
-            continue
-        if index_end >= keys_count:
-            interpolated_values.append(value_start)
-            interpolated_times.append(int(round(time_start, 0)))
-            continue
-        value_end = values[index_end]
-        time_end = times[index_end]
-        shape_end = shapes[index_end]
-        tcb_end = tcb[index_end]
-        params_end = params[index_end]
-        if index_start > 0:
-            prev_time = times[index_start - 1]
-            prev_value = values[index_start - 1]
-        else:
-            prev_time = None
-            prev_value = None
-        index_next = index_end + 1
-        if index_next < keys_count:
-            next_time = times[index_next]
-            next_value = values[index_next]
-        else:
-            next_time = None
-            next_value = None
-        start_frame = int(round(time_start, 0))
-        end_frame = int(round(time_end, 0))
-
-        # start key
-        start_key = xray_interpolation.Key()
-        start_key.time = time_start
-        start_key.value = value_start
-        start_key.shape = shape_start
-        start_key.tension = tcb_start[0]
-        start_key.continuity = tcb_start[1]
-        start_key.bias = tcb_start[2]
-        start_key.param_1 = params_start[0]
-        start_key.param_2 = params_start[1]
-        start_key.param_3 = params_start[2]
-        start_key.param_4 = params_start[3]
-        # end key
-        end_key = xray_interpolation.Key()
-        end_key.time = time_end
-        end_key.value = value_end
-        end_key.shape = shape_end
-        end_key.tension = tcb_end[0]
-        end_key.continuity = tcb_end[1]
-        end_key.bias = tcb_end[2]
-        end_key.param_1 = params_end[0]
-        end_key.param_2 = params_end[1]
-        end_key.param_3 = params_end[2]
-        end_key.param_4 = params_end[3]
-        # next key
-        next_key = xray_interpolation.Key()
-        next_key.time = next_time
-        next_key.value = next_value
-        # preview key
-        prev_key = xray_interpolation.Key()
-        prev_key.time = prev_time
-        prev_key.value = prev_value
-        for frame_index in range(start_frame, end_frame):
-            interpolated_value = xray_interpolation.evaluate(
-                frame_index, start_key, end_key, prev_key, next_key
-            )
-            interpolated_values.append(interpolated_value)
-            interpolated_times.append(frame_index)
-    if unsupported_shapes:
-        raise utils.AppError(
-            text.error.motion_shape,
-            log.props(shapes=unsupported_shapes, count=errors)
-        )
-    return interpolated_values, interpolated_times
-
-
-@log.with_context('import-motion')
 def import_motion(
         reader, context, bonesmap, reported,
         motions_filter=MOTIONS_FILTER_ALL, skl_file_name=None
     ):
+    try:
+        motion = motion_decode.read_motion(
+            reader, motions_filter, skl_file_name
+        )
+    except motion_decode.DecodeError as error:
+        raise utils.convert_decode_error(error)
+    if motion:
+        return apply_motion(motion, context, bonesmap, reported)
+
+
+@log.with_context('import-motion')
+def apply_motion(motion_data, context, bonesmap, reported):
     bpy_armature = context.bpy_arm_obj
-    name = reader.gets()
-    if skl_file_name:
-        name = skl_file_name
+    name = motion_data.name
     bone_maps = {}
     converted_warrnings = []
 
-    if not motions_filter(name):
-        skip = skip_motion_rest(reader.getv(), 0)
-        reader.skip(skip)
-        return
     act = bpy.data.actions.new(name=name)
     act.use_fake_user = True
     xray = act.xray
-    start_frame, end_frame = reader.getf('II')  # range
-    fps, ver = reader.getf('fH')
-    xray.fps = fps
-    if ver < 6:
-        raise utils.AppError(text.error.motion_ver, log.props(version=ver))
+    start_frame = motion_data.start_frame
+    end_frame = motion_data.end_frame
+    xray.fps = motion_data.fps
 
     if context.add_actions_to_motion_list:
         motion = bpy_armature.xray.motions_collection.add()
@@ -156,67 +64,19 @@ def import_motion(
         bpy_armature.xray.use_custom_motion_names = True
         motion.export_name = name
 
-    xray.flags, xray.bonepart = reader.getf('<BH')
-    xray.speed, xray.accrue, xray.falloff, xray.power = reader.getf('<ffff')
+    xray.flags, xray.bonepart = motion_data.flags, motion_data.bonepart
+    xray.speed, xray.accrue = motion_data.speed, motion_data.accrue
+    xray.falloff, xray.power = motion_data.falloff, motion_data.power
     multiply = version_utils.get_multiply()
     converted_shapes = []
     converted_shapes_names = set()
-    for _bone_idx in range(reader.getf('H')[0]):
-        bname = reader.gets()
-        flags = reader.getf('B')[0]
-        if flags != 0:
-            log.warn(text.warn.motion_non_zero_flags, bone=bname, flags=flags)
-        curves = [None, ] * CURVE_COUNT
-        used_times = set()
-        has_interpolate = False
-        for curve_index in range(CURVE_COUNT):
-            values = []
-            times = []
-            shapes = []
-            tcb = []
-            params = []
-            use_interpolate = False
-            behaviors = reader.getf('BB')
-            if (behaviors[0] != 1) or (behaviors[1] != 1):
-                log.warn(
-                    text.warn.motion_behaviors,
-                    bone=bname,
-                    behaviors=behaviors
-                )
-            for _keyframe_idx in range(reader.getf('H')[0]):
-                val = reader.getf('f')[0]
-                time = reader.getf('f')[0] * fps
-                shape = xray_interpolation.Shape(reader.getf('B')[0])
-                values.append(val)
-                times.append(time)
-                shapes.append(shape)
-                used_times.add(time)
-                if shape != xray_interpolation.Shape.STEPPED:
-                    tension = reader.getq16f(-32.0, 32.0)
-                    continuity = reader.getq16f(-32.0, 32.0)
-                    bias = reader.getq16f(-32.0, 32.0)
-                    param = []
-                    for param_index in range(4):
-                        param_value = reader.getq16f(-32.0, 32.0)
-                        param.append(param_value)
-                    tcb.append((tension, continuity, bias))
-                    params.append(param)
-                    use_interpolate = True
-                    has_interpolate = True
-                    converted_shapes.append((shape, name, bname))
-                else:
-                    tcb.append((0.0, 0.0, 0.0))
-                    params.append((0.0, 0.0, 0.0, 0.0))
-            if use_interpolate:
-                curve_end_time = int(round(times[-1], 0))
-                if curve_end_time < end_frame and curve_end_time:
-                    times.append(end_frame)
-                    values.append(values[-1])
-                    shapes.append(shapes[-1])
-                    tcb.append(tcb[-1])
-                    params.append(params[-1])
-                values, times = interpolate_keys(fps, start_frame, end_frame, values, times, shapes, tcb, params)
-            curves[curve_index] = values, times
+    for bone in motion_data.bones:
+        bname = bone.name
+        for message, props in bone.warnings:
+            log.warn(getattr(text.warn, message), **props)
+        curves = bone.curves
+        has_interpolate = bone.has_interpolate
+        converted_shapes.extend(bone.converted_shapes)
         used_times = set()
         if not has_interpolate:
             tmpfc = [
@@ -242,8 +102,9 @@ def import_motion(
                     if bname not in reported:
                         log.warn(text.warn.motion_no_bone, bone=bname)
                         reported.add(bname)
-                    for fcurve in tmpfc:
-                        act.fcurves.remove(fcurve)
+                    if not has_interpolate:
+                        for fcurve in tmpfc:
+                            act.fcurves.remove(fcurve)
                     continue
             if bname not in reported:
                 log.warn(
@@ -269,7 +130,7 @@ def import_motion(
                 bone_maps[bone_name]
             ))
             converted_shapes_names.add(shape.name)
-        data_path = 'pose.bones["' + bname + '"]'
+        data_path = motion_utils.get_bone_data_path(bname)
         fcs = [
             act.fcurves.new(data_path + '.location', index=0, action_group=bname),
             act.fcurves.new(data_path + '.location', index=1, action_group=bname),
@@ -350,25 +211,32 @@ def import_motion(
             motion=motion_name, bone=bone_name,
             keys_count=keys_count
         )
-    if ver >= 7:
-        for _bone_idx in range(reader.getf('I')[0]):
-            name = reader.gets_a()
-            reader.skip((4 + 4) * reader.getf('I')[0])
-            log.warn(text.warn.motion_markers, name=name)
+    for marker_name in motion_data.markers:
+        log.warn(text.warn.motion_markers, name=marker_name)
     return act
 
 
 def import_motions(reader, context, motions_filter=MOTIONS_FILTER_ALL):
-    bpy_armature = context.bpy_arm_obj
-    motions_count = reader.getf('I')[0]
-    if motions_count:
-        bonesmap = {
-            bone.name.lower(): bone
-            for bone in bpy_armature.data.bones
-        }
+    try:
+        motions = motion_decode.read_motions(reader, motions_filter)
+    except motion_decode.DecodeError as error:
+        raise utils.convert_decode_error(error)
+    apply_motions(motions, context)
+
+
+def apply_motions(motions, context):
+    if motions:
+        bonesmap = get_bones_map(context.bpy_arm_obj)
         reported = set()
-        for _ in range(motions_count):
-            import_motion(reader, context, bonesmap, reported, motions_filter)
+        for motion in motions:
+            apply_motion(motion, context, bonesmap, reported)
+
+
+def get_bones_map(bpy_armature):
+    return {
+        bone.name.lower(): bone
+        for bone in bpy_armature.data.bones
+    }
 
 
 @log.with_context('examine-motion')
@@ -379,28 +247,10 @@ def _examine_motion(data, offs):
 
 
 def skip_motion_rest(data, offs):
-    ptr = offs + 4 + 4 + 4 + 2
-    ver = xray_io.FastBytes.short_at(data, ptr - 2)
-    if ver < 6:
-        raise utils.AppError(text.error.motion_ver, log.props(version=ver))
-
-    ptr += (1 + 2 + 4 * 4) + 2
-    for _bone_idx in range(xray_io.FastBytes.short_at(data, ptr - 2)):
-        ptr = xray_io.FastBytes.skip_str_at(data, ptr) + 1
-        for _fcurve_idx in range(6):
-            ptr += 1 + 1 + 2
-            for _kf_idx in range(xray_io.FastBytes.short_at(data, ptr - 2)):
-                ptr += (4 + 4) + 1
-                shape = data[ptr - 1]
-                if shape != 4:
-                    ptr += (2 * 3 + 2 * 4)
-    if ver >= 7:
-        ptr += 4
-        for _bone_idx in range(xray_io.FastBytes.int_at(data, ptr - 4)):
-            ptr = xray_io.FastBytes.skip_str_at_a(data, ptr) + 4
-            ptr += (4 + 4) * xray_io.FastBytes.int_at(data, ptr - 4)
-
-    return ptr
+    try:
+        return motion_decode.skip_motion_rest(data, offs)
+    except motion_decode.DecodeError as error:
+        raise utils.convert_decode_error(error)
 
 
 def examine_motions(data):
@@ -428,35 +278,17 @@ def export_motion(pkw, action, armature):
 
 
 def _bake_motion_data(action, armature, prepared_bones):
-    exportable_bones = [(bone, parent, []) for bone, parent in prepared_bones]
-
-    has_old_action = False
-    if armature.animation_data:
-        old_act = armature.animation_data.action
-        has_old_action = True
-    else:
-        armature.animation_data_create()
-    old_frame = bpy.context.scene.frame_current
-    root_bone_names = []
-    try:
-        armature.animation_data.action = action
-        for frm in range(int(action.frame_range[0]), int(action.frame_range[1]) + 1):
-            bpy.context.scene.frame_set(frm)
-            for pbone, parent, data in exportable_bones:
-                if parent:
-                    parent_matrix = parent.matrix.inverted()
-                else:
-                    parent_matrix = MATRIX_BONE_INVERTED
-                    root_bone_names.append(pbone.name)
-                data.append(version_utils.multiply(parent_matrix, pbone.matrix))
-    finally:
-        if has_old_action:
-            armature.animation_data.action = old_act
-        bpy.context.scene.frame_set(old_frame)
-
+    root_bone_names = [
+        pbone.name
+        for pbone, parent in prepared_bones
+            if not parent
+    ]
+    baked_matrices = motion_utils.bake_motion(
+        armature, action, prepared_bones, MATRIX_BONE_INVERTED
+    )
     return [
         (pbone.name, animation)
-        for pbone, _, animation in exportable_bones
+        for (pbone, _), animation in zip(prepared_bones, baked_matrices)
     ], root_bone_names
 
 
@@ -509,9 +341,12 @@ def _export_motion_data(pkw, action, bones_animations, armature, root_bone_names
             curves[4].append(-rot[0])
             curves[5].append(+rot[2])
 
-        def curve2keys(curve):
-            for frm, val in enumerate(curve):
-                yield motion_utils.KF(frm / xray.fps, val, xray_interpolation.Shape.STEPPED)
+        def refine_curve(curve, epsilon):
+            times = numpy.arange(len(curve)) / xray.fps
+            linear = numpy.zeros(len(curve), dtype=bool)
+            mask = motion_utils.refine_mask(times, curve, linear, epsilon)
+            for frm in numpy.flatnonzero(mask).tolist():
+                yield motion_utils.KF(frm / xray.fps, curve[frm], xray_interpolation.Shape.STEPPED)
 
         if name in root_bone_names:
             frange = action.frame_range
@@ -535,7 +370,7 @@ def _export_motion_data(pkw, action, bones_animations, armature, root_bone_names
             cpkw = xray_io.PackedWriter()
             ccnt = motion_utils.export_keyframes(
                 cpkw,
-                motion_utils.refine_keys(curve2keys(curve), epsilon),
+                refine_curve(curve, epsilon),
                 time_end=time_end,
                 fps=xray.fps
             )
@@ -1,10 +1,14 @@
 import re
+import shutil
 
 import bpy
 
 from tests import utils
 from io_scene_xray.skl.ops import XRAY_OT_import_skls
 from io_scene_xray.ui.motion_list import BaseSelectMotionsOp
+from io_scene_xray import skls_browser
+from io_scene_xray import motion_decode
+from io_scene_xray import utils as utl
 
 
 class TestSklImport(utils.XRayTestCase):
@@ -123,6 +127,92 @@ class TestSklImport(utils.XRayTestCase):
         bpy.ops.io_scene_xray.motions_select()
         self.assertEqual(deselected(), ['10'], msg='only 10 is deselected')
 
+    def test_skls_browser_index(self):
+        # Arrange
+        file_path = self.outpath('test_fmt.skls')
+        shutil.copyfile(self.relpath('test_fmt.skls'), file_path)
+        index_path = skls_browser.get_index_path(file_path)
+        SklsFile = skls_browser.XRAY_OT_browse_skls_file.SklsFile
+
+        # Act
+        skls_file = SklsFile(file_path)
+
+        # Assert
+        self.assertEqual(list(skls_file.animations.keys()), ['xact'])
+        self.assertFileExists(index_path)
+        packed_reader = skls_file.read_animation('xact')
+        self.assertEqual(packed_reader.gets(), 'xact')
+        file_stat = skls_browser.get_file_stat(file_path)
+        self.assertEqual(
+            skls_browser.read_index(index_path, file_stat),
+            skls_file.animations
+        )
+        self.assertEqual(SklsFile(file_path).animations, skls_file.animations)
+
+        # outdated index is not used
+        outdated_stat = (file_stat[0] + 1, file_stat[1])
+        self.assertIsNone(skls_browser.read_index(index_path, outdated_stat))
+
+    def test_skl_import_workers(self):
+        # Arrange
+        self._create_armature('Bone')
+        prefs = utils.get_preferences()
+        prefs.import_workers_count = 2
+        file_path = self.relpath('test_fmt.skls')
+        executor = utl.get_process_executor(2)
+        self.assertIsNotNone(executor)
+
+        # Act: workers
+        with executor:
+            with utl._spawn_without_main():
+                future = executor.submit(
+                    motion_decode.decode_motions_file, file_path
+                )
+            worker_motions = future.result()
+
+        # Assert
+        self.assertEqual(
+            _dump_motions(worker_motions),
+            _dump_motions(motion_decode.decode_motions_file(file_path))
+        )
+
+        # Act: import
+        try:
+            bpy.ops.xray_import.skls(
+                directory=self.relpath(),
+                files=[{'name': 'test_fmt.skl'}, {'name': 'test_fmt.skls'}],
+            )
+        finally:
+            prefs.import_workers_count = 1
+
+        # Assert
+        self.assertReportsNotContains('WARNING')
+        self.assertEqual(len(bpy.data.actions), 2)
+        for name in ('test_fmt', 'xact'):
+            act = bpy.data.actions[name]
+            self.assertEqual(len(act.fcurves[0].keyframe_points), 3)
+
+    def test_decode_motions_file(self):
+        # Act
+        skl_motions = motion_decode.decode_motions_file(
+            self.relpath('test_fmt.skl')
+        )
+        skls_motions = motion_decode.decode_motions_file(
+            self.relpath('test_fmt.skls'), {'xact'}
+        )
+        filtered_motions = motion_decode.decode_motions_file(
+            self.relpath('test_fmt.skls'), set()
+        )
+
+        # Assert
+        self.assertEqual([motion.name for motion in skl_motions], ['test_fmt'])
+        self.assertEqual([motion.name for motion in skls_motions], ['xact'])
+        self.assertEqual(filtered_motions, [])
+        bone = skls_motions[0].bones[0]
+        self.assertEqual(bone.name, 'Bone')
+        self.assertEqual(len(bone.curves), 6)
+        self.assertEqual(len(bone.curves[0][0]), 3)
+
     def _create_armature(self, bone_name):
         arm = bpy.data.armatures.new('tarm')
         obj = bpy.data.objects.new('tobj', arm)
@@ -134,3 +224,13 @@ class TestSklImport(utils.XRayTestCase):
             bone.tail.y = 1
         finally:
             bpy.ops.object.mode_set(mode='OBJECT')
+
+
+def _dump_motions(motions):
+    # decoded motions have no __eq__, they are compared by attributes
+    dump = []
+    for motion in motions:
+        attributes = dict(vars(motion))
+        attributes['bones'] = [vars(bone) for bone in motion.bones]
+        dump.append(attributes)
+    return dump
@@ -1,6 +1,12 @@
+import struct
+
 from tests import utils
 
 import bpy
+import numpy
+
+from io_scene_xray import xray_io
+from io_scene_xray.details import fmt, utility, write
 
 
 class TestDetailsExport(utils.XRayTestCase):
@@ -52,6 +58,23 @@ class TestDetailsExport(utils.XRayTestCase):
             'test_v2_1233.details'
         })
 
+    def test_write_slots(self):
+        for version, old_format in ((3, None), (2, 1), (2, 2)):
+            # Arrange
+            lvl_dets = _create_random_lvl_dets(version, old_format)
+            reference = _pack_reference_slots(lvl_dets)
+            chunked_writer = xray_io.ChunkedWriter()
+
+            # Act
+            if version == 3:
+                write.write_slots_v3(chunked_writer, lvl_dets)
+            else:
+                write.write_slots_v2(chunked_writer, lvl_dets)
+
+            # Assert
+            chunks = dict(xray_io.ChunkedReader(chunked_writer.data))
+            self.assertEqual(bytes(chunks[fmt.Chunks.SLOTS]), reference)
+
     def _create_details_slots_objects(self, data):
 
         vertices_1 = (
@@ -208,3 +231,202 @@ class TestDetailsExport(utils.XRayTestCase):
             pixel = (0.5, 0.5, 0.5, 1.0)
             light_image = _create_image('light', 4, 4, pixel)
             data.slots.ligthing.lights_image = light_image.name
+
+
+def _create_random_image(name, width, height, random, palette=None):
+    pixels = random.uniform(0.0, 1.0, (height, width, 4))
+    if palette is not None:
+        # the rest of the colors are not in the palette
+        in_palette = random.uniform(size=(height, width)) < 0.7
+        colors = random.randint(0, len(palette), (height, width))
+        pixels[in_palette, : 3] = palette[colors[in_palette]]
+    image = bpy.data.images.new(name, width, height)
+    image.pixels = pixels.ravel().tolist()
+    return image
+
+
+def _create_random_slots_object(name, lvl_dets, heights, order):
+    vertices = []
+    polygons = []
+    for slot_index in order.tolist():
+        slot_x = slot_index % lvl_dets.slots_size_x - lvl_dets.slots_offset_x
+        slot_y = slot_index // lvl_dets.slots_size_x - lvl_dets.slots_offset_y
+        height = heights[slot_index]
+        start = len(vertices)
+        for offset_x, offset_y in ((0, 0), (2, 0), (2, 2), (0, 2)):
+            vertices.append((
+                slot_x * 2.0 + offset_x, slot_y * 2.0 + offset_y, height
+            ))
+        polygons.append(tuple(range(start, start + 4)))
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(vertices, (), polygons)
+    return bpy.data.objects.new(name, mesh)
+
+
+def _create_random_lvl_dets(version, old_format):
+    random = numpy.random.RandomState(version * 10 + (old_format or 0))
+    lvl_dets = fmt.LevelDetails()
+    lvl_dets.slots_size_x = 6
+    lvl_dets.slots_size_y = 4
+    lvl_dets.slots_offset_x = 3
+    lvl_dets.slots_offset_y = -1
+    lvl_dets.slots_count = lvl_dets.slots_size_x * lvl_dets.slots_size_y
+    lvl_dets.old_format = old_format
+
+    meshes_object = bpy.data.objects.new('meshes', None)
+    for mesh_index in range(3):
+        bpy.data.objects.new('mesh', None).parent = meshes_object
+    lvl_dets.meshes_object = meshes_object
+
+    # polygons are not in slots order
+    order = random.permutation(lvl_dets.slots_count)
+    base_heights = random.uniform(-50.0, 50.0, lvl_dets.slots_count)
+    top_heights = base_heights + random.uniform(
+        0.05, 20.0, lvl_dets.slots_count
+    )
+    lvl_dets.slots_base_object = _create_random_slots_object(
+        'base', lvl_dets, base_heights, order
+    )
+    lvl_dets.slots_top_object = _create_random_slots_object(
+        'top', lvl_dets, top_heights, order
+    )
+
+    color_indices = utility.gen_meshes_color_indices_table(
+        3, format_version=version
+    )
+    palette = numpy.array(list(color_indices.keys())) / 21
+    size_x = lvl_dets.slots_size_x
+    size_y = lvl_dets.slots_size_y
+    for mesh_index in range(4):
+        setattr(lvl_dets, 'mesh_{}'.format(mesh_index), _create_random_image(
+            'mesh_{}'.format(mesh_index),
+            size_x * 2,
+            size_y * 2,
+            random,
+            palette
+        ))
+    if version == 3:
+        lvl_dets.lights = _create_random_image('lights', size_x, size_y, random)
+        lvl_dets.hemi = _create_random_image('hemi', size_x, size_y, random)
+        lvl_dets.shadows = _create_random_image(
+            'shadows', size_x, size_y, random
+        )
+    else:
+        lvl_dets.lights = _create_random_image(
+            'lights', size_x * 2, size_y * 2, random
+        )
+    return lvl_dets
+
+
+def _pack_reference_slots(lvl_dets):
+    # per slot packing, as it was before numpy
+    size_x = lvl_dets.slots_size_x
+    version = 2 if lvl_dets.old_format else 3
+    empty_id = 255 if version == 2 else 63
+    color_indices = utility.gen_meshes_color_indices_table(
+        len(lvl_dets.meshes_object.children), format_version=version
+    )
+    color_step = 1.0 / 21
+
+    def get_slot_index(location):
+        slot_x = int(round((location[0] - 1.0) / 2.0, 0))
+        slot_y = int(round((location[1] - 1.0) / 2.0, 0))
+        return (slot_y + lvl_dets.slots_offset_y) * size_x + \
+            slot_x + lvl_dets.slots_offset_x
+
+    def get_corner_index(slot_x, slot_y, offset):
+        return (slot_x * 2 + offset[0] + \
+            (slot_y * 2 + offset[1]) * size_x * 2) * 4
+
+    def get_mesh_id(pixels, slot_x, slot_y):
+        index = get_corner_index(slot_x, slot_y, (0, 0))
+        color = tuple(
+            int(round(pixels[index + component] / color_step, 0))
+            for component in range(3)
+        )
+        return color_indices.get(color, empty_id)
+
+    def get_corners(pixels, slot_x, slot_y, offsets, get_value):
+        value = 0
+        for corner_index in range(4):
+            index = get_corner_index(slot_x, slot_y, offsets[corner_index])
+            value |= int(round(
+                get_value(pixels[index : index + 4]) / fmt.DENSITY_DEPTH, 0
+            )) << (4 * corner_index)
+        return value
+
+    def get_density(pixels, slot_x, slot_y):
+        return get_corners(
+            pixels, slot_x, slot_y, fmt.PIXELS_OFFSET_1,
+            lambda color: color[3]
+        )
+
+    base_polygons = lvl_dets.slots_base_object.data.polygons
+    top_polygons = lvl_dets.slots_top_object.data.polygons
+    heights = [[None, None] for _ in range(lvl_dets.slots_count)]
+    for base, top in zip(base_polygons, top_polygons):
+        if version == 3:
+            heights[get_slot_index(base.center)][0] = \
+                int(round((base.center[2] + 200.0) / 0.2, 0)) & 0xfff
+            heights[get_slot_index(top.center)][1] = (int(round(
+                (top.center[2] - base.center[2] - 0.05) / 0.1, 0
+            )) & 0xff) << 12
+        else:
+            heights[get_slot_index(base.center)][0] = base.center[2]
+            heights[get_slot_index(top.center)][1] = top.center[2]
+
+    meshes_pixels = [
+        list(getattr(lvl_dets, 'mesh_{}'.format(mesh_index)).pixels)
+        for mesh_index in range(4)
+    ]
+    lights_pixels = list(lvl_dets.lights.pixels)
+    if version == 3:
+        hemi_pixels = list(lvl_dets.hemi.pixels)
+        shadows_pixels = list(lvl_dets.shadows.pixels)
+    elif lvl_dets.old_format == 1:
+        light_offsets = fmt.PIXELS_OFFSET_1
+    else:
+        light_offsets = fmt.PIXELS_OFFSET_2
+
+    data = bytearray()
+    for slot_y in range(lvl_dets.slots_size_y):
+        for slot_x in range(size_x):
+            slot_index = slot_y * size_x + slot_x
+            meshes_ids = [
+                get_mesh_id(pixels, slot_x, slot_y)
+                for pixels in meshes_pixels
+            ]
+            density = [
+                get_density(pixels, slot_x, slot_y)
+                for pixels in meshes_pixels
+            ]
+            if version == 3:
+                index = slot_index * 4
+                hemi = int(round(
+                    0xf * (sum(hemi_pixels[index : index + 3]) / 3), 0
+                ))
+                shadow = int(round(
+                    0xf * (sum(shadows_pixels[index : index + 3]) / 3), 0
+                ))
+                light_r, light_g, light_b = (
+                    int(round(0xf * value, 0))
+                    for value in lights_pixels[index : index + 3]
+                )
+                data += struct.pack(
+                    '<2I4H',
+                    heights[slot_index][0] | heights[slot_index][1] | \
+                    meshes_ids[0] << 20 | meshes_ids[1] << 26,
+                    meshes_ids[2] | meshes_ids[3] << 6 | \
+                    shadow << 12 | hemi << 16 | \
+                    light_r << 20 | light_g << 24 | light_b << 28,
+                    *density
+                )
+            else:
+                data += struct.pack('<2f', *heights[slot_index])
+                for mesh_id, mesh_density in zip(meshes_ids, density):
+                    data += struct.pack('<BH', mesh_id, mesh_density)
+                data += struct.pack('<H', get_corners(
+                    lights_pixels, slot_x, slot_y, light_offsets,
+                    lambda color: sum(color[ : 3]) / 3
+                ))
+    return bytes(data)
@@ -1,6 +1,92 @@
 from tests import utils
 
 import bpy
+import numpy
+from io_scene_xray import xray_io
+from io_scene_xray.details import fmt, read, utility
+
+
+def _read_reference_pixels(file_path, format_version):
+    # per slot decoding of the images, as it was before numpy
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    for chunk_id, chunk_data in xray_io.ChunkedReader(data):
+        if chunk_id == fmt.Chunks.HEADER:
+            header = read.read_header(xray_io.PackedReader(chunk_data))
+        elif chunk_id == fmt.Chunks.SLOTS:
+            slots_data = chunk_data
+    packed_reader = xray_io.PackedReader(slots_data)
+    color_indices = utility.generate_color_indices()
+    size_x = header.size.x
+    meshes = [[1.0] * (header.slots_count * 16) for _ in range(4)]
+    lighting = [1.0] * (header.slots_count * 16)
+    lights = []
+    shadows = []
+    hemi = []
+    if format_version == 'builds_1233-1558':
+        light_offset = fmt.PIXELS_OFFSET_2
+    else:
+        light_offset = fmt.PIXELS_OFFSET_1
+
+    def set_pixel(pixels, offset, slot_x, slot_y, corner, rgba):
+        index = slot_x * 2 + offset[corner][0] + \
+            size_x * 2 * (slot_y * 2 + offset[corner][1])
+        pixels[index * 4 : index * 4 + 4] = rgba
+
+    for slot_y in range(header.size.y):
+        for slot_x in range(size_x):
+            if header.format_version == 3:
+                slot = packed_reader.getf('<2I4H')
+                meshes_ids = (
+                    (slot[0] >> 20) & 0x3f,
+                    (slot[0] >> 26) & 0x3f,
+                    slot[1] & 0x3f,
+                    (slot[1] >> 6) & 0x3f
+                )
+                densities = slot[2 : 6]
+                shadow = ((slot[1] >> 12) & 0xf) / 0xf
+                shadows.extend((shadow, shadow, shadow, 1.0))
+                hemi_value = ((slot[1] >> 16) & 0xf) / 0xf
+                hemi.extend((hemi_value, hemi_value, hemi_value, 1.0))
+                lights.extend((
+                    ((slot[1] >> 20) & 0xf) / 0xf,
+                    ((slot[1] >> 24) & 0xf) / 0xf,
+                    ((slot[1] >> 28) & 0xf) / 0xf,
+                    1.0
+                ))
+            else:
+                slot = packed_reader.getf('<2fBHBHBHB2H')
+                meshes_ids = [
+                    0x3f if mesh_id == 0xff else mesh_id
+                    for mesh_id in slot[2 : 10 : 2]
+                ]
+                densities = slot[3 : 10 : 2]
+                for corner in range(4):
+                    light = ((slot[10] >> corner * 4) & 0xf) / 0xf
+                    set_pixel(
+                        lighting, light_offset, slot_x, slot_y, corner,
+                        (light, light, light, 1.0)
+                    )
+            for mesh_index in range(4):
+                color = color_indices[meshes_ids[mesh_index]]
+                for corner in range(4):
+                    density = ((densities[mesh_index] >> corner * 4) & 0xf) / 0xf
+                    set_pixel(
+                        meshes[mesh_index], fmt.PIXELS_OFFSET_1,
+                        slot_x, slot_y, corner,
+                        (color[0], color[1], color[2], density)
+                    )
+    images = {
+        'details meshes {}.png'.format(index): pixels
+        for index, pixels in enumerate(meshes)
+    }
+    if header.format_version == 3:
+        images['details lights.png'] = lights
+        images['details shadows.png'] = shadows
+        images['details hemi.png'] = hemi
+    else:
+        images['details lighting.png'] = lighting
+    return images
 
 
 class TestDetailsImport(utils.XRayTestCase):
@@ -123,3 +209,34 @@ class TestDetailsImport(utils.XRayTestCase):
 
         # Assert
         self.assertReportsNotContains('WARNING')
+
+    def test_slots_images(self):
+        for file_name, format_version in (
+                ('test_fmt_v2.details', 'builds_1096-1230'),
+                ('test_fmt_v2.details', 'builds_1233-1558'),
+                ('test_fmt_v3.details', 'builds_1233-1558')
+            ):
+            # Arrange
+            for image in list(bpy.data.images):
+                bpy.data.images.remove(image)
+            for obj in list(bpy.data.objects):
+                bpy.data.objects.remove(obj)
+            reference = _read_reference_pixels(
+                self.relpath(file_name), format_version
+            )
+
+            # Act
+            bpy.ops.xray_import.details(
+                directory=self.relpath(),
+                files=[{'name': file_name}],
+                details_format=format_version
+            )
+
+            # Assert
+            for image_name, pixels in reference.items():
+                image = bpy.data.images[image_name]
+                self.assertTrue(numpy.allclose(
+                    numpy.array(image.pixels[:]),
+                    numpy.array(pixels),
+                    atol=1.0 / 255
+                ), msg=image_name)
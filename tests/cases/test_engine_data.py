@@ -0,0 +1,90 @@
+import os
+import tempfile
+
+from tests import utils
+
+from io_scene_xray import utils as utl, xray_io
+
+
+def _write_gamemtl(file_path, materials):
+    materials_writer = xray_io.ChunkedWriter()
+    for index, (material_id, name, desc) in enumerate(materials):
+        material_writer = xray_io.ChunkedWriter()
+        packed_writer = xray_io.PackedWriter()
+        packed_writer.putf('<I', material_id)
+        packed_writer.puts(name)
+        material_writer.put(0x1000, packed_writer)
+        packed_writer = xray_io.PackedWriter()
+        packed_writer.puts(desc)
+        material_writer.put(0x1005, packed_writer)
+        materials_writer.put(index, material_writer)
+    chunked_writer = xray_io.ChunkedWriter()
+    chunked_writer.put(4098, materials_writer)
+    with open(file_path, 'wb') as file:
+        file.write(chunked_writer.data)
+
+
+class TestEngineDataCache(utils.XRayTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for file_name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, file_name))
+        os.rmdir(self.directory)
+        super().tearDown()
+
+    def test_gamemtl(self):
+        # Arrange
+        cache = utl.EngineDataCache(2)
+        file_path = os.path.join(self.directory, 'gamemtl.xr')
+        _write_gamemtl(file_path, ((1, 'default', 'desc'), (5, 'grass', '')))
+
+        # Act
+        data = cache.get(file_path, utl.parse_gamemtl)
+
+        # Assert
+        self.assertEqual(data.names, ['default', 'grass'])
+        self.assertEqual(data.id_to_name, {1: 'default', 5: 'grass'})
+        self.assertEqual(data.name_to_id, {'default': 1, 'grass': 5})
+        self.assertEqual(data.descriptions['default'], 'desc')
+        self.assertIs(cache.get(file_path, utl.parse_gamemtl), data)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNone(cache.get('', utl.parse_gamemtl))
+        self.assertIsNone(
+            cache.get(file_path + '.missing', utl.parse_gamemtl)
+        )
+
+    def test_validation_and_lru(self):
+        # Arrange
+        cache = utl.EngineDataCache(2)
+        file_paths = [
+            os.path.join(self.directory, 'gamemtl_{}.xr'.format(index))
+            for index in range(3)
+        ]
+        for index, file_path in enumerate(file_paths):
+            _write_gamemtl(file_path, ((index, 'mtl', ''), ))
+
+        # Act & Assert: modified file is parsed again
+        data = cache.get(file_paths[0], utl.parse_gamemtl)
+        _write_gamemtl(file_paths[0], ((7, 'mtl', ''), (8, 'new', '')))
+        stat = os.stat(file_paths[0])
+        os.utime(file_paths[0], (stat.st_atime + 10, stat.st_mtime + 10))
+        data = cache.get(file_paths[0], utl.parse_gamemtl)
+        self.assertEqual(data.name_to_id, {'mtl': 7, 'new': 8})
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+        # Act & Assert: least recently used file is dropped
+        cache.get(file_paths[1], utl.parse_gamemtl)
+        cache.get(file_paths[0], utl.parse_gamemtl)
+        cache.get(file_paths[2], utl.parse_gamemtl)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        cache.get(file_paths[0], utl.parse_gamemtl)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        cache.get(file_paths[1], utl.parse_gamemtl)
+        self.assertEqual((cache.hits, cache.misses), (2, 5))
+
+        # Act & Assert
+        cache.clear()
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
@@ -25,3 +25,21 @@ class TestOgf(utils.XRayTestCase):
                 {'name': 'test_fmt_ogf_st.ogf'}
             ],
         )
+
+    def test_import_mesh_builder_arrays(self):
+        bpy.ops.xray_import.ogf(
+            directory=self.relpath(),
+            files=[
+                {'name': 'test_fmt_ogf_pm_act.ogf'},
+                {'name': 'test_fmt_ogf_pm_1_link.ogf'},
+                {'name': 'test_fmt_ogf_st.ogf'}
+            ],
+            mesh_builder='ARRAYS'
+        )
+
+        # Assert
+        self.assertReportsNotContains('WARNING')
+        meshes = [obj for obj in bpy.data.objects if obj.type == 'MESH']
+        self.assertTrue(meshes)
+        for obj in meshes:
+            self.assertTrue(len(obj.data.polygons))
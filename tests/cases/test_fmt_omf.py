@@ -1,6 +1,21 @@
+import os
+import random
+import struct
+import zlib
+from unittest import mock
+
 from tests import utils
 
 import bpy
+import mathutils
+import numpy
+
+from io_scene_xray import version_utils
+from io_scene_xray import motion_utils
+from io_scene_xray import xray_io
+from io_scene_xray.omf import imp
+from io_scene_xray.omf import exp
+from io_scene_xray.omf import fmt
 
 
 class TestOmf(utils.XRayTestCase):
@@ -39,3 +54,332 @@ class TestOmf(utils.XRayTestCase):
             export_motions=True,
             export_bone_parts=True
         )
+
+    def test_motions_index(self):
+        file_path = self.relpath('test_fmt.omf')
+
+        # Act
+        omf_index = imp.get_omf_index(file_path)
+
+        # Assert
+        self.assertEqual(omf_index.names, [
+            'test_omf_locrot_1',
+            'test_omf_locrot_2',
+            'test_omf_only_location',
+            'test_omf_only_rotation'
+        ])
+        self.assertEqual(
+            [motion.frames_count for motion in omf_index.motions],
+            [6, 4, 6, 4]
+        )
+        self.assertEqual(omf_index.bones_count, 2)
+        self.assertEqual(omf_index.unknown_chunks, [])
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        for motion in omf_index.motions:
+            motion_data = data[motion.offset : motion.offset + motion.size]
+            self.assertEqual(motion_data[ : len(motion.name)], motion.name.encode())
+        self.assertIs(imp.get_omf_index(file_path), omf_index)
+
+    def test_import_selected_motions(self):
+        bpy.ops.xray_import.object(
+            directory=self.relpath(),
+            files=[{'name': 'test_fmt_omf.object'}],
+        )
+        arm_obj = bpy.data.objects['test_fmt_omf.object']
+        utils.set_active_object(arm_obj)
+
+        # Act
+        bpy.ops.xray_import.omf(
+            directory=self.relpath(),
+            files=[{'name': 'test_fmt.omf'}],
+            import_motions=True,
+            import_bone_parts=False,
+            motions=[{'name': 'test_omf_locrot_2', 'flag': True}]
+        )
+
+        # Assert
+        self.assertIn('test_omf_locrot_2', bpy.data.actions)
+        self.assertNotIn('test_omf_locrot_1', bpy.data.actions)
+
+    def test_import_compressed(self):
+        bpy.ops.xray_import.object(
+            directory=self.relpath(),
+            files=[{'name': 'test_fmt_omf.object'}],
+        )
+        arm_obj = bpy.data.objects['test_fmt_omf.object']
+        utils.set_active_object(arm_obj)
+        files = [(self.relpath(), 'test_fmt.omf')]
+        for compress_motions in (False, True):
+            file_name = 'test_compressed_{}.omf'.format(int(compress_motions))
+            _write_compressed_omf(
+                self.relpath('test_fmt.omf'),
+                self.outpath(file_name),
+                compress_motions
+            )
+            files.append((self.outpath(), file_name))
+        motions_path = os.path.join(*files[1])
+        omf_index = imp.get_omf_index(motions_path)
+        with open(motions_path, 'rb') as file:
+            data = file.read()
+
+        # Act
+        for directory, file_name in files:
+            bpy.ops.xray_import.omf(
+                directory=directory,
+                files=[{'name': file_name}],
+                import_motions=True,
+                import_bone_parts=False,
+                motions=[{'name': 'test_omf_locrot_2', 'flag': True}]
+            )
+
+        # Assert
+        self.assertTrue(all(motion.compressed for motion in omf_index.motions))
+        for motion in omf_index.motions:
+            motion_data = bytes(motion.read_data(data))
+            self.assertEqual(motion_data[ : len(motion.name)], motion.name.encode())
+        self.assertTrue(
+            imp.get_omf_index(os.path.join(*files[2])).compressed
+        )
+        actions = [
+            bpy.data.actions[name] for name in (
+                'test_omf_locrot_2',
+                'test_omf_locrot_2.001',
+                'test_omf_locrot_2.002'
+            )
+        ]
+        keys = [_get_action_keys(action) for action in actions]
+        self.assertTrue(keys[0])
+        self.assertEqual(keys[1], keys[0])
+        self.assertEqual(keys[2], keys[0])
+
+    def test_incremental_export(self):
+        bpy.ops.xray_import.object(
+            directory=self.relpath(),
+            files=[{'name': 'test_fmt_omf.object'}],
+        )
+        arm_obj = bpy.data.objects['test_fmt_omf.object']
+        utils.set_active_object(arm_obj)
+        bpy.ops.xray_import.omf(
+            directory=self.relpath(),
+            files=[{'name': 'test_fmt.omf'}],
+            import_motions=True,
+            import_bone_parts=True,
+            add_actions_to_motion_list=True
+        )
+        for action in list(bpy.data.actions):
+            for copy_index in range(10):
+                copy = action.copy()
+                copy.name = '{0}_{1}'.format(action.name, copy_index)
+                arm_obj.xray.motions_collection.add().name = copy.name
+        actions_count = len(arm_obj.xray.motions_collection)
+        file_path = self.outpath('test_incremental.omf')
+        bake_motion = motion_utils.bake_motion
+        baked_actions = []
+
+        def export(incremental):
+            def bake(armature, action, *args):
+                baked_actions.append(action.name)
+                return bake_motion(armature, action, *args)
+
+            baked_actions.clear()
+            with mock.patch.object(motion_utils, 'bake_motion', new=bake):
+                bpy.ops.xray_export.omf(
+                    filepath=file_path,
+                    export_mode='OVERWRITE',
+                    export_motions=True,
+                    export_bone_parts=True,
+                    incremental=incremental
+                )
+            with open(file_path, 'rb') as file:
+                return file.read()
+
+        # Act
+        export(True)
+        full_bake = list(baked_actions)
+        edited_action = bpy.data.actions['test_omf_locrot_1_3']
+        keyframe = edited_action.fcurves[0].keyframe_points[0]
+        keyframe.co[1] += 0.5
+        incremental_data = export(True)
+        incremental_bake = list(baked_actions)
+        full_data = export(False)
+
+        # Assert
+        self.assertEqual(len(full_bake), actions_count)
+        self.assertEqual(incremental_bake, ['test_omf_locrot_1_3'])
+        self.assertEqual(len(baked_actions), actions_count)
+        self.assertEqual(incremental_data, full_data)
+        self.assertFileExists(exp.get_fingerprints_path(file_path))
+
+        # the file changed after incremental export, all actions are baked
+        export(True)
+        self.assertEqual(len(baked_actions), actions_count)
+
+    def test_bone_track_packing(self):
+        rnd = random.Random(0)
+        tracks = []
+        for frames_count in (1, 2, 50):
+            rotations = [
+                mathutils.Euler([rnd.uniform(-3.0, 3.0) for _ in range(3)])
+                for _ in range(frames_count)
+            ]
+            locations = [
+                mathutils.Vector([rnd.uniform(-2.0, 2.0) for _ in range(3)])
+                for _ in range(frames_count)
+            ]
+            # animated, constant rotation, constant location
+            tracks.append((rotations, locations))
+            tracks.append(([rotations[0]] * frames_count, locations))
+            tracks.append((rotations, [locations[0]] * frames_count))
+        for rotations, locations in tracks:
+            matrices = [
+                version_utils.multiply(
+                    mathutils.Matrix.Translation(location),
+                    rotation.to_matrix().to_4x4()
+                )
+                for rotation, location in zip(rotations, locations)
+            ]
+            for high_quality in (True, False):
+                # Act
+                packed_writer = xray_io.PackedWriter()
+                quaternions, translations = exp.get_bone_track(matrices)
+                exp.write_bone_track(
+                    packed_writer, quaternions, translations, high_quality
+                )
+
+                # Assert
+                self.assertEqual(
+                    bytes(packed_writer.data),
+                    write_bone_track_legacy(matrices, high_quality)
+                )
+
+    def test_rotations_conversion(self):
+        rnd = random.Random(0)
+        quaternions = [
+            [rnd.randint(-0x7fff, 0x7fff) for _ in range(4)]
+            for _ in range(100)
+        ]
+        quaternions.append([0, 0, 0, 0x7fff])
+        quaternions.append([0x5a82, 0, 0, 0x5a82])
+        bone_matrix = mathutils.Euler((0.3, -1.2, 2.0), 'XYZ').to_matrix()
+
+        # Act
+        matrices = imp.convert_to_matrices(
+            numpy.array(quaternions, dtype=numpy.int16)
+        )
+        eulers = imp.convert_to_euler(
+            numpy.matmul(numpy.array(bone_matrix), matrices)
+        )
+
+        # Assert
+        for quaternion, euler in zip(quaternions, eulers):
+            rotation = mathutils.Quaternion((
+                quaternion[3] / 0x7fff,
+                quaternion[0] / 0x7fff,
+                quaternion[1] / 0x7fff,
+                -quaternion[2] / 0x7fff
+            )).to_euler('ZXY').to_matrix()
+            expected = version_utils.multiply(
+                bone_matrix.copy(), rotation
+            ).to_euler('ZXY')
+            for axis in range(3):
+                self.assertAlmostEqual(euler[axis], expected[axis], places=4)
+
+
+def write_bone_track_legacy(matrices, high_quality):
+    # per-frame packing, as it was before vectorization
+    data = bytearray()
+    min_tr = mathutils.Vector((10000.0, 10000.0, 10000.0))
+    max_tr = mathutils.Vector((-10000.0, -10000.0, -10000.0))
+    for matrix in matrices:
+        translate = matrix.to_translation()
+        for index in range(3):
+            min_tr[index] = min(min_tr[index], translate[index])
+            max_tr[index] = max(max_tr[index], translate[index])
+    if high_quality:
+        size_max, trn_max, trn_min, eps = 0xffff, 0x7fff, -0x8000, 0.0000001
+    else:
+        size_max, trn_max, trn_min, eps = 255, 127, -128, 0.000001
+    flags = fmt.KPF_T_HQ if high_quality else 0x0
+    quaternions = []
+    translations = []
+    tr_init = min_tr + (max_tr - min_tr) / 2
+    tr_init[2] = -tr_init[2]
+    tr_size = (max_tr - min_tr) / size_max
+    for matrix in matrices:
+        quaternion = matrix.to_quaternion()
+        quaternions.append((
+            int(round(quaternion[1] * 0x7fff, 0)),
+            int(round(quaternion[2] * 0x7fff, 0)),
+            int(round(-quaternion[3] * 0x7fff, 0)),
+            int(round(quaternion[0] * 0x7fff, 0))
+        ))
+        translate = matrix.to_translation()
+        translate[2] = -translate[2]
+        if tr_size.length > eps:
+            translate_final = []
+            for index in range(3):
+                if tr_size[index] > 1e-9:
+                    value = int((translate[index] - tr_init[index]) / tr_size[index])
+                    translate_final.append(max(trn_min, min(trn_max, value)))
+                else:
+                    translate_final.append(0)
+            translations.append(translate_final)
+        translate_float = tuple(translate)
+    if tr_size.length > eps:
+        flags |= fmt.FL_T_KEY_PRESENT
+    if len(set(quaternions)) != 1:
+        data += struct.pack('<B', flags)
+        keys = b''.join(struct.pack('<4h', *key) for key in quaternions)
+        data += struct.pack('<I', zlib.crc32(keys)) + keys
+    else:
+        flags |= fmt.FL_R_KEY_ABSENT
+        data += struct.pack('<B', flags)
+        data += struct.pack('<4h', *quaternions[0])
+    if flags & fmt.FL_T_KEY_PRESENT:
+        trn_fmt = '<3h' if high_quality else '<3b'
+        keys = b''.join(struct.pack(trn_fmt, *key) for key in translations)
+        data += struct.pack('<I', zlib.crc32(keys)) + keys
+        data += struct.pack('<3f', *tr_size)
+        data += struct.pack('<3f', *tr_init)
+    else:
+        data += struct.pack('<3f', *translate_float)
+    return bytes(data)
+
+
+def _write_compressed_omf(source_path, file_path, compress_motions):
+    # params chunk is compressed, motions chunk is compressed entirely
+    # or each motion chunk is compressed
+    with open(source_path, 'rb') as file:
+        data = file.read()
+    chunked_writer = xray_io.ChunkedWriter()
+    for chunk_id, chunk_data in xray_io.ChunkedReader(data):
+        if chunk_id == fmt.Chunks.S_MOTIONS and not compress_motions:
+            motions_writer = xray_io.ChunkedWriter()
+            for motion_id, motion_data in xray_io.ChunkedReader(chunk_data):
+                packed_writer = xray_io.PackedWriter()
+                packed_writer.data += motion_data
+                motions_writer.put(
+                    motion_id,
+                    packed_writer,
+                    compress=motion_id != fmt.MOTIONS_COUNT_CHUNK
+                )
+            chunked_writer.put(chunk_id, motions_writer)
+        else:
+            packed_writer = xray_io.PackedWriter()
+            packed_writer.data += chunk_data
+            chunked_writer.put(chunk_id, packed_writer, compress=True)
+    with open(file_path, 'wb') as file:
+        file.write(chunked_writer.data)
+
+
+def _get_action_keys(action):
+    keys = []
+    for fcurve in action.fcurves:
+        keys.append((
+            fcurve.data_path,
+            fcurve.array_index,
+            [tuple(keyframe.co) for keyframe in fcurve.keyframe_points]
+        ))
+    keys.sort()
+    return keys
@@ -0,0 +1,90 @@
+import os
+import types
+
+from tests import utils
+
+import bpy
+from io_scene_xray import handlers, utils as utl
+
+
+class TestImageRegistry(utils.XRayTestCase):
+    def _new_image(self, name, file_path):
+        image = bpy.data.images.new(name, 0, 0)
+        image.source = 'FILE'
+        image.filepath = file_path
+        return image
+
+    def _update(self, registry, *ids):
+        # handlers report the changed datablocks
+        depsgraph = types.SimpleNamespace(
+            updates=[types.SimpleNamespace(id=bpy_id) for bpy_id in ids]
+        )
+        registry.sync(bpy.data.images, depsgraph)
+
+    def test_find(self):
+        # Arrange
+        registry = utl.ImageRegistry()
+        path_1 = os.path.abspath(os.path.join('textures', 'test_1.dds'))
+        path_2 = os.path.abspath(os.path.join('textures', 'test_2.dds'))
+        image_1 = self._new_image('test_1', path_1)
+        image_2 = self._new_image('test_2', path_2)
+
+        # Act & Assert
+        self.assertEqual(registry.find(path_1), image_1)
+        self.assertEqual(registry.find(path_2), image_2)
+        self.assertEqual(
+            registry.find(os.path.join('textures', '.', 'test_2.dds')),
+            image_2
+        )
+        self.assertIsNone(registry.find(path_1 + '.dds'))
+
+    def test_changes(self):
+        # Arrange
+        registry = utl.ImageRegistry()
+        path_1 = os.path.abspath('test_1.dds')
+        path_2 = os.path.abspath('test_2.dds')
+        image = self._new_image('test', path_1)
+        self.assertEqual(registry.find(path_1), image)
+
+        # Act & Assert: rename
+        image.name = 'renamed'
+        self.assertEqual(registry.find(path_1), image)
+
+        # Act & Assert: new file path
+        image.filepath = path_2
+        self._update(registry, image)
+        self.assertEqual(registry.find(path_2), image)
+        self.assertIsNone(registry.find(path_1))
+        image.filepath = path_1
+        self._update(registry, image)
+        self.assertEqual(registry.find(path_1), image)
+        image.filepath = path_2
+        self._update(registry, image)
+        self.assertEqual(registry.find(path_2), image)
+
+        # Act & Assert: other datablocks do not drop the index
+        self._update(registry, bpy.data.scenes[0])
+        self.assertIsNone(registry.find(path_1))
+        self.assertIsNotNone(registry._names)
+
+        # Act & Assert: add
+        image_new = self._new_image('new', path_1)
+        registry.add(image_new)
+        self.assertEqual(registry.find(path_1), image_new)
+
+        # Act & Assert: remove
+        bpy.data.images.remove(image_new)
+        self.assertIsNone(registry.find(path_1))
+        self.assertEqual(registry.find(path_2), image)
+
+    def test_handlers(self):
+        # Arrange
+        file_path = os.path.abspath('test_handlers.dds')
+        self.assertIsNone(utl.IMAGES.find(file_path))
+        image = self._new_image('test', file_path)
+
+        # Act
+        handlers.scene_update_post(bpy.context.scene)
+
+        # Assert
+        self.assertEqual(utl.IMAGES.find(file_path), image)
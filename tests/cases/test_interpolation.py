@@ -0,0 +1,89 @@
+import random
+
+from tests import utils
+
+from io_scene_xray import xray_interpolation
+
+
+def evaluate_scalar(values, times, shapes, tcb, params):
+    keys = []
+    for value, time, shape, key_tcb, key_params in zip(
+            values, times, shapes, tcb, params
+        ):
+        key = xray_interpolation.Key()
+        key.value = value
+        key.time = time
+        key.shape = shape
+        key.tension, key.continuity, key.bias = key_tcb
+        key.param_1, key.param_2, key.param_3, key.param_4 = key_params
+        keys.append(key)
+    empty_key = xray_interpolation.Key()
+    result = []
+    frames = []
+    for index in range(len(keys) - 1):
+        start_key = keys[index]
+        end_key = keys[index + 1]
+        prev_key = keys[index - 1] if index > 0 else empty_key
+        next_key = keys[index + 2] if index + 2 < len(keys) else empty_key
+        start_frame = int(round(start_key.time, 0))
+        end_frame = int(round(end_key.time, 0))
+        for frame in range(start_frame, end_frame):
+            result.append(xray_interpolation.evaluate(
+                frame, start_key, end_key, prev_key, next_key
+            ))
+            frames.append(frame)
+    result.append(keys[-1].value)
+    frames.append(int(round(keys[-1].time, 0)))
+    return result, frames
+
+
+class TestInterpolation(utils.XRayTestCase):
+    def test_evaluate_keys(self):
+        rnd = random.Random(0)
+        for shape in xray_interpolation.Shape:
+            for _ in range(20):
+                keys_count = rnd.randint(2, 8)
+                times = []
+                time = float(rnd.randint(-5, 5))
+                for _ in range(keys_count):
+                    times.append(time)
+                    time += rnd.randint(2, 10)
+                values = [rnd.uniform(-3.0, 3.0) for _ in range(keys_count)]
+                shapes = [
+                    shape if rnd.random() < 0.75 else rnd.choice(list(xray_interpolation.Shape))
+                    for _ in range(keys_count)
+                ]
+                tcb = [
+                    [rnd.uniform(-1.0, 1.0) for _ in range(3)]
+                    for _ in range(keys_count)
+                ]
+                params = [
+                    [rnd.uniform(-0.3, 0.3) for _ in range(4)]
+                    for _ in range(keys_count)
+                ]
+
+                # Act
+                result, frames = xray_interpolation.evaluate_keys(
+                    int(round(times[0], 0)), int(round(times[-1], 0)),
+                    values, times, shapes, tcb, params
+                )
+
+                # Assert
+                expected, expected_frames = evaluate_scalar(
+                    values, times, shapes, tcb, params
+                )
+                self.assertEqual(frames.tolist(), expected_frames)
+                for value, expected_value in zip(result, expected):
+                    self.assertAlmostEqual(value, expected_value, places=6)
+
+    def test_evaluate_keys_constant(self):
+        shape = xray_interpolation.Shape.TCB
+
+        # Act
+        result, frames = xray_interpolation.evaluate_keys(
+            2, 5, [1.5], [3.0], [shape], [(0.0, 0.0, 0.0)], [(0.0, ) * 4]
+        )
+
+        # Assert
+        self.assertEqual(result.tolist(), [1.5] * 4)
+        self.assertEqual(frames.tolist(), [2, 3, 4, 5])
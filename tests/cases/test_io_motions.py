@@ -2,6 +2,9 @@ from tests import utils
 
 import bpy
 
+from io_scene_xray import motion_utils
+from io_scene_xray import xray_motions
+
 
 class TestIOMotions(utils.XRayTestCase):
     def test_io_taked(self):
@@ -45,6 +48,124 @@ class TestIOMotions(utils.XRayTestCase):
         self.assertEqual(len(imp_act.fcurves[0].keyframe_points), 5)
         self.assertEqual(imp_act.frame_range[1], 4)
 
+    def test_bake_fcurves(self):
+        # Arrange
+        obj = _prepare_animation()
+        bpy.ops.object.mode_set(mode='EDIT')
+        try:
+            connected_bone = obj.data.edit_bones.new('connected')
+            connected_bone.tail.z = 1.0
+            connected_bone.parent = obj.data.edit_bones['cbone']
+            connected_bone.use_connect = True
+        finally:
+            bpy.ops.object.mode_set(mode='OBJECT')
+        cbone = obj.pose.bones['cbone']
+        cbone.rotation_mode = 'YXZ'
+        cbone.rotation_euler = (0.1, 0.2, 0.3)
+        cbone.keyframe_insert('rotation_euler', frame=1, group='cbone')
+        cbone.rotation_euler = (1.0, -0.5, 2.0)
+        cbone.scale = (1.0, 2.0, 0.5)
+        cbone.keyframe_insert('rotation_euler', frame=4, group='cbone')
+        cbone.keyframe_insert('scale', frame=4, group='cbone')
+        pbone = obj.pose.bones['bone']
+        pbone.rotation_quaternion = (0.5, 0.1, 0.7, 0.2)
+        pbone.keyframe_insert('rotation_quaternion', frame=3, group='bone')
+        connected = obj.pose.bones['connected']
+        connected.keyframe_insert('location', frame=1, group='connected')
+        connected.location = (0.5, -1.0, 2.0)
+        connected.keyframe_insert('location', frame=4, group='connected')
+        action = bpy.data.actions[0]
+        bones_parents = [(pbone, None), (cbone, pbone), (connected, cbone)]
+        frames = range(1, 6)
+
+        # Act
+        fast = motion_utils.bake_fcurves(
+            obj, action, bones_parents, frames, xray_motions.MATRIX_BONE_INVERTED
+        )
+        slow = motion_utils.bake_frame_set(
+            obj, action, bones_parents, frames, xray_motions.MATRIX_BONE_INVERTED
+        )
+
+        # Assert
+        self.assertEqual(motion_utils.get_slow_bake_bones(obj), set())
+        for fast_matrices, slow_matrices in zip(fast, slow):
+            self.assertEqual(len(fast_matrices), len(frames))
+            for fast_matrix, slow_matrix in zip(fast_matrices, slow_matrices):
+                for fast_row, slow_row in zip(fast_matrix, slow_matrix):
+                    for fast_value, slow_value in zip(fast_row, slow_row):
+                        self.assertAlmostEqual(fast_value, slow_value, places=5)
+
+    def test_bake_escaped_names(self):
+        # Arrange
+        obj = _prepare_animation()
+        pbone = obj.pose.bones['bone']
+        cbone = obj.pose.bones['cbone']
+        # data paths of the fcurves are renamed with the bone
+        obj.data.bones['bone'].name = 'bo"ne\\1'
+        cbone.rotation_euler = (1.0, -0.5, 2.0)
+        cbone.keyframe_insert('rotation_euler', frame=4, group=cbone.name)
+        action = bpy.data.actions[0]
+        bones_parents = [(pbone, None), (cbone, pbone)]
+        frames = range(1, 6)
+
+        # Act
+        fast = motion_utils.bake_fcurves(
+            obj, action, bones_parents, frames, xray_motions.MATRIX_BONE_INVERTED
+        )
+        slow = motion_utils.bake_frame_set(
+            obj, action, bones_parents, frames, xray_motions.MATRIX_BONE_INVERTED
+        )
+
+        # Assert
+        self.assertEqual(
+            motion_utils.get_fcurve_bone_name(action.fcurves[0].data_path),
+            pbone.name
+        )
+        self.assertEqual(
+            motion_utils.get_fcurve_bone_name(
+                motion_utils.get_bone_data_path(pbone.name) + '.location'
+            ),
+            pbone.name
+        )
+        for fast_matrices, slow_matrices in zip(fast, slow):
+            for fast_matrix, slow_matrix in zip(fast_matrices, slow_matrices):
+                for fast_row, slow_row in zip(fast_matrix, slow_matrix):
+                    for fast_value, slow_value in zip(fast_row, slow_row):
+                        self.assertAlmostEqual(fast_value, slow_value, places=5)
+
+    def test_bake_fingerprint(self):
+        # Arrange
+        obj = _prepare_animation()
+        action = bpy.data.actions[0]
+        pbone = obj.pose.bones['bone']
+        bones_parents = [(pbone, None)]
+        keyframe = action.fcurves[0].keyframe_points[0]
+        keyframe.interpolation = 'BACK'
+        fingerprint = motion_utils.get_bake_fingerprint(
+            obj, action, bones_parents
+        )
+
+        # Act
+        keyframe.back += 1.0
+
+        # Assert
+        self.assertEqual(len(fingerprint), 16)
+        self.assertNotEqual(
+            motion_utils.get_bake_fingerprint(obj, action, bones_parents),
+            fingerprint
+        )
+
+    def test_bake_slow_bones(self):
+        # Arrange
+        obj = _prepare_animation()
+        obj.pose.bones['bone'].constraints.new('COPY_ROTATION')
+
+        # Act
+        slow_bones = motion_utils.get_slow_bake_bones(obj)
+
+        # Assert
+        self.assertEqual(slow_bones, {'bone', 'cbone'})
+
 
 def _prepare_animation():
     arm = bpy.data.armatures.new('test')
@@ -1,8 +1,17 @@
 import os
+import math
+import struct
+import types
+from unittest import mock
 
 import bpy
+import bmesh
+import mathutils
+import numpy
 
 from tests import utils
+from io_scene_xray import utils as utl, version_utils, xray_io
+from io_scene_xray.level import cform, create, exp, fmt, ops
 
 
 class TestLevel(utils.XRayTestCase):
@@ -31,3 +40,611 @@ class TestLevel(utils.XRayTestCase):
 
         # Assert
         self.assertReportsNotContains('WARNING')
+
+    def test_mesh_builders(self):
+        prefs = utils.get_preferences()
+        prefs.gamemtl_file = os.path.join(self.relpath(), 'gamemtl.xr')
+        level_path = os.path.join(self.relpath(), 'test_fmt_level', 'level')
+
+        # Import
+        bpy.ops.xray_import.level(filepath=level_path, mesh_builder='BMESH')
+        bmesh_objects = set(bpy.data.objects)
+        bpy.ops.xray_import.level(filepath=level_path, mesh_builder='ARRAYS')
+        arrays_objects = set(bpy.data.objects) - bmesh_objects
+
+        # Assert
+        self.assertReportsNotContains('WARNING')
+        self.assertEqual(
+            _get_meshes_stats(bmesh_objects),
+            _get_meshes_stats(arrays_objects)
+        )
+
+    def test_export_cform(self):
+        prefs = utils.get_preferences()
+        prefs.gamemtl_file = os.path.join(self.relpath(), 'gamemtl.xr')
+
+        # Import
+        bpy.ops.xray_import.level(filepath=os.path.join(
+            self.relpath(), 'test_fmt_level', 'level'
+        ))
+
+        # Export
+        level_obj = bpy.data.objects['test_fmt_level']
+        directory = self.outpath('test_fmt_level_export_cform')
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        utils.set_active_object(level_obj)
+        bpy.ops.xray_export.level(directory=directory)
+
+        # Assert
+        self.assertReportsNotContains('WARNING')
+        cform_objects = [
+            obj for obj in bpy.data.objects
+            if obj.xray.level.object_type == 'CFORM'
+        ]
+        verts_count = sum(len(obj.data.vertices) for obj in cform_objects)
+        tris_count = sum(len(obj.data.polygons) for obj in cform_objects)
+        with open(os.path.join(directory, 'level.cform'), 'rb') as file:
+            data = file.read()
+        version, file_verts, file_tris = struct.unpack('<3I', data[ : 12])
+        self.assertEqual(version, 4)
+        self.assertEqual(file_verts, verts_count)
+        self.assertEqual(file_tris, tris_count)
+        self.assertEqual(len(data), 36 + file_verts * 12 + file_tris * 16)
+
+    def test_export_cform_not_triangulated(self):
+        # Arrange
+        materials = []
+        for name in ('cform_mat_0', 'cform_mat_1'):
+            material = bpy.data.materials.new(name)
+            materials.append(material)
+        materials[1].xray.suppress_shadows = True
+        mesh = bpy.data.meshes.new('cform_quads')
+        mesh.from_pydata(
+            (
+                (0, 0, 0), (1, 0, 0), (0, 1, 0),
+                (2, 0, 0), (3, 0, 0), (3, 1, 0), (2, 1, 0)
+            ),
+            (),
+            ((0, 1, 2), (3, 4, 5, 6))
+        )
+        for material in materials:
+            mesh.materials.append(material)
+        mesh.polygons[1].material_index = 1
+        cform_object = bpy.data.objects.new('cform_quads', mesh)
+        meshes_count = len(bpy.data.meshes)
+
+        # Act
+        vertices, triangles = exp.get_cform_geometry(
+            cform_object, 3, {'cform_mat_0': 5, 'cform_mat_1': 7}
+        )
+
+        # Assert
+        self.assertEqual(len(vertices), 7)
+        self.assertEqual(len(triangles), 3)
+        self.assertEqual(
+            sorted(triangles['material'].tolist()),
+            [5, 7 | 0x4000, 7 | 0x4000]
+        )
+        self.assertEqual(set(triangles['sector'].tolist()), {3})
+        self.assertEqual(len(bpy.data.meshes), meshes_count)
+
+    def test_export_uv_range(self):
+        # Arrange
+        mesh = bpy.data.meshes.new('uv_range')
+        if bpy.app.version >= (2, 80, 0):
+            uv_layer = mesh.uv_layers.new(name='uv')
+        else:
+            uv_tex = mesh.uv_textures.new(name='uv')
+            uv_layer = mesh.uv_layers[uv_tex.name]
+        bpy_obj = bpy.data.objects.new('uv_range', mesh)
+
+        # Act & Assert
+        exp.check_range(
+            numpy.array([[-0x8000, 0x7fff]]), -0x8000, 0x7fff, bpy_obj, uv_layer
+        )
+        for value in (0x8000, -0x8001, float('nan')):
+            with self.assertRaises(utl.AppError):
+                exp.check_range(
+                    numpy.array([[0, value]]), -0x8000, 0x7fff, bpy_obj, uv_layer
+                )
+
+    def test_export_geometry_legacy(self):
+        prefs = utils.get_preferences()
+        prefs.gamemtl_file = os.path.join(self.relpath(), 'gamemtl.xr')
+        bpy.ops.xray_import.level(filepath=os.path.join(
+            self.relpath(), 'test_fmt_level', 'level'
+        ))
+        level_obj = bpy.data.objects['test_fmt_level']
+
+        directory = self.outpath('test_fmt_level_export_numpy')
+        legacy_directory = self.outpath('test_fmt_level_export_legacy')
+        for path in (directory, legacy_directory):
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+        # Act
+        exp.export_file(level_obj, directory)
+        with mock.patch.multiple(
+                exp,
+                write_gcontainer=_write_gcontainer_legacy,
+                pack_vertices=_pack_vertices_legacy,
+                write_level_geom_ib=_write_level_geom_ib_legacy
+            ):
+            exp.export_file(level_obj, legacy_directory)
+
+        # Assert
+        for file_name in ('level', 'level.geom', 'level.geomx'):
+            with open(os.path.join(directory, file_name), 'rb') as file:
+                data = file.read()
+            with open(os.path.join(legacy_directory, file_name), 'rb') as file:
+                legacy_data = file.read()
+            self.assertEqual(data, legacy_data, msg=file_name)
+
+    def test_import_cform_flags(self):
+        # Arrange
+        verts = (0, 0, 0, 1, 0, 0, 0, 0, 1, 1, 0, 1)
+        tris = ((0, 1, 2, 1), (1, 3, 2, 1 | 0x4000))
+        data = struct.pack('<3I6f', 4, 4, len(tris), *([0.0] * 6))
+        data += struct.pack('<12f', *verts)
+        for vert_1, vert_2, vert_3, material in tris:
+            data += struct.pack('<3I2H', vert_1, vert_2, vert_3, material, 0)
+        level = types.SimpleNamespace(
+            xrlc_version=fmt.VERSION_9,
+            file='level',
+            sectors_objects={0: bpy.data.objects.new('sector', None)},
+            collections={
+                create.LEVEL_CFORM_COLLECTION_NAME:
+                    version_utils.create_collection('cform_flags')
+            }
+        )
+
+        # Act
+        cform.import_main(ops.ImportLevelContext(), level, data=data)
+
+        # Assert
+        mesh = bpy.data.objects['cform_000'].data
+        self.assertEqual(
+            [material.xray.suppress_shadows for material in mesh.materials],
+            [False, True]
+        )
+        self.assertEqual(
+            sorted(polygon.material_index for polygon in mesh.polygons),
+            [0, 1]
+        )
+
+    def test_export_parallel(self):
+        prefs = utils.get_preferences()
+        prefs.gamemtl_file = os.path.join(self.relpath(), 'gamemtl.xr')
+
+        # Import
+        bpy.ops.xray_import.level(filepath=os.path.join(
+            self.relpath(), 'test_fmt_level', 'level'
+        ))
+
+        # Export
+        level_obj = bpy.data.objects['test_fmt_level']
+        outputs = {}
+        for parallel in (False, True):
+            directory = self.outpath(
+                'test_fmt_level_export_parallel_{}'.format(int(parallel))
+            )
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            timings = exp.export_file(level_obj, directory, parallel=parallel)
+            outputs[parallel] = timings
+            self.assertEqual(
+                sorted(os.path.basename(path) for path in timings),
+                ['level', 'level.cform', 'level.geom', 'level.geomx']
+            )
+
+        # Assert
+        for path in outputs[False]:
+            parallel_path = path.replace(
+                'test_fmt_level_export_parallel_0',
+                'test_fmt_level_export_parallel_1'
+            )
+            with open(path, 'rb') as file:
+                sequential_data = file.read()
+            with open(parallel_path, 'rb') as file:
+                parallel_data = file.read()
+            self.assertEqual(sequential_data, parallel_data)
+
+
+def _get_meshes_stats(objects):
+    stats = []
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        mesh = obj.data
+        stats.append((
+            len(mesh.vertices),
+            len(mesh.polygons),
+            len(mesh.loops),
+            tuple(layer.name for layer in mesh.uv_layers),
+            tuple(layer.name for layer in mesh.vertex_colors)
+        ))
+    stats.sort()
+    return stats
+
+
+# geometry packing, as it was before numpy
+
+
+def _write_level_geom_ib_legacy(ibs):
+    packed_writer = xray_io.PackedWriter()
+    packed_writer.putf('<I', len(ibs))    # indices buffers count
+
+    for ib in ibs:
+        indices_count = len(ib) // 2    # index size = 2 byte
+        packed_writer.putf('<I', indices_count)    # indices count
+
+        for index in range(0, indices_count, 3):
+            packed_writer.data.extend(ib[index * 2 : index * 2 + 2])
+            packed_writer.data.extend(ib[index * 2 + 4 : index * 2 + 6])
+            packed_writer.data.extend(ib[index * 2 + 2 : index * 2 + 4])
+
+    return packed_writer
+
+
+def _pack_vertices_legacy(vb):
+    packed_writer = xray_io.PackedWriter()
+    for vertex_index in range(vb.vertex_count):
+        vertex_pos = vb.position[vertex_index * 12 : vertex_index * 12 + 12]
+        packed_writer.data.extend(vertex_pos)
+        if vb.vertex_format == 'FASTPATH':
+            continue
+        packed_writer.putf(
+            '<4B',
+            vb.normal[vertex_index * 3],
+            vb.normal[vertex_index * 3 + 1],
+            vb.normal[vertex_index * 3 + 2],
+            vb.color_hemi[vertex_index]
+        )    # normal, hemi
+        uv_fix = vb.uv_fix[vertex_index * 2 : vertex_index * 2 + 2]
+        # tangent
+        packed_writer.putf(
+            '<4B',
+            vb.tangent[vertex_index * 3],
+            vb.tangent[vertex_index * 3 + 1],
+            vb.tangent[vertex_index * 3 + 2],
+            uv_fix[0]
+        )
+        # binormal
+        packed_writer.putf(
+            '<4B',
+            vb.binormal[vertex_index * 3],
+            vb.binormal[vertex_index * 3 + 1],
+            vb.binormal[vertex_index * 3 + 2],
+            uv_fix[1]
+        )
+        uv = vb.uv[vertex_index * 4 : vertex_index * 4 + 4]
+        if vb.vertex_format == 'NORMAL':
+            packed_writer.data.extend(uv)
+            # light map texture coordinate
+            packed_writer.data.extend(
+                vb.uv_lmap[vertex_index * 4 : vertex_index * 4 + 4]
+            )
+        elif vb.vertex_format == 'TREE':
+            packed_writer.data.extend(uv)
+            # tree shader data (wind coefficient and unused 2 bytes),
+            # vertices without shader data are padded to 32 bytes
+            frac = vb.shader_data[vertex_index * 2 : vertex_index * 2 + 2]
+            frac.extend(bytes(4 - len(frac)))
+            packed_writer.data.extend(frac)
+        elif vb.vertex_format == 'COLOR':
+            # vertex color
+            packed_writer.putf(
+                '<4B',
+                vb.color_light[vertex_index * 3],
+                vb.color_light[vertex_index * 3 + 1],
+                vb.color_light[vertex_index * 3 + 2],
+                vb.color_sun[vertex_index]
+            )
+            packed_writer.data.extend(uv)
+    return bytes(packed_writer.data)
+
+
+def _find_distance_legacy(vertex_1, vertex_2):
+    distance = (
+        (vertex_2[0] - vertex_1[0]) ** 2 + \
+        (vertex_2[1] - vertex_1[1]) ** 2 + \
+        (vertex_2[2] - vertex_1[2]) ** 2
+    ) ** (1 / 2)
+    return distance
+
+
+def _quant_value_legacy(float_value):
+    return min(max(int(float_value * exp.QUANT), -32768), 32767)
+
+
+def _get_tex_coord_correct_legacy(tex_coord_f, tex_coord_h, uv_coeff):
+    if tex_coord_f > 0:
+        tex_coord_diff = tex_coord_f - (tex_coord_h / uv_coeff)
+    else:
+        tex_coord_diff = (1 + (tex_coord_f * uv_coeff - tex_coord_h)) / uv_coeff
+        tex_coord_h -= 1
+
+    tex_correct = (255 * 0x8000 * tex_coord_diff) / 32
+    return int(round(tex_correct, 0)), tex_coord_h
+
+
+def _write_gcontainer_legacy(bpy_obj, vbs, ibs, level):
+    visual = exp.Visual()
+    material = bpy_obj.data.materials[0]
+    if level.materials.get(material, None) is None:
+        level.materials[material] = level.active_material_index
+        visual.shader_index = level.active_material_index
+        level.active_material_index += 1
+    else:
+        visual.shader_index = level.materials[material]
+
+    packed_writer = xray_io.PackedWriter()
+
+    # multiple usage visuals
+    gcontainer = level.saved_visuals.get(bpy_obj.data.name, None)
+    if gcontainer:
+        packed_writer.putf('<I', gcontainer[0])    # vb_index
+        packed_writer.putf('<I', gcontainer[1])    # vb_offset
+        packed_writer.putf('<I', gcontainer[2])    # vb_size
+
+        packed_writer.putf('<I', gcontainer[3])    # ib_index
+        packed_writer.putf('<I', gcontainer[4])    # ib_offset
+        packed_writer.putf('<I', gcontainer[5])    # ib_size
+
+        return packed_writer, visual
+
+    bm = bmesh.new()
+    bm.from_mesh(bpy_obj.data)
+    bmesh.ops.triangulate(bm, faces=bm.faces)
+    export_mesh = bpy.data.meshes.new('temp_mesh')
+    export_mesh.use_auto_smooth = True
+    export_mesh.auto_smooth_angle = math.pi
+    bm.to_mesh(export_mesh)
+    export_mesh.calc_normals_split()
+
+    uv_layer = bm.loops.layers.uv[material.xray.uv_texture]
+    uv_layer_lmap = bm.loops.layers.uv.get(material.xray.uv_light_map, None)
+    vertex_color_sun = bm.loops.layers.color.get(
+        material.xray.sun_vert_color, None
+    )
+    vertex_color_hemi = bm.loops.layers.color.get(
+        material.xray.hemi_vert_color, None
+    )
+    vertex_color_light = bm.loops.layers.color.get(
+        material.xray.light_vert_color, None
+    )
+    export_mesh.calc_tangents(uvmap=uv_layer.name)
+
+    vertex_size = 32
+    if vertex_color_sun:
+        vertex_format = 'COLOR'
+    elif uv_layer_lmap:
+        vertex_format = 'NORMAL'
+    else:
+        vertex_format = 'TREE'
+
+    # find vertex buffer
+    if vbs:
+        vb = None
+        for vertex_buffer in vbs:
+            if vertex_buffer.vertex_format == vertex_format:
+                if vertex_buffer.vertex_count * vertex_size > exp.TWO_MEGABYTES:    # vb size 2 MB
+                    continue
+                else:
+                    vb = vertex_buffer
+                    break
+        if vb is None:
+            vb = exp.VertexBuffer()
+            vb.vertex_format = vertex_format
+            vbs.append(vb)
+            level.vbs_offsets.append(0)
+    else:
+        vb = exp.VertexBuffer()
+        vb.vertex_format = vertex_format
+        vbs.append(vb)
+        level.vbs_offsets.append(0)
+
+    # find indices buffer
+    if ibs:
+        ib = ibs[-1]
+        ib_offset = level.ibs_offsets[-1]
+        indices_buffer_index = ibs.index(ib)
+        if len(ib) > exp.TWO_MEGABYTES:
+            ib = bytearray()
+            ibs.append(ib)
+            ib_offset = 0
+            indices_buffer_index += 1
+            level.ibs_offsets.append(ib_offset)
+    else:
+        ib = bytearray()
+        ibs.append(ib)
+        ib_offset = 0
+        level.ibs_offsets.append(ib_offset)
+        indices_buffer_index = 0
+
+    vertices_count = 0
+    indices_count = 0
+    vertex_index = 0
+
+    unique_verts = {}
+    verts_indices = {}
+    for face in bm.faces:
+        for loop in face.loops:
+            vert = loop.vert
+            vert_co = (vert.co[0], vert.co[1], vert.co[2])
+            split_normal = export_mesh.loops[loop.index].normal
+            normal = (split_normal[0], split_normal[1], split_normal[2])
+            uv = loop[uv_layer].uv[0], loop[uv_layer].uv[1]
+            # UV-LightMaps
+            if uv_layer_lmap:
+                uv_lmap = loop[uv_layer_lmap].uv[0], loop[uv_layer_lmap].uv[1]
+            else:
+                uv_lmap = (0.0, 0.0)
+            # Vertex Color Hemi
+            if vertex_color_hemi:
+                hemi = loop[vertex_color_hemi][0]
+            else:
+                hemi = 0
+            # Vertex Color Sun
+            if vertex_color_sun:
+                sun = loop[vertex_color_sun][0]
+            else:
+                sun = 0
+            # Vertex Color Light
+            if vertex_color_light:
+                light = loop[vertex_color_light]
+            else:
+                light = (0, 0, 0)
+            if unique_verts.get(vert_co, None):
+                if not (uv, uv_lmap, normal, hemi, sun, light) in unique_verts[vert_co]:
+                    unique_verts[vert_co].append((uv, uv_lmap, normal, hemi, sun, light))
+                    verts_indices[vert_co].append(vertex_index)
+                    vertex_index += 1
+            else:
+                unique_verts[vert_co] = [(uv, uv_lmap, normal, hemi, sun, light), ]
+                verts_indices[vert_co] = [vertex_index, ]
+                vertex_index += 1
+
+    vertex_index = 0
+    saved_verts = set()
+    if uv_layer_lmap or vertex_color_sun:
+        uv_coeff = fmt.UV_COEFFICIENT
+    else:
+        uv_coeff = fmt.UV_COEFFICIENT_2
+    # tree shader params
+    frac_low = exp.get_bbox_center(bpy_obj.bound_box)
+    frac_low[2] = bpy_obj.bound_box[0][2]
+    frac_y_size = bpy_obj.bound_box[6][2] - bpy_obj.bound_box[0][2]
+    for face in bm.faces:
+        for loop in face.loops:
+            vert = loop.vert
+            vert_co = (vert.co[0], vert.co[1], vert.co[2])
+            vert_data = unique_verts[vert_co]
+            uv = loop[uv_layer].uv
+            split_normal = export_mesh.loops[loop.index].normal
+            if uv_layer_lmap:
+                uv_lmap = loop[uv_layer_lmap].uv
+            else:
+                uv_lmap = (0.0, 0.0)
+            # Vertex Color Hemi
+            if vertex_color_hemi:
+                hemi = loop[vertex_color_hemi][0]
+            else:
+                hemi = 0
+            # Vertex Color Sun
+            if vertex_color_sun:
+                sun = loop[vertex_color_sun][0]
+            else:
+                sun = 0
+            # Vertex Color Light
+            if vertex_color_light:
+                light = loop[vertex_color_light]
+            else:
+                light = (0, 0, 0)
+            for index, data in enumerate(vert_data):
+                if data[0] == (uv[0], uv[1]) and \
+                        data[1] == (uv_lmap[0], uv_lmap[1]) and \
+                        data[2] == (split_normal[0], split_normal[1], split_normal[2]) and \
+                        data[3] == hemi and data[4] == sun and data[5] == light:
+                    tex_uv, tex_uv_lmap, normal, hemi, sun, light = data
+                    vert_index = verts_indices[vert_co][index]
+                    break
+            packed_vertex_index = struct.pack('<H', vert_index)
+            ib.extend(packed_vertex_index)
+            indices_count += 1
+            if not vert_index in saved_verts:
+                vb.vertex_count += 1
+                saved_verts.add(vert_index)
+                vertex_index += 1
+                vertices_count += 1
+                packed_co = struct.pack('<3f', vert.co[0], vert.co[2], vert.co[1])
+                vb.position.extend(packed_co)
+                vb.normal.extend((
+                    int(round(((normal[1] + 1.0) / 2) * 255, 0)),
+                    int(round(((normal[2] + 1.0) / 2) * 255, 0)),
+                    int(round(((normal[0] + 1.0) / 2) * 255, 0))
+                ))
+                tangent = export_mesh.loops[loop.index].tangent
+                vb.tangent.extend((
+                    int(round(((tangent[1] + 1.0) / 2) * 255, 0)),
+                    int(round(((tangent[2] + 1.0) / 2) * 255, 0)),
+                    int(round(((tangent[0] + 1.0) / 2) * 255, 0))
+                ))
+                normal = mathutils.Vector(normal)
+                binormal = normal.cross(tangent).normalized()
+                vb.binormal.extend((
+                    int(round(((binormal[1] + 1.0) / 2) * 255, 0)),
+                    int(round(((binormal[2] + 1.0) / 2) * 255, 0)),
+                    int(round(((binormal[0] + 1.0) / 2) * 255, 0))
+                ))
+                # vertex color light
+                vb.color_hemi.append(int(round(hemi * 255, 0)))
+                if vertex_color_sun:
+                    vb.color_sun.append(int(round(sun * 255, 0)))
+                    vb.color_light.extend((
+                        (int(round(light[2] * 255, 0))),
+                        (int(round(light[1] * 255, 0))),
+                        (int(round(light[0] * 255, 0)))
+                    ))
+                # uv
+                tex_coord_u = int(tex_uv[0] * uv_coeff)
+                tex_coord_v = int((1 - tex_uv[1]) * uv_coeff)
+                # uv correct
+                tex_coord_u_correct, tex_coord_u = _get_tex_coord_correct_legacy(tex_uv[0], tex_coord_u, uv_coeff)
+                tex_coord_v_correct, tex_coord_v = _get_tex_coord_correct_legacy(1 - tex_uv[1], tex_coord_v, uv_coeff)
+                # set uv limits
+                if tex_coord_u > 0x7fff:
+                    tex_coord_u = 0x7fff
+                elif tex_coord_u < -0x8000:
+                    tex_coord_u = -0x8000
+
+                if tex_coord_v > 0x7fff:
+                    tex_coord_v = 0x7fff
+                elif tex_coord_v < -0x8000:
+                    tex_coord_v = -0x8000
+
+                packed_uv = struct.pack('<2h', tex_coord_u, tex_coord_v)
+                vb.uv.extend(packed_uv)
+                packed_uv_fix = struct.pack('<2B', tex_coord_u_correct, tex_coord_v_correct)
+                vb.uv_fix.extend(packed_uv_fix)
+                if uv_layer_lmap:
+                    lmap_u = int(round(tex_uv_lmap[0] * fmt.LIGHT_MAP_UV_COEFFICIENT, 0))
+                    lmap_v = int(round((1 - tex_uv_lmap[1]) * fmt.LIGHT_MAP_UV_COEFFICIENT, 0))
+                    packed_uv_lmap = struct.pack('<2h', lmap_u, lmap_v)
+                    vb.uv_lmap.extend(packed_uv_lmap)
+                # tree shader data (wind coefficient)
+                if not (uv_layer_lmap or vertex_color_sun or vertex_color_light):
+                    f1 = (vert.co[2] - frac_low[2]) / frac_y_size
+                    f2 = _find_distance_legacy(vert.co, frac_low) / frac_y_size
+                    frac = _quant_value_legacy((f1 + f2) / 2)
+                    packed_shader_data = struct.pack('<H', frac)
+                    vb.shader_data.extend(packed_shader_data)    # wind coefficient
+
+    vertex_buffer_index = vbs.index(vb)
+    packed_writer.putf('<I', vertex_buffer_index)    # vb_index
+    packed_writer.putf('<I', level.vbs_offsets[vertex_buffer_index])    # vb_offset
+    packed_writer.putf('<I', vertices_count)    # vb_size
+
+    packed_writer.putf('<I', indices_buffer_index)    # ib_index
+    packed_writer.putf('<I', ib_offset)    # ib_offset
+    packed_writer.putf('<I', indices_count)    # ib_size
+
+    level.saved_visuals[bpy_obj.data.name] = (
+        # vertices info
+        vertex_buffer_index,
+        level.vbs_offsets[vertex_buffer_index],
+        vertices_count,
+
+        # indices info
+        indices_buffer_index,
+        ib_offset,
+        indices_count
+    )
+
+    level.vbs_offsets[vertex_buffer_index] += vertices_count
+    level.ibs_offsets[-1] += indices_count
+
+    bpy.data.meshes.remove(export_mesh)
+
+    return packed_writer, visual
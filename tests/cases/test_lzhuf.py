@@ -0,0 +1,86 @@
+import random
+
+from tests import utils
+
+from io_scene_xray import lzhuf, xray_io
+
+
+class TestLzhuf(utils.XRayTestCase):
+    def test_engines_equivalence(self):
+        # Arrange
+        rnd = random.Random(0)
+        buffers = [
+            bytes(rnd.getrandbits(8) for _ in range(size))
+            for size in (0, 1, 7, 100, 5000)
+        ]
+        buffers.append(bytes(1000))
+        buffers.append(b'\xff' * 1000)
+
+        for buffer in buffers:
+            for textsize in (0, 1, 60, 4096, 30000):
+                # Act
+                classic = lzhuf.decompress_buffer(
+                    buffer, textsize, lzhuf.ENGINE_CLASSIC
+                )
+                fast = lzhuf.decompress_buffer(
+                    buffer, textsize, lzhuf.ENGINE_FAST
+                )
+
+                # Assert
+                self.assertEqual(fast, classic)
+
+    def test_default_engine(self):
+        # Act
+        data = lzhuf.decompress_buffer(b'\x12\x34\x56', 10)
+
+        # Assert
+        self.assertEqual(
+            data,
+            lzhuf.decompress_buffer(b'\x12\x34\x56', 10, lzhuf.ENGINE_CLASSIC)
+        )
+
+    def test_unsupported_engine(self):
+        with self.assertRaises(Exception):
+            lzhuf.decompress_buffer(b'', 0, 'UNKNOWN')
+
+    def test_compress(self):
+        # Arrange
+        rnd = random.Random(0)
+        buffers = [
+            b'',
+            b'a',
+            b'abc',
+            b'a' * 1000,
+            bytes(rnd.getrandbits(8) for _ in range(5000)),
+            bytes(rnd.choice(b'xyz') for _ in range(20000))
+        ]
+        with open(self.relpath('test_fmt.object'), 'rb') as file:
+            buffers.append(file.read())
+
+        for buffer in buffers:
+            # Act
+            compressed = lzhuf.compress_buffer(buffer)
+
+            # Assert
+            for engine in (lzhuf.ENGINE_CLASSIC, lzhuf.ENGINE_FAST):
+                data = lzhuf.decompress_buffer(compressed, len(buffer), engine)
+                self.assertEqual(bytes(data), buffer)
+
+        self.assertLess(len(lzhuf.compress_buffer(b'a' * 1000)), 100)
+
+    def test_compressed_chunks(self):
+        # Arrange
+        packed_writer = xray_io.PackedWriter()
+        packed_writer.puts('compressed chunk data ' * 10)
+        chunked_writer = xray_io.ChunkedWriter()
+
+        # Act
+        chunked_writer.put(0x1, packed_writer)
+        chunked_writer.put(0x2, packed_writer, compress=True)
+
+        # Assert
+        self.assertLess(len(chunked_writer.data), len(packed_writer.data) * 2)
+        chunks = list(xray_io.ChunkedReader(chunked_writer.data))
+        self.assertEqual([cid for cid, _ in chunks], [0x1, 0x2])
+        self.assertEqual(bytes(chunks[0][1]), bytes(packed_writer.data))
+        self.assertEqual(bytes(chunks[1][1]), bytes(packed_writer.data))
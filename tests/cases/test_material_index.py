@@ -0,0 +1,70 @@
+from tests import utils
+
+import bpy
+from io_scene_xray import utils as utl
+
+
+def _get_signature(material):
+    return material.xray.eshader, material.xray.gamemtl
+
+
+class TestMaterialIndex(utils.XRayTestCase):
+    def _new_material(self, name, eshader, gamemtl='default'):
+        material = bpy.data.materials.new(name)
+        material.xray.eshader = eshader
+        material.xray.gamemtl = gamemtl
+        return material
+
+    def test_name_stems(self):
+        self.assertEqual(list(utl.get_name_stems('mat')), ['mat'])
+        self.assertEqual(
+            list(utl.get_name_stems('mat.1.001')),
+            ['mat.1.001', 'mat.1', 'mat']
+        )
+        self.assertEqual(list(utl.get_name_stems('mat.a')), ['mat.a'])
+
+    def test_find(self):
+        # Arrange
+        index = utl.MaterialIndex(_get_signature)
+        material_1 = self._new_material('test_mat', 'shader_1')
+        material_2 = self._new_material('test_mat', 'shader_2')
+        self.assertEqual(material_2.name, 'test_mat.001')
+
+        # Act & Assert
+        self.assertEqual(
+            index.find('test_mat', ('shader_1', 'default')), material_1
+        )
+        self.assertEqual(
+            index.find('test_mat', ('shader_2', 'default')), material_2
+        )
+        self.assertEqual(
+            index.find('test_mat.001', ('shader_2', 'default')), material_2
+        )
+        self.assertIsNone(index.find('test_mat.001', ('shader_1', 'default')))
+        self.assertIsNone(index.find('test', ('shader_1', 'default')))
+        self.assertIsNone(
+            index.find(
+                'test_mat',
+                ('shader_2', 'default'),
+                lambda material: material.name == 'other'
+            )
+        )
+
+    def test_add_and_changes(self):
+        # Arrange
+        index = utl.MaterialIndex(_get_signature)
+        signature = ('shader', 'default')
+        self.assertIsNone(index.find('test_mat', signature))
+
+        # Act & Assert: add
+        material = self._new_material('test_mat', 'shader')
+        index.add(material)
+        self.assertEqual(index.find('test_mat', signature), material)
+
+        # Act & Assert: edited material is skipped
+        material.xray.eshader = 'other'
+        self.assertIsNone(index.find('test_mat', signature))
+
+        # Act & Assert: removed material
+        bpy.data.materials.remove(material)
+        self.assertIsNone(index.find('test_mat', ('other', 'default')))
@@ -0,0 +1,120 @@
+import math
+import random
+
+import bpy
+
+from tests import utils
+
+from io_scene_xray import motion_utils
+from io_scene_xray import xray_interpolation
+
+
+def refine_keys_sequential(keyframes, epsilon):
+    # reference implementation, one key at a time
+    def significant(prev_kf, curr_kf, next_kf, skipped):
+        def is_oor(keyframe, derivative):
+            expected_value = (keyframe.time - prev_kf.time) * derivative + prev_kf.value
+            return abs(expected_value - keyframe.value) >= epsilon
+
+        if prev_kf is None:
+            return curr_kf is not None
+        if (curr_kf.shape == xray_interpolation.Shape.LINEAR) and (next_kf.shape == xray_interpolation.Shape.LINEAR):
+            derivative = (next_kf.value - prev_kf.value) / (next_kf.time - prev_kf.time)
+            if is_oor(curr_kf, derivative):
+                return True
+            for keyframe in skipped:
+                if is_oor(keyframe, derivative):
+                    return True
+            return False
+        if (abs(prev_kf.value - curr_kf.value) + abs(curr_kf.value - next_kf.value)) < epsilon:
+            return False
+        return True
+
+    prev_kf, curr_kf = None, None
+    skipped = []
+    for next_kf in keyframes:
+        if significant(prev_kf, curr_kf, next_kf, skipped):
+            skipped = []
+            prev_kf = curr_kf
+            yield curr_kf
+        elif curr_kf is not None:
+            skipped.append(curr_kf)
+        curr_kf = next_kf
+
+    if curr_kf and ((not prev_kf) or (abs(curr_kf.value - prev_kf.value) >= epsilon)):
+        yield curr_kf
+
+
+class TestRefineKeys(utils.XRayTestCase):
+    def test_fixtures(self):
+        # Arrange
+        for file_name in (
+                'test_fmt.anm',
+                'test_fmt_v3.anm',
+                'test_fmt_tcb.anm',
+                'test_fmt_bezier_2d.anm',
+                'test_fmt_name_and_linear.anm'
+            ):
+            bpy.ops.xray_import.anm(
+                directory=self.relpath(),
+                files=[{'name': file_name}],
+                camera_animation=False
+            )
+        shapes = (
+            xray_interpolation.Shape.LINEAR,
+            xray_interpolation.Shape.STEPPED
+        )
+        for action in bpy.data.actions:
+            for fcurve in action.fcurves:
+                for shape in shapes:
+                    keyframes = [
+                        motion_utils.KF(point.co.x / 30, point.co.y, shape)
+                        for point in fcurve.keyframe_points
+                    ]
+                    for epsilon in (motion_utils.EPSILON, 0.001, 0.1):
+                        self._assert_refine(keyframes, epsilon)
+
+    def test_curves(self):
+        rnd = random.Random(0)
+        curves = (
+            [math.sin(frame / 20) for frame in range(500)],
+            [0.000001 * frame for frame in range(500)],
+            [0.01 * frame for frame in range(500)],
+            [float(frame // 50 % 2) for frame in range(500)],
+            [rnd.choice((0.0, 0.000003, rnd.random())) for _ in range(500)]
+        )
+        for curve in curves:
+            for shape in xray_interpolation.Shape:
+                keyframes = [
+                    motion_utils.KF(frame / 30, value, shape)
+                    for frame, value in enumerate(curve)
+                ]
+                self._assert_refine(keyframes, motion_utils.EPSILON)
+            # mixed shapes
+            keyframes = [
+                motion_utils.KF(frame / 30, value, rnd.choice((
+                    xray_interpolation.Shape.LINEAR,
+                    xray_interpolation.Shape.STEPPED
+                )))
+                for frame, value in enumerate(curve)
+            ]
+            self._assert_refine(keyframes, 0.001)
+
+    def test_short_curves(self):
+        shape = xray_interpolation.Shape.STEPPED
+        for count in range(4):
+            keyframes = [
+                motion_utils.KF(frame, 0.0, shape) for frame in range(count)
+            ]
+            self._assert_refine(keyframes, motion_utils.EPSILON)
+
+    def _assert_refine(self, keyframes, epsilon):
+        # Act
+        refined = motion_utils.refine_keys(keyframes, epsilon)
+
+        # Assert
+        expected = list(refine_keys_sequential(keyframes, epsilon))
+        self.assertEqual(
+            [(key.time, key.value) for key in refined],
+            [(key.time, key.value) for key in expected]
+        )
@@ -0,0 +1,85 @@
+import os
+
+from tests import utils
+
+from io_scene_xray import xray_io
+
+
+class TestXrayIO(utils.XRayTestCase):
+    def test_mapped_chunked_reader(self):
+        file_path = os.path.join(self.relpath(), 'test_fmt_level', 'level.geom')
+
+        # Act
+        chunks = [
+            (cid, bytes(data))
+            for cid, data in xray_io.ChunkedReader.from_file(file_path)
+        ]
+        mapped_reader = xray_io.ChunkedReader.from_file(file_path, mapped=True)
+        mapped_chunks = list(mapped_reader)
+
+        # Assert
+        self.assertEqual(
+            [(cid, bytes(data)) for cid, data in mapped_chunks],
+            chunks
+        )
+        for _, data in mapped_chunks:
+            self.assertIsInstance(data, memoryview)
+
+    def test_mapped_packed_reader(self):
+        file_path = os.path.join(self.relpath(), 'test_fmt.skls')
+
+        # Act
+        with open(file_path, 'rb') as file:
+            reader = xray_io.PackedReader(file.read())
+        mapped_reader = xray_io.PackedReader(xray_io.map_file(file_path))
+
+        # Assert
+        self.assertEqual(mapped_reader.getf('<I'), reader.getf('<I'))
+        self.assertEqual(mapped_reader.gets(), reader.gets())
+        self.assertEqual(mapped_reader.offset(), reader.offset())
+
+    def test_map_empty_file(self):
+        file_path = self.outpath('empty.bin')
+        with open(file_path, 'wb'):
+            pass
+
+        # Act
+        data = xray_io.map_file(file_path)
+
+        # Assert
+        self.assertEqual(len(data), 0)
+        self.assertEqual(list(xray_io.ChunkedReader(data)), [])
+
+    def test_file_writers(self):
+        def write(chunked_writer):
+            packed_writer = xray_io.PackedWriter()
+            packed_writer.puts('name')
+            packed_writer.putf('<2I', 1, 2)
+            packed_writer.putv3f((1.0, 2.0, 3.0))
+            chunked_writer.put(0x1, packed_writer)
+            with chunked_writer.chunk(0x2) as nested_writer:
+                nested_writer.put(0x3, packed_writer)
+                nested_writer.put(0x4, packed_writer, compress=True)
+            chunked_writer.put(0x5, packed_writer)
+
+        chunked_writer = xray_io.ChunkedWriter()
+        write(chunked_writer)
+        file_path = self.outpath('writers.bin')
+
+        # Act
+        with open(file_path, 'wb') as file:
+            packed_writer = xray_io.FilePackedWriter(file)
+            packed_writer.putf('<I', 0)
+            packed_writer.puts('header')
+            packed_writer.replace(0, (7, 0))
+            write(xray_io.FileChunkedWriter(file))
+
+        # Assert
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        self.assertEqual(data[ : 11], b'\x07\x00\x00\x00header\x00')
+        self.assertEqual(data[11 : ], bytes(chunked_writer.data))
+        chunks = list(xray_io.ChunkedReader(data[11 : ]))
+        self.assertEqual([cid for cid, _ in chunks], [0x1, 0x2, 0x5])
+        nested_chunks = list(xray_io.ChunkedReader(chunks[1][1]))
+        self.assertEqual([cid for cid, _ in nested_chunks], [0x3, 0x4])
@@ -0,0 +1,125 @@
+# Usage:
+# blender --factory-startup -noaudio -b --python utils/bench_cform.py -- [grid-size] [sectors-count] [repeat]
+import os
+import sys
+import time
+import types
+import struct
+
+import addon_utils
+import bpy
+import numpy
+
+
+utils_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(utils_dir)
+
+
+def generate_cform(grid_size, sectors_count):
+    # square grid of vertices, two triangles per cell
+    coords = numpy.arange(grid_size, dtype=numpy.float32)
+    grid_x, grid_z = numpy.meshgrid(coords, coords)
+    verts = numpy.zeros((grid_size * grid_size, 3), dtype=numpy.float32)
+    verts[ : , 0] = grid_x.ravel()
+    verts[ : , 2] = grid_z.ravel()
+    cells = numpy.arange(grid_size * (grid_size - 1))
+    cells = cells[(cells % grid_size) != grid_size - 1]
+    tris = numpy.zeros(len(cells) * 2, dtype=[
+        ('verts', '<u4', 3), ('material', '<u2'), ('sector', '<u2')
+    ])
+    tris['verts'][0 : : 2] = numpy.column_stack(
+        (cells, cells + grid_size, cells + 1)
+    )
+    tris['verts'][1 : : 2] = numpy.column_stack(
+        (cells + 1, cells + grid_size, cells + grid_size + 1)
+    )
+    tris['material'] = numpy.arange(len(tris)) % 7 | 0x4000
+    tris['sector'] = numpy.arange(len(tris)) * sectors_count // len(tris)
+    header = struct.pack('<3I6f', 4, len(verts), len(tris), *([0.0] * 6))
+    return header + verts.tobytes() + tris.tobytes(), len(tris)
+
+
+def legacy_read_triangles(cform_module, data):
+    # per-triangle decoding, as it was before vectorization
+    packed_reader = cform_module.xray_io.PackedReader(data)
+    _, verts_count, tris_count = packed_reader.getf('<3I')
+    packed_reader.getf('<6f')
+    packed_reader.get_array('f', verts_count * 3)
+    sectors_tris = {}
+    prep = packed_reader.prep('3I2H')
+    for tris_index in range(tris_count):
+        vert_1, vert_2, vert_3, mat, sector = packed_reader.getp(prep)
+        mat_id = mat & 0x3fff
+        shadows = bool(mat & 0x4000)
+        wallmarks = bool(mat & 0x8000)
+        sectors_tris.setdefault(sector, []).append(tris_index)
+    return sectors_tris
+
+
+def numpy_read_triangles(cform_module, data):
+    packed_reader = cform_module.xray_io.PackedReader(data)
+    version, verts_count, tris_count = packed_reader.getf('<3I')
+    packed_reader.getf('<6f')
+    packed_reader.get_array('f', verts_count * 3)
+    tris = cform_module.read_triangles(packed_reader, version, tris_count)
+    return cform_module.partition_sectors(tris[4], set(tris[4].tolist()))
+
+
+def import_cform(cform_module, data, sectors_count):
+    bpy.ops.wm.read_homefile()
+    addon_utils.enable('io_scene_xray', default_set=True)
+    collection = bpy.context.scene.collection
+    sectors_objects = {}
+    for sector in range(sectors_count):
+        sectors_objects[sector] = bpy.data.objects.new(str(sector), None)
+    level = types.SimpleNamespace(
+        xrlc_version=cform_module.fmt.VERSION_9,
+        file='bench',
+        sectors_objects=sectors_objects,
+        collections={
+            cform_module.create.LEVEL_CFORM_COLLECTION_NAME: collection
+        }
+    )
+    from io_scene_xray.level import ops
+    # version is the plugin version, as in the import operator
+    context = ops.ImportLevelContext()
+    start_time = time.time()
+    cform_module.import_main(context, level, data=data)
+    return time.time() - start_time
+
+
+def best_time(repeat, function, *args):
+    times = []
+    for _ in range(repeat):
+        start_time = time.time()
+        function(*args)
+        times.append(time.time() - start_time)
+    return min(times)
+
+
+def main():
+    args = []
+    if '--' in sys.argv:
+        args = sys.argv[sys.argv.index('--') + 1 : ]
+    grid_size = int(args[0]) if args else 500
+    sectors_count = int(args[1]) if len(args) > 1 else 16
+    repeat = int(args[2]) if len(args) > 2 else 3
+
+    addon_utils.enable('io_scene_xray', default_set=True)
+    from io_scene_xray.level import cform
+
+    data, tris_count = generate_cform(grid_size, sectors_count)
+    print('triangles: {0}, sectors: {1}'.format(tris_count, sectors_count))
+    legacy = best_time(repeat, legacy_read_triangles, cform, data)
+    vectorized = best_time(repeat, numpy_read_triangles, cform, data)
+    print('{0:<16} {1:>10.4f} sec'.format('decode (loop)', legacy))
+    print('{0:<16} {1:>10.4f} sec'.format('decode (numpy)', vectorized))
+    print('{0:<16} {1:>10.1f}x'.format('speedup', legacy / vectorized))
+    import_time = min(
+        import_cform(cform, data, sectors_count) for _ in range(repeat)
+    )
+    print('{0:<16} {1:>10.4f} sec'.format('import_main', import_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# Usage:
+# blender --factory-startup -noaudio -b --python utils/bench_image_lookup.py -- [objects-count] [images-count]
+import os
+import sys
+import time
+import shutil
+import string
+import tempfile
+
+import addon_utils
+import bpy
+
+
+# texture of the test_fmt.object material
+TEXTURE_NAME = b'eye'
+
+
+def populate_images(textures_folder, images_count):
+    images = set()
+    for image_index in range(images_count):
+        image = bpy.data.images.new('image_{0}'.format(image_index), 0, 0)
+        image.source = 'FILE'
+        image.filepath = os.path.join(
+            textures_folder, 'image_{0}.dds'.format(image_index)
+        )
+        images.add(image.name)
+    return images
+
+
+def get_texture_name(object_index):
+    # texture names have the same length as in the source file,
+    # so the chunk sizes of the copies stay valid
+    chars = string.digits + string.ascii_lowercase
+    name = ''
+    for _ in range(len(TEXTURE_NAME)):
+        object_index, char_index = divmod(object_index, len(chars))
+        name += chars[char_index]
+    return name.encode()
+
+
+def write_object(source_data, file_path, object_index):
+    # every object uses its own texture
+    texture = b'\x00' + get_texture_name(object_index) + b'\x00'
+    data = source_data.replace(b'\x00' + TEXTURE_NAME + b'\x00', texture)
+    with open(file_path, 'wb') as file:
+        file.write(data)
+
+
+def linear_find(file_path):
+    # lookup as it was before the registry
+    for bpy_image in bpy.data.images:
+        if bpy.path.abspath(bpy_image.filepath) == file_path:
+            return bpy_image
+
+
+def import_objects(directory, files_names, images_names):
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj)
+    for image in list(bpy.data.images):
+        if image.name not in images_names:
+            bpy.data.images.remove(image)
+    start_time = time.time()
+    bpy.ops.xray_import.object(
+        directory=directory,
+        files=[{'name': file_name} for file_name in files_names]
+    )
+    return time.time() - start_time
+
+
+def main():
+    args = []
+    if '--' in sys.argv:
+        args = sys.argv[sys.argv.index('--') + 1 : ]
+    objects_count = int(args[0]) if args else 200
+    images_count = int(args[1]) if len(args) > 1 else 5000
+
+    addon_utils.enable('io_scene_xray', default_set=True)
+    from io_scene_xray import utils, version_utils
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    source_path = os.path.join(repo_dir, 'tests', 'cases', 'test_fmt.object')
+    directory = tempfile.mkdtemp()
+    try:
+        textures_folder = os.path.join(directory, 'textures')
+        version_utils.get_preferences().textures_folder = textures_folder
+        with open(source_path, 'rb') as file:
+            source_data = file.read()
+        files_names = []
+        for object_index in range(objects_count):
+            file_name = 'object_{0}.object'.format(object_index)
+            write_object(
+                source_data,
+                os.path.join(directory, file_name),
+                object_index
+            )
+            files_names.append(file_name)
+        images_names = populate_images(textures_folder, images_count)
+        print('objects: {0}, images: {1}'.format(objects_count, images_count))
+        registry_find = utils.IMAGES.find
+        for name, find in (('linear', linear_find), ('registry', registry_find)):
+            utils.IMAGES.find = find
+            try:
+                total_time = import_objects(directory, files_names, images_names)
+            finally:
+                utils.IMAGES.find = registry_find
+            print('{0:<10} {1:>9.3f} sec'.format(name, total_time))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
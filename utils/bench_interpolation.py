@@ -0,0 +1,95 @@
+import time
+import random
+from optparse import OptionParser
+
+import utils
+
+from io_scene_xray import xray_interpolation
+
+
+def generate_keys(shape, keys_count, rnd):
+    times = []
+    frame = 0
+    for _ in range(keys_count):
+        times.append(float(frame))
+        frame += rnd.randint(2, 10)
+    values = [rnd.uniform(-3.0, 3.0) for _ in range(keys_count)]
+    shapes = [shape] * keys_count
+    tcb = [[rnd.uniform(-1.0, 1.0) for _ in range(3)] for _ in range(keys_count)]
+    params = [[rnd.uniform(-0.3, 0.3) for _ in range(4)] for _ in range(keys_count)]
+    return values, times, shapes, tcb, params
+
+
+def evaluate_scalar(values, times, shapes, tcb, params):
+    # per-frame evaluation, as it was before vectorization
+    keys = []
+    for value, key_time, shape, key_tcb, key_params in zip(
+            values, times, shapes, tcb, params
+        ):
+        key = xray_interpolation.Key()
+        key.value = value
+        key.time = key_time
+        key.shape = shape
+        key.tension, key.continuity, key.bias = key_tcb
+        key.param_1, key.param_2, key.param_3, key.param_4 = key_params
+        keys.append(key)
+    empty_key = xray_interpolation.Key()
+    result = []
+    for index in range(len(keys) - 1):
+        start_key = keys[index]
+        end_key = keys[index + 1]
+        prev_key = keys[index - 1] if index > 0 else empty_key
+        next_key = keys[index + 2] if index + 2 < len(keys) else empty_key
+        for frame in range(int(round(start_key.time, 0)), int(round(end_key.time, 0))):
+            result.append(xray_interpolation.evaluate(
+                frame, start_key, end_key, prev_key, next_key
+            ))
+    result.append(keys[-1].value)
+    return result
+
+
+def evaluate_vectorized(values, times, shapes, tcb, params):
+    start_frame = int(round(times[0], 0))
+    end_frame = int(round(times[-1], 0))
+    return xray_interpolation.evaluate_keys(
+        start_frame, end_frame, values, times, shapes, tcb, params
+    )[0]
+
+
+def best_time(repeat, function, keys):
+    times = []
+    for _ in range(repeat):
+        start_time = time.time()
+        function(*keys)
+        times.append(time.time() - start_time)
+    return min(times)
+
+
+def main():
+    parser = OptionParser(usage='Usage: bench_interpolation.py [options]')
+    parser.add_option(
+        '-k', '--keys', dest='keys', type='int', default=10000,
+        help='keys count per curve'
+    )
+    parser.add_option(
+        '-r', '--repeat', dest='repeat', type='int', default=3,
+        help='repeat count, the best time is printed'
+    )
+    (options, args) = parser.parse_args()
+
+    rnd = random.Random(0)
+    print('{0:<10} {1:>8} {2:>12} {3:>12} {4:>9}'.format(
+        'shape', 'frames', 'scalar', 'numpy', 'speedup'
+    ))
+    for shape in xray_interpolation.Shape:
+        keys = generate_keys(shape, options.keys, rnd)
+        frames_count = len(evaluate_vectorized(*keys))
+        scalar = best_time(options.repeat, evaluate_scalar, keys)
+        vectorized = best_time(options.repeat, evaluate_vectorized, keys)
+        print('{0:<10} {1:>8} {2:>10.4f} s {3:>10.4f} s {4:>8.1f}x'.format(
+            shape.name, frames_count, scalar, vectorized, scalar / vectorized
+        ))
+
+
+if __name__ == '__main__':
+    main()
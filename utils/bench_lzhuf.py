@@ -0,0 +1,97 @@
+import os
+import time
+import random
+from optparse import OptionParser
+
+import utils
+
+from io_scene_xray import lzhuf
+
+
+def bench(name, function, repeat):
+    best = None
+    for _ in range(repeat):
+        start_time = time.time()
+        result = function()
+        duration = time.time() - start_time
+        if best is None or duration < best:
+            best = duration
+    return result, max(best, 1e-9)
+
+
+def print_speed(name, size, duration, extra=''):
+    speed = size / duration / 1024 / 1024
+    print('{0:<32} {1:>10.3f} sec {2:>10.2f} MB/s {3}'.format(
+        name, duration, speed, extra
+    ))
+
+
+def bench_decompress(options):
+    rnd = random.Random(0)
+    buffer = bytes(rnd.getrandbits(8) for _ in range(options.size))
+    for engine in (lzhuf.ENGINE_CLASSIC, lzhuf.ENGINE_FAST):
+        data, duration = bench(
+            'decompress',
+            lambda: lzhuf.decompress_buffer(buffer, options.textsize, engine),
+            options.repeat
+        )
+        print_speed('decompress ' + engine.lower(), len(data), duration)
+
+
+def bench_compress(options):
+    total_size = 0
+    total_compressed = 0
+    total_time = 0.0
+    for file_name in sorted(os.listdir(options.directory)):
+        file_path = os.path.join(options.directory, file_name)
+        if not os.path.isfile(file_path) or file_name.endswith('.py'):
+            continue
+        data = utils.read_file(file_path)
+        if not data:
+            continue
+        compressed, duration = bench(
+            'compress',
+            lambda: lzhuf.compress_buffer(data),
+            options.repeat
+        )
+        restored = lzhuf.decompress_buffer(compressed, len(data))
+        if bytes(restored) != data:
+            raise Exception('round trip failed: {}'.format(file_name))
+        ratio = len(compressed) / len(data)
+        print_speed(
+            'compress ' + file_name, len(data), duration,
+            'ratio {0:.3f}'.format(ratio)
+        )
+        total_size += len(data)
+        total_compressed += len(compressed)
+        total_time += duration
+    if total_size:
+        print_speed(
+            'compress total', total_size, total_time,
+            'ratio {0:.3f}'.format(total_compressed / total_size)
+        )
+
+
+def main():
+    parser = OptionParser(usage='Usage: bench_lzhuf.py [options]')
+    parser.add_option(
+        '-s', '--size', type='int', default=256 * 1024,
+        help='compressed buffer size in bytes'
+    )
+    parser.add_option(
+        '-t', '--textsize', type='int', default=1024 * 1024,
+        help='decompressed size in bytes'
+    )
+    parser.add_option(
+        '-d', '--directory',
+        default=os.path.join(utils.repo_dir, 'tests', 'cases'),
+        help='directory with files for compression benchmark'
+    )
+    parser.add_option('-r', '--repeat', type='int', default=3)
+    (options, args) = parser.parse_args()
+    bench_decompress(options)
+    bench_compress(options)
+
+
+if __name__ == '__main__':
+    main()
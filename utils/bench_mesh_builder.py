@@ -0,0 +1,40 @@
+# Usage:
+# blender --factory-startup -noaudio -b --python utils/bench_mesh_builder.py -- [level-file] [repeat]
+import os
+import sys
+import time
+
+import addon_utils
+import bpy
+
+
+utils_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(utils_dir)
+
+
+def import_level(level_path, builder):
+    bpy.ops.wm.read_homefile()
+    addon_utils.enable('io_scene_xray', default_set=True)
+    start_time = time.time()
+    bpy.ops.xray_import.level(filepath=level_path, mesh_builder=builder)
+    return time.time() - start_time
+
+
+def main():
+    args = []
+    if '--' in sys.argv:
+        args = sys.argv[sys.argv.index('--') + 1 : ]
+    if args:
+        level_path = os.path.abspath(args[0])
+    else:
+        level_path = os.path.join(
+            repo_dir, 'tests', 'cases', 'test_fmt_level', 'level'
+        )
+    repeat = int(args[1]) if len(args) > 1 else 5
+    for builder in ('BMESH', 'ARRAYS'):
+        best = min(import_level(level_path, builder) for _ in range(repeat))
+        print('{0:<8} {1:>10.4f} sec'.format(builder, best))
+
+
+if __name__ == '__main__':
+    main()
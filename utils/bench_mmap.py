@@ -0,0 +1,138 @@
+import os
+import sys
+import resource
+import subprocess
+import tempfile
+from optparse import OptionParser, SUPPRESS_HELP
+
+import utils
+
+from io_scene_xray import xray_io
+
+
+READ_MODES = ('read', 'mmap')
+
+
+def get_peak_rss():
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def read_data(file_path, mode):
+    if mode == 'mmap':
+        return xray_io.map_file(file_path)
+    return utils.read_file(file_path)
+
+
+def run_level(file_path, mode):
+    data = read_data(file_path, mode)
+    chunks = {}
+    for chunk_id, chunk_data in xray_io.ChunkedReader(data):
+        chunks[chunk_id] = chunk_data
+    checksum = 0
+    for chunk_data in chunks.values():
+        checksum += sum(memoryview(chunk_data).cast('B')[0 : : 4096])
+    return checksum
+
+
+def skip_motion(data, offs):
+    # the same walk as xray_motions.skip_motion_rest, without blender
+    fast_bytes = xray_io.FastBytes
+    ptr = fast_bytes.skip_str_at(data, offs) + 4 + 4 + 4 + 2
+    version = fast_bytes.short_at(data, ptr - 2)
+    ptr += (1 + 2 + 4 * 4) + 2
+    for _ in range(fast_bytes.short_at(data, ptr - 2)):
+        ptr = fast_bytes.skip_str_at(data, ptr) + 1
+        for _ in range(6):
+            ptr += 1 + 1 + 2
+            for _ in range(fast_bytes.short_at(data, ptr - 2)):
+                ptr += (4 + 4) + 1
+                if data[ptr - 1] != 4:
+                    ptr += (2 * 3 + 2 * 4)
+    if version >= 7:
+        ptr += 4
+        for _ in range(fast_bytes.int_at(data, ptr - 4)):
+            ptr = fast_bytes.skip_str_at_a(data, ptr) + 4
+            ptr += (4 + 4) * fast_bytes.int_at(data, ptr - 4)
+    return ptr
+
+
+def run_skls(file_path, mode):
+    # index animations, like .skls browser does
+    data = read_data(file_path, mode)
+    offs = 4
+    for _ in range(xray_io.FastBytes.int_at(data, 0)):
+        offs = skip_motion(data, offs)
+    return offs
+
+
+def run_child(kind, file_path, mode):
+    start_rss = get_peak_rss()
+    if kind == 'skls':
+        run_skls(file_path, mode)
+    else:
+        run_level(file_path, mode)
+    print(get_peak_rss() - start_rss)
+
+
+def generate_file(size_mb):
+    # chunked file with 1 MB chunks
+    chunked_writer = xray_io.ChunkedWriter()
+    for chunk_id in range(size_mb):
+        packed_writer = xray_io.PackedWriter()
+        packed_writer.data = bytearray(os.urandom(1024 * 1024))
+        chunked_writer.put(chunk_id, packed_writer)
+    file = tempfile.NamedTemporaryFile(suffix='.level', delete=False)
+    with file:
+        file.write(chunked_writer.data)
+    return file.name
+
+
+def main():
+    parser = OptionParser(
+        usage='Usage: bench_mmap.py [options] [level-file] [skls-file]'
+    )
+    parser.add_option(
+        '-g', '--generate', dest='generate', type='int', default=0,
+        help='generate chunked file of given size in MB instead of level'
+    )
+    parser.add_option('--child', dest='child', help=SUPPRESS_HELP)
+    (options, args) = parser.parse_args()
+
+    if options.child:
+        kind, mode = options.child.split(':')
+        run_child(kind, args[0], mode)
+        return
+
+    cases_dir = os.path.join(utils.repo_dir, 'tests', 'cases')
+    level_path = os.path.join(cases_dir, 'test_fmt_level', 'level.geom')
+    skls_path = os.path.join(cases_dir, 'test_fmt.skls')
+    if args:
+        level_path = args[0]
+    if len(args) > 1:
+        skls_path = args[1]
+    generated = None
+    if options.generate:
+        generated = level_path = generate_file(options.generate)
+
+    try:
+        for kind, file_path in (('level', level_path), ('skls', skls_path)):
+            size = os.path.getsize(file_path) / 1024 / 1024
+            for mode in READ_MODES:
+                output = subprocess.check_output((
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    '--child', '{0}:{1}'.format(kind, mode),
+                    file_path
+                ))
+                peak_rss = int(output.decode().split()[-1]) / 1024
+                print('{0:<6} {1:<5} file {2:>9.2f} MB  peak rss +{3:>9.2f} MB'.format(
+                    kind, mode, size, peak_rss
+                ))
+    finally:
+        if generated:
+            os.remove(generated)
+
+
+if __name__ == '__main__':
+    main()
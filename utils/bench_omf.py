@@ -0,0 +1,65 @@
+# Usage:
+# blender --factory-startup -noaudio -b --python utils/bench_omf.py -- [repeat]
+import os
+import sys
+import time
+
+import addon_utils
+import bpy
+
+
+utils_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(utils_dir)
+cases_dir = os.path.join(repo_dir, 'tests', 'cases')
+
+
+def set_active_object(obj):
+    if bpy.app.version >= (2, 80, 0):
+        bpy.context.view_layer.objects.active = obj
+    else:
+        bpy.context.scene.objects.active = obj
+
+
+def import_omf():
+    for action in bpy.data.actions:
+        bpy.data.actions.remove(action)
+    start_time = time.time()
+    bpy.ops.xray_import.omf(
+        directory=cases_dir,
+        files=[{'name': 'test_fmt.omf'}],
+        import_motions=True,
+        import_bone_parts=False,
+        add_actions_to_motion_list=False
+    )
+    return time.time() - start_time
+
+
+def main():
+    args = []
+    if '--' in sys.argv:
+        args = sys.argv[sys.argv.index('--') + 1 : ]
+    repeat = int(args[0]) if args else 10
+
+    bpy.ops.wm.read_homefile()
+    addon_utils.enable('io_scene_xray', default_set=True)
+    bpy.ops.xray_import.object(
+        directory=cases_dir,
+        files=[{'name': 'test_fmt_omf.object'}]
+    )
+    set_active_object(bpy.data.objects['test_fmt_omf.object'])
+
+    times = [import_omf() for _ in range(repeat)]
+    keys_count = sum(
+        len(fcurve.keyframe_points)
+        for action in bpy.data.actions
+        for fcurve in action.fcurves
+    )
+    print('actions: {0}, keyframes: {1}'.format(
+        len(bpy.data.actions), keys_count
+    ))
+    print('{0:<8} {1:>10.4f} sec'.format('best', min(times)))
+    print('{0:<8} {1:>10.4f} sec'.format('average', sum(times) / repeat))
+
+
+if __name__ == '__main__':
+    main()
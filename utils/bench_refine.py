@@ -0,0 +1,100 @@
+# Usage:
+# blender --factory-startup -noaudio -b --python utils/bench_refine.py -- [keys-count] [repeat]
+import sys
+import time
+import math
+import random
+
+import addon_utils
+
+
+def legacy_refine_keys(keyframes, epsilon, shape_linear):
+    # per-key refine, as it was before vectorization
+    def significant(prev_kf, curr_kf, next_kf, skipped):
+        def is_oor(keyframe, derivative):
+            expected_value = (keyframe.time - prev_kf.time) * derivative + prev_kf.value
+            return abs(expected_value - keyframe.value) >= epsilon
+
+        if prev_kf is None:
+            return curr_kf is not None
+        if (curr_kf.shape == shape_linear) and (next_kf.shape == shape_linear):
+            derivative = (next_kf.value - prev_kf.value) / (next_kf.time - prev_kf.time)
+            if is_oor(curr_kf, derivative):
+                return True
+            for keyframe in skipped:
+                if is_oor(keyframe, derivative):
+                    return True
+            return False
+        if (abs(prev_kf.value - curr_kf.value) + abs(curr_kf.value - next_kf.value)) < epsilon:
+            return False
+        return True
+
+    prev_kf, curr_kf = None, None
+    skipped = []
+    for next_kf in keyframes:
+        if significant(prev_kf, curr_kf, next_kf, skipped):
+            skipped = []
+            prev_kf = curr_kf
+            yield curr_kf
+        elif curr_kf is not None:
+            skipped.append(curr_kf)
+        curr_kf = next_kf
+
+    if curr_kf and ((not prev_kf) or (abs(curr_kf.value - prev_kf.value) >= epsilon)):
+        yield curr_kf
+
+
+def best_time(repeat, function):
+    times = []
+    for _ in range(repeat):
+        start_time = time.time()
+        result = function()
+        times.append(time.time() - start_time)
+    return min(times), result
+
+
+def main():
+    args = []
+    if '--' in sys.argv:
+        args = sys.argv[sys.argv.index('--') + 1 : ]
+    keys_count = int(args[0]) if args else 5000
+    repeat = int(args[1]) if len(args) > 1 else 3
+
+    addon_utils.enable('io_scene_xray', default_set=True)
+    from io_scene_xray import motion_utils
+    from io_scene_xray import xray_interpolation
+
+    rnd = random.Random(0)
+    curves = (
+        ('constant', lambda frame: 1.0),
+        ('steps', lambda frame: float(frame // 100 % 2)),
+        ('sine', lambda frame: math.sin(frame / 20)),
+        ('drift', lambda frame: 0.000001 * frame),
+        ('noise', lambda frame: rnd.random()),
+        ('linear', lambda frame: 0.01 * frame)
+    )
+    shape_linear = xray_interpolation.Shape.LINEAR
+    print('{0:<10} {1:<8} {2:>6} {3:>10} {4:>10} {5:>8}'.format(
+        'curve', 'shape', 'keys', 'legacy', 'numpy', 'speedup'
+    ))
+    for curve_name, function in curves:
+        for shape in (xray_interpolation.Shape.STEPPED, shape_linear):
+            keyframes = [
+                motion_utils.KF(frame / 30, function(frame), shape)
+                for frame in range(keys_count)
+            ]
+            legacy, expected = best_time(repeat, lambda: list(legacy_refine_keys(
+                keyframes, motion_utils.EPSILON, shape_linear
+            )))
+            vectorized, result = best_time(repeat, lambda: motion_utils.refine_keys(
+                keyframes, motion_utils.EPSILON
+            ))
+            assert result == expected
+            print('{0:<10} {1:<8} {2:>6} {3:>8.4f} s {4:>8.4f} s {5:>7.1f}x'.format(
+                curve_name, shape.name, len(result), legacy, vectorized,
+                legacy / vectorized
+            ))
+
+
+if __name__ == '__main__':
+    main()
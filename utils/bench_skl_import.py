@@ -0,0 +1,129 @@
+# Usage:
+# blender --factory-startup -noaudio -b --python utils/bench_skl_import.py -- [files-count] [workers-count] [bones-count]
+import os
+import sys
+import time
+import math
+import shutil
+import tempfile
+
+import addon_utils
+import bpy
+
+
+FRAMES_COUNT = 100
+KEYS_STEP = 10
+
+
+def write_skl(file_path, xray_io, name, bones_names):
+    # tcb keys, decoding interpolates them into linear keys
+    packed_writer = xray_io.PackedWriter()
+    packed_writer.puts(name)
+    packed_writer.putf('II', 0, FRAMES_COUNT)
+    packed_writer.putf('fH', 30.0, 6)
+    packed_writer.putf('<BH', 0, 0)
+    packed_writer.putf('<ffff', 1.0, 2.0, 2.0, 1.0)
+    packed_writer.putf('H', len(bones_names))
+    for bone_index, bone_name in enumerate(bones_names):
+        packed_writer.puts(bone_name)
+        packed_writer.putf('B', 0)
+        for curve_index in range(6):
+            packed_writer.putf('BB', 1, 1)
+            frames = range(0, FRAMES_COUNT + 1, KEYS_STEP)
+            packed_writer.putf('H', len(frames))
+            for frame in frames:
+                value = math.sin(frame * 0.1 + bone_index + curve_index) * 0.1
+                packed_writer.putf('ff', value, frame / 30.0)
+                packed_writer.putf('B', 0)    # tcb
+                packed_writer.putf('7H', *([0x8000] * 7))
+    chunked_writer = xray_io.ChunkedWriter()
+    chunked_writer.put(0x1200, packed_writer)
+    with open(file_path, 'wb') as file:
+        file.write(chunked_writer.data)
+
+
+def create_armature(version_utils, bones_names):
+    arm = bpy.data.armatures.new('bench')
+    obj = bpy.data.objects.new('bench', arm)
+    version_utils.link_object(obj)
+    version_utils.set_active_object(obj)
+    bpy.ops.object.mode_set(mode='EDIT')
+    try:
+        for bone_name in bones_names:
+            bone = arm.edit_bones.new(bone_name)
+            bone.tail.y = 1
+    finally:
+        bpy.ops.object.mode_set(mode='OBJECT')
+    for pose_bone in obj.pose.bones:
+        pose_bone.rotation_mode = 'ZXY'
+    return obj
+
+
+def import_files(version_utils, directory, files_names, workers_count):
+    version_utils.get_preferences().import_workers_count = workers_count
+    for action in list(bpy.data.actions):
+        bpy.data.actions.remove(action)
+    start_time = time.time()
+    bpy.ops.xray_import.skls(
+        directory=directory,
+        files=[{'name': file_name} for file_name in files_names],
+        add_actions_to_motion_list=False
+    )
+    return time.time() - start_time, len(bpy.data.actions)
+
+
+def decode_files(motion_decode, utils, file_paths, workers_count):
+    start_time = time.time()
+    for future in utils.decode_files(
+            motion_decode.decode_motions_file,
+            [(file_path, None) for file_path in file_paths],
+            workers_count
+        ):
+        future.result()
+    return time.time() - start_time
+
+
+def main():
+    args = []
+    if '--' in sys.argv:
+        args = sys.argv[sys.argv.index('--') + 1 : ]
+    files_count = int(args[0]) if args else 200
+    workers_count = int(args[1]) if len(args) > 1 else os.cpu_count() or 1
+    bones_count = int(args[2]) if len(args) > 2 else 30
+
+    addon_utils.enable('io_scene_xray', default_set=True)
+    from io_scene_xray import xray_io, motion_decode, utils, version_utils
+
+    bones_names = ['bone_{0}'.format(index) for index in range(bones_count)]
+    create_armature(version_utils, bones_names)
+    directory = tempfile.mkdtemp()
+    try:
+        files_names = []
+        for file_index in range(files_count):
+            file_name = 'motion_{0}.skl'.format(file_index)
+            write_skl(
+                os.path.join(directory, file_name),
+                xray_io, file_name[ : -4], bones_names
+            )
+            files_names.append(file_name)
+        file_paths = [
+            os.path.join(directory, file_name)
+            for file_name in files_names
+        ]
+        print('files: {0}, bones: {1}, workers: {2}'.format(
+            files_count, bones_count, workers_count
+        ))
+        for workers in (1, workers_count):
+            decode_time = decode_files(motion_decode, utils, file_paths, workers)
+            import_time, actions_count = import_files(
+                version_utils, directory, files_names, workers
+            )
+            print('{0:>2} workers  decode {1:>8.3f} sec  import {2:>8.3f} sec  actions {3}'.format(
+                workers, decode_time, import_time, actions_count
+            ))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
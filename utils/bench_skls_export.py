@@ -0,0 +1,116 @@
+# Usage:
+# blender --factory-startup -noaudio -b --python utils/bench_skls_export.py -- [actions-count] [bones-count] [frames-count]
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+
+import addon_utils
+import bpy
+
+
+def create_armature(version_utils, bones_count):
+    arm = bpy.data.armatures.new('bench')
+    obj = bpy.data.objects.new('bench', arm)
+    version_utils.link_object(obj)
+    version_utils.set_active_object(obj)
+    bpy.ops.object.mode_set(mode='EDIT')
+    try:
+        for bone_index in range(bones_count):
+            bone = arm.edit_bones.new('bone_{0}'.format(bone_index))
+            bone.tail.y = 1
+    finally:
+        bpy.ops.object.mode_set(mode='OBJECT')
+    for pose_bone in obj.pose.bones:
+        pose_bone.rotation_mode = 'ZXY'
+    return obj
+
+
+def create_actions(obj, actions_count, frames_count):
+    # noisy curves, keys are not reduced by export
+    actions = []
+    for action_index in range(actions_count):
+        action = bpy.data.actions.new('action_{0}'.format(action_index))
+        for pose_bone in obj.pose.bones:
+            data_path = 'pose.bones["{0}"].location'.format(pose_bone.name)
+            for axis in range(3):
+                fcurve = action.fcurves.new(data_path, index=axis)
+                fcurve.keyframe_points.add(frames_count)
+                for frame in range(frames_count):
+                    value = ((frame * 7919 + action_index + axis) % 101) * 0.01
+                    fcurve.keyframe_points[frame].co = (frame, value)
+        actions.append(action)
+    return actions
+
+
+def export_in_memory(xray_io, xray_motions, utils, file_path, actions, obj):
+    # the whole file is built in memory, as it was before streaming
+    writer = xray_io.PackedWriter()
+    xray_motions.export_motions(writer, actions, obj)
+    utils.save_file(file_path, writer)
+
+
+def export_streamed(skl_exp, file_path, actions, obj):
+    context = skl_exp.ExportSklsContext()
+    context.bpy_arm_obj = obj
+    skl_exp.export_skls_file(file_path, context, actions)
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start_time = time.time()
+    function(*args)
+    total_time = time.time() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total_time, peak / 1024 / 1024
+
+
+def main():
+    args = []
+    if '--' in sys.argv:
+        args = sys.argv[sys.argv.index('--') + 1 : ]
+    actions_count = int(args[0]) if args else 200
+    bones_count = int(args[1]) if len(args) > 1 else 30
+    frames_count = int(args[2]) if len(args) > 2 else 100
+
+    addon_utils.enable('io_scene_xray', default_set=True)
+    from io_scene_xray import xray_io, xray_motions, utils, version_utils
+    from io_scene_xray.skl import exp as skl_exp
+
+    obj = create_armature(version_utils, bones_count)
+    actions = create_actions(obj, actions_count, frames_count)
+    directory = tempfile.mkdtemp()
+    try:
+        memory_path = os.path.join(directory, 'memory.skls')
+        streamed_path = os.path.join(directory, 'streamed.skls')
+        memory_time, memory_peak = measure(
+            export_in_memory,
+            xray_io, xray_motions, utils, memory_path, actions, obj
+        )
+        streamed_time, streamed_peak = measure(
+            export_streamed, skl_exp, streamed_path, actions, obj
+        )
+        with open(memory_path, 'rb') as file:
+            memory_data = file.read()
+        with open(streamed_path, 'rb') as file:
+            assert file.read() == memory_data
+        print('actions: {0}, bones: {1}, frames: {2}, file {3:.2f} MB'.format(
+            actions_count, bones_count, frames_count,
+            len(memory_data) / 1024 / 1024
+        ))
+        for name, total_time, peak in (
+                ('in memory', memory_time, memory_peak),
+                ('streamed', streamed_time, streamed_peak)
+            ):
+            print('{0:<10} {1:>9.3f} sec  peak +{2:>9.2f} MB'.format(
+                name, total_time, peak
+            ))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()